@@ -0,0 +1,243 @@
+"""
+全校录入进度审计（管理员）：登录管理员账号 → /api/admin/users 列出账号 → 并发拉取每位老师的
+/api/admin/state/:userId → 按老师、按课程统计完成情况，输出全校报告。
+
+每一行（学生 × 班级 × 课程）恰好归入一类：
+- complete      平时、考试都有成绩，已提交且没有未提交修改
+- dirty         有未提交修改（网页上改了还没点提交）
+- missing       平时或考试成绩为空
+- unsubmitted   成绩齐全但从未提交
+完成率 = complete / 行数。
+
+并发：一个带连接池的 httpx.AsyncClient，同时在途请求不超过 --concurrency；单个账号失败按指数退避重试，
+仍失败的记入报告的 errors，不影响其他账号。
+
+用法：
+  python automation/admin_audit.py --url http://localhost:5173 --user admin --password *** --out automation/audit.json
+  （也可用环境变量 GRADE_ENTRY_ADMIN_USER / GRADE_ENTRY_ADMIN_PASSWORD 提供管理员账号）
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+from dotenv import load_dotenv
+
+from run_api_driver import _raise_for_api
+
+STATUSES = ("complete", "dirty", "missing", "unsubmitted")
+
+
+def row_status(row: Dict[str, Any]) -> str:
+    if row.get("dirty"):
+        return "dirty"
+    if row.get("usual") is None or row.get("exam") is None:
+        return "missing"
+    if not row.get("submitted"):
+        return "unsubmitted"
+    return "complete"
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {"rows": 0, **{k: 0 for k in STATUSES}}
+
+
+def _with_rate(counts: Dict[str, int]) -> Dict[str, Any]:
+    rows = counts["rows"]
+    return {**counts, "completion": round(counts["complete"] / rows, 4) if rows else None}
+
+
+def summarize_state(state: Optional[Dict[str, Any]]) -> Tuple[Dict[str, int], Dict[Tuple[str, str], Dict[str, int]]]:
+    """一位老师的 state → (合计, {(班级, 课程): 计数})。"""
+    total = _empty_counts()
+    groups: Dict[Tuple[str, str], Dict[str, int]] = {}
+    for r in (state or {}).get("rows") or []:
+        key = (str(r.get("className") or ""), str(r.get("course") or ""))
+        g = groups.setdefault(key, _empty_counts())
+        status = row_status(r)
+        for c in (total, g):
+            c["rows"] += 1
+            c[status] += 1
+    return total, groups
+
+
+def make_async_client(base_url: str, concurrency: int, timeout: float = 30.0) -> httpx.AsyncClient:
+    """连接池上限与并发上限一致；localhost 不走系统代理。"""
+    return httpx.AsyncClient(
+        base_url=base_url.rstrip("/"),
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        trust_env=False,
+    )
+
+
+async def admin_login(client: httpx.AsyncClient, username: str, password: str) -> Dict[str, Any]:
+    data = _raise_for_api(await client.post("/api/auth/login", json={"username": username, "password": password}))
+    if (data.get("user") or {}).get("role") != "admin":
+        raise RuntimeError(f"账号 {username} 不是管理员，无法查看其他老师的数据。")
+    return data["user"]
+
+
+async def list_users(client: httpx.AsyncClient) -> List[Dict[str, Any]]:
+    return _raise_for_api(await client.get("/api/admin/users")).get("users") or []
+
+
+async def fetch_user_state(
+    client: httpx.AsyncClient,
+    user_id: str,
+    slots: asyncio.Semaphore,
+    retries: int,
+    retry_backoff: float,
+) -> Optional[Dict[str, Any]]:
+    """拉取一位老师的 state；网络错误与 5xx 按指数退避重试，4xx 直接失败。"""
+    for attempt in range(retries + 1):
+        try:
+            async with slots:
+                resp = await client.get(f"/api/admin/state/{quote(user_id, safe='')}")
+            if resp.status_code >= 500 and attempt < retries:
+                raise httpx.HTTPStatusError("server error", request=resp.request, response=resp)
+            return _raise_for_api(resp).get("state")
+        except (httpx.TransportError, httpx.HTTPStatusError):
+            if attempt >= retries:
+                raise
+            await asyncio.sleep(retry_backoff * (2 ** attempt))
+    return None
+
+
+async def audit(
+    url: str,
+    username: str,
+    password: str,
+    concurrency: int = 16,
+    include_admins: bool = False,
+    retries: int = 2,
+    retry_backoff: float = 0.5,
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    async with make_async_client(url, concurrency) as client:
+        await admin_login(client, username, password)
+        users = [u for u in await list_users(client) if include_admins or u.get("role") != "admin"]
+        slots = asyncio.Semaphore(max(1, concurrency))
+        states = await asyncio.gather(
+            *(fetch_user_state(client, str(u.get("id")), slots, retries, retry_backoff) for u in users),
+            return_exceptions=True,
+        )
+    fetch_s = time.perf_counter() - t0
+
+    teachers: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    school = _empty_counts()
+    courses: Dict[str, Dict[str, Any]] = {}
+    for u, st in zip(users, states):
+        if isinstance(st, BaseException):
+            errors.append({"user_id": u.get("id"), "username": u.get("username"), "error": f"{type(st).__name__}: {st}"})
+            continue
+        total, groups = summarize_state(st)
+        for k in total:
+            school[k] += total[k]
+        for (cls, course), g in groups.items():
+            c = courses.setdefault(course, {"counts": _empty_counts(), "teachers": set()})
+            c["teachers"].add(u.get("id"))
+            for k in g:
+                c["counts"][k] += g[k]
+        teachers.append(
+            {
+                "user_id": u.get("id"),
+                "username": u.get("username"),
+                "role": u.get("role"),
+                "has_state": bool(st and st.get("rows")),
+                **_with_rate(total),
+                "groups": [
+                    {"class": cls, "course": course, **_with_rate(g)} for (cls, course), g in sorted(groups.items())
+                ],
+            }
+        )
+
+    return {
+        "server": url,
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "accounts": len(users),
+        "concurrency": concurrency,
+        "fetch_s": round(fetch_s, 3),
+        "school": _with_rate(school),
+        "courses": [
+            {"course": course, "teachers": len(c["teachers"]), **_with_rate(c["counts"])}
+            for course, c in sorted(courses.items())
+        ],
+        "teachers": sorted(teachers, key=lambda t: (t["completion"] is None, t["completion"] or 0.0, t["username"] or "")),
+        "errors": errors,
+    }
+
+
+def _pct(rate: Optional[float]) -> str:
+    return "-" if rate is None else f"{rate * 100:.1f}%"
+
+
+def print_audit(report: Dict[str, Any], limit: int = 20) -> None:
+    s = report["school"]
+    print(f"\n===== 全校录入进度（{report['accounts']} 个账号，并发 {report['concurrency']}，拉取 {report['fetch_s']}s）=====")
+    print(
+        f"共 {s['rows']} 行：完成 {s['complete']}（{_pct(s['completion'])}），未提交修改 {s['dirty']}，"
+        f"缺成绩 {s['missing']}，未提交 {s['unsubmitted']}"
+    )
+    if report["courses"]:
+        print(f"\n{'课程':<16}{'老师':>6}{'行数':>8}{'完成率':>10}{'未提交修改':>12}{'缺成绩':>8}{'未提交':>8}")
+        for c in report["courses"]:
+            print(
+                f"{c['course'] or '(未填)':<16}{c['teachers']:>6}{c['rows']:>8}{_pct(c['completion']):>10}"
+                f"{c['dirty']:>12}{c['missing']:>8}{c['unsubmitted']:>8}"
+            )
+    pending = [t for t in report["teachers"] if t["completion"] != 1.0]
+    if pending:
+        print(f"\n未完成的老师（按完成率从低到高，前 {min(limit, len(pending))} / {len(pending)} 位）：")
+        for t in pending[:limit]:
+            note = "（还没有名单）" if not t["has_state"] else ""
+            print(
+                f"  {t['username']:<16}{t['rows']:>6} 行  完成 {_pct(t['completion']):>7}  "
+                f"未提交修改 {t['dirty']}  缺成绩 {t['missing']}  未提交 {t['unsubmitted']}{note}"
+            )
+    for e in report["errors"]:
+        print(f"  ⚠️ {e['username']}（{e['user_id']}）拉取失败：{e['error']}")
+
+
+def main() -> int:
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="管理员：并发拉取所有老师的录入数据，按老师/课程统计完成情况")
+    ap.add_argument("--url", required=True, help="成绩录入系统地址，例如 http://localhost:5173")
+    ap.add_argument("--user", default=os.getenv("GRADE_ENTRY_ADMIN_USER"), help="管理员用户名（默认取环境变量 GRADE_ENTRY_ADMIN_USER）")
+    ap.add_argument("--password", default=os.getenv("GRADE_ENTRY_ADMIN_PASSWORD"), help="管理员密码（默认取环境变量 GRADE_ENTRY_ADMIN_PASSWORD）")
+    ap.add_argument("--concurrency", type=int, default=16, help="同时在途的请求数上限（默认 16）")
+    ap.add_argument("--retries", type=int, default=2, help="单个账号拉取失败后的重试次数（默认 2）")
+    ap.add_argument("--include-admins", action="store_true", help="把管理员账号自己的数据也算进来")
+    ap.add_argument("--limit", type=int, default=20, help="终端里最多列出多少位未完成的老师（默认 20；JSON 报告不受限）")
+    ap.add_argument("--out", default=None, help="全校报告 JSON 路径（可选）")
+    args = ap.parse_args()
+
+    if not args.user or not args.password:
+        ap.error("需要管理员账号：--user/--password 或环境变量 GRADE_ENTRY_ADMIN_USER/GRADE_ENTRY_ADMIN_PASSWORD")
+    report = asyncio.run(
+        audit(
+            args.url,
+            args.user,
+            args.password,
+            concurrency=max(1, args.concurrency),
+            include_admins=args.include_admins,
+            retries=max(0, args.retries),
+        )
+    )
+    print_audit(report, args.limit)
+    if args.out:
+        out = Path(args.out).resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"报告：{out}")
+    return 2 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+# 与 excel-form-fill/agent_telemetry.py 逐字节相同（本行除外），改动后运行 tools/check_shared_copies.py 校验。
+"""
+browser-use Agent 运行的逐步统计：每步耗时、LLM 调用耗时与 token、动作数、错误数，以及整次运行的汇总报告。
+
+- LLM 耗时/token：给 llm 实例的 ainvoke 套一层计时（browser-use 自己的用量统计也是这样挂在实例上的），
+  每次调用记下起止时间和返回的 usage（prompt/completion/cached tokens）。
+- 每步耗时：取自 AgentHistory.metadata（step_start_time / step_end_time）；落在该步时间窗内的 LLM 调用算作该步的 LLM 时间，
+  其余为浏览器与动作执行时间。
+- 费用：设置环境变量 LLM_PRICE_INPUT / LLM_PRICE_OUTPUT（每百万 token 的价格）时按 token 估算，否则不计。
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class LLMCallTimer:
+    """记录一个 llm 实例上每次 ainvoke 的起止时间与 token 用量。"""
+
+    def __init__(self) -> None:
+        self.calls: List[Dict[str, Any]] = []
+
+    def attach(self, llm) -> None:
+        original = llm.ainvoke
+
+        async def timed_ainvoke(*args, **kwargs):
+            start = time.time()
+            entry: Dict[str, Any] = {"start": start, "end": None, "ok": False}
+            self.calls.append(entry)
+            try:
+                out = await original(*args, **kwargs)
+                entry["ok"] = True
+                usage = getattr(out, "usage", None)
+                if usage is not None:
+                    entry["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+                    entry["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+                    entry["cached_tokens"] = getattr(usage, "prompt_cached_tokens", 0) or 0
+                return out
+            finally:
+                entry["end"] = time.time()
+
+        setattr(llm, "ainvoke", timed_ainvoke)
+
+
+def _price(name: str) -> Optional[float]:
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def _step_window(item) -> Tuple[Optional[float], Optional[float]]:
+    meta = getattr(item, "metadata", None)
+    if meta is None:
+        return None, None
+    return getattr(meta, "step_start_time", None), getattr(meta, "step_end_time", None)
+
+
+def step_telemetry(history, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按 Agent 历史逐步统计；history 为 AgentHistoryList（可为 None）。"""
+    steps: List[Dict[str, Any]] = []
+    for i, item in enumerate(getattr(history, "history", None) or [], 1):
+        start, end = _step_window(item)
+        duration = (end - start) if start is not None and end is not None else None
+        in_step = [c for c in calls if start is not None and end is not None and c["end"] and start <= c["start"] <= end]
+        llm_s = sum(c["end"] - c["start"] for c in in_step)
+        actions = getattr(getattr(item, "model_output", None), "action", None) or []
+        errors = [r for r in (getattr(item, "result", None) or []) if getattr(r, "error", None)]
+        steps.append(
+            {
+                "step": getattr(getattr(item, "metadata", None), "step_number", i),
+                "duration_s": round(duration, 3) if duration is not None else None,
+                "llm_s": round(llm_s, 3),
+                "browser_s": round(max(0.0, duration - llm_s), 3) if duration is not None else None,
+                "llm_calls": len(in_step),
+                "prompt_tokens": sum(c.get("prompt_tokens", 0) for c in in_step),
+                "completion_tokens": sum(c.get("completion_tokens", 0) for c in in_step),
+                "cached_tokens": sum(c.get("cached_tokens", 0) for c in in_step),
+                "actions": len(actions),
+                "errors": len(errors),
+            }
+        )
+    return steps
+
+
+def build_report(
+    history,
+    calls: List[Dict[str, Any]],
+    wall_s: float,
+    rows: int,
+    done: bool,
+    **extra: Any,
+) -> Dict[str, Any]:
+    """
+    汇总报告。rows 为本次完成的记录数（由调用方判断：Agent 标记 done 时计入本批条数）。
+    llm_s 按全部 LLM 调用计（包括步内重试）；browser_s 为各步耗时减去步内 LLM 时间；other_s 为步外开销（启动浏览器等）。
+    """
+    steps = step_telemetry(history, calls)
+    llm_s = sum(c["end"] - c["start"] for c in calls if c["end"])
+    step_s = sum(s["duration_s"] or 0 for s in steps)
+    browser_s = sum(s["browser_s"] or 0 for s in steps)
+    prompt = sum(c.get("prompt_tokens", 0) for c in calls)
+    completion = sum(c.get("completion_tokens", 0) for c in calls)
+    cached = sum(c.get("cached_tokens", 0) for c in calls)
+    price_in, price_out = _price("LLM_PRICE_INPUT"), _price("LLM_PRICE_OUTPUT")
+    cost = None
+    if price_in is not None and price_out is not None:
+        cost = round((prompt * price_in + completion * price_out) / 1_000_000, 6)
+    return {
+        "done": done,
+        "steps": len(steps),
+        "actions": sum(s["actions"] for s in steps),
+        "step_errors": sum(s["errors"] for s in steps),
+        "llm_calls": len(calls),
+        "llm_failed_calls": sum(1 for c in calls if not c["ok"]),
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cached_tokens": cached,
+        "total_tokens": prompt + completion,
+        "cost": cost,
+        "wall_s": round(wall_s, 3),
+        "llm_s": round(llm_s, 3),
+        "browser_s": round(browser_s, 3),
+        "other_s": round(max(0.0, wall_s - step_s), 3),
+        "rows": rows,
+        "rows_per_min": round(rows / wall_s * 60, 2) if wall_s > 0 else 0.0,
+        **extra,
+        "per_step": steps,
+    }
+
+
+def merge_reports(reports: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    """合并多个（并发）运行的报告：计数与耗时求和，wall_s 取整体墙钟时间。"""
+    keys = (
+        "steps", "actions", "step_errors", "llm_calls", "llm_failed_calls", "prompt_tokens",
+        "completion_tokens", "cached_tokens", "total_tokens", "llm_s", "browser_s", "rows",
+    )
+    out: Dict[str, Any] = {k: sum(r.get(k, 0) for r in reports) for k in keys}
+    costs = [r.get("cost") for r in reports]
+    out["cost"] = round(sum(costs), 6) if costs and all(c is not None for c in costs) else None
+    out["llm_s"] = round(out["llm_s"], 3)
+    out["browser_s"] = round(out["browser_s"], 3)
+    out["done"] = bool(reports) and all(r.get("done") for r in reports)
+    out["wall_s"] = round(wall_s, 3)
+    out["rows_per_min"] = round(out["rows"] / wall_s * 60, 2) if wall_s > 0 else 0.0
+    out["runs"] = reports
+    return out
+
+
+def print_summary(report: Dict[str, Any], title: str = "运行统计") -> None:
+    cost = f"，费用 ≈ {report['cost']}" if report.get("cost") is not None else ""
+    cached = f"（其中缓存命中 {report['cached_tokens']}）" if report.get("cached_tokens") else ""
+    print(f"\n===== {title} =====")
+    if report.get("runs"):
+        print(f"（{len(report['runs'])} 个 Agent 并发：LLM/浏览器耗时与 token 为各自累计，总耗时为整体墙钟时间）")
+    print(
+        f"步数 {report['steps']}，动作 {report['actions']}，步内错误 {report['step_errors']}；"
+        f"LLM 调用 {report['llm_calls']} 次（失败 {report['llm_failed_calls']}）"
+    )
+    print(f"tokens：输入 {report['prompt_tokens']}{cached}，输出 {report['completion_tokens']}，合计 {report['total_tokens']}{cost}")
+    if report.get("runs"):
+        print(f"耗时：总 {report['wall_s']}s；LLM 累计 {report['llm_s']}s，浏览器/动作累计 {report['browser_s']}s")
+    else:
+        print(
+            f"耗时：总 {report['wall_s']}s = LLM {report['llm_s']}s + 浏览器/动作 {report['browser_s']}s + 其它 {report['other_s']}s"
+        )
+    print(f"完成 {report['rows']} 条，{report['rows_per_min']} 条/分钟")
+    per_step = report.get("per_step") or []
+    if per_step:
+        slowest = sorted(per_step, key=lambda s: s["duration_s"] or 0, reverse=True)[:3]
+        print("最慢的步：" + "；".join(f"#{s['step']} {s['duration_s']}s（LLM {s['llm_s']}s）" for s in slowest))
+
+
+def write_report(report: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -0,0 +1,287 @@
+"""
+端到端吞吐基准：本地替身服务器（standin_server.py）提供 web/ 页面，预置 100–5000 人的合成名单，
+按「合成 Excel → extract_excel 解析 → 录入策略 → 服务器回读校验」完整跑一遍，输出可横向比较的 JSON 报告。
+
+录入策略：
+  batch        run_batch_playwright.run（无头 Chromium，整页批量写入 + 每页提交）
+  batch-lean   同上，启用 lean profile（拦截非必要资源、关动画、自动化 Chromium 参数）
+  api          run_api_driver.run（不开浏览器，直接走 /api/state）
+
+每次运行记录：extract（Excel 解析）、launch（Playwright + Chromium 启动）、navigation（打开页面到钩子就绪）、
+page_turn / read / fill / submit（各页累计，取自 run_batch_playwright 的耗时报告）、verify（从服务器回读并逐条比对），
+total（launch 起到录入结束）、rows_per_sec，以及替身服务器的请求统计（state 写入次数与字节数）。
+每次运行前服务器上的名单都重置为未填状态。
+
+用法：
+  python automation/bench_e2e.py
+  python automation/bench_e2e.py --sizes 100,1000,5000 --strategies batch,api --repeat 3 --out automation/bench_e2e.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from standin_server import StandInServer, roster_state, synthetic_roster
+
+STRATEGIES = ("batch", "batch-lean", "api")
+BENCH_USER = ("bench", "bench")
+CLASS_NAME = "一班"
+COURSE = "数学"
+
+
+def write_synthetic_excel(grades: List[Dict[str, Any]], path: Path) -> None:
+    """规范表格：学号/姓名/班级/课程/平时成绩/考试成绩（extract_excel 表格模式可直接识别）。"""
+    import pandas as pd
+
+    df = pd.DataFrame(
+        [
+            {
+                "学号": g["student_no"],
+                "姓名": g["name"],
+                "班级": g["class_name"],
+                "课程": g["course"],
+                "平时成绩": g["usual"],
+                "考试成绩": g["exam"],
+            }
+            for g in grades
+        ]
+    )
+    df.to_excel(path, index=False)
+
+
+def extract(excel_path: Path, out_path: Path) -> Tuple[List[Dict[str, Any]], float]:
+    from extract_excel import extract_grades_json
+
+    t0 = time.perf_counter()
+    grades, raw = extract_grades_json(excel_path)
+    out_path.write_bytes(raw)
+    return grades, time.perf_counter() - t0
+
+
+def verify_server_state(server: StandInServer, username: str, grades: List[Dict[str, Any]]) -> Dict[str, int]:
+    """以服务器保存的数据为准逐条比对：分数一致且已提交（非 dirty）计为 ok。"""
+    state = server.get_state(username) or {}
+    by_name = {r.get("name"): r for r in state.get("rows", [])}
+    ok = wrong = unsubmitted = missing = 0
+    for g in grades:
+        r = by_name.get(g["name"])
+        if r is None:
+            missing += 1
+        elif (r.get("usual"), r.get("exam")) != (g.get("usual"), g.get("exam")):
+            wrong += 1
+        elif r.get("dirty") or not r.get("submitted"):
+            unsubmitted += 1
+        else:
+            ok += 1
+    return {"ok": ok, "wrong": wrong, "unsubmitted": unsubmitted, "missing": missing}
+
+
+def _op_s(metrics: Dict[str, Any], op: str) -> float:
+    return round((metrics.get("ops", {}).get(op, {}).get("total_ms") or 0.0) / 1000.0, 3)
+
+
+async def run_browser_strategy(
+    strategy: str,
+    url: str,
+    grades_path: Path,
+    page_size: int,
+    headless: bool,
+) -> Dict[str, Any]:
+    from playwright.async_api import async_playwright
+
+    from lean_profile import LEAN_CHROMIUM_ARGS
+    from run_batch_playwright import run as run_batch
+
+    lean = strategy == "batch-lean"
+    metrics_path = grades_path.with_name(f"{strategy}.metrics.json")
+    t0 = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless, args=LEAN_CHROMIUM_ARGS if lean else None)
+        launch_s = time.perf_counter() - t0
+        try:
+            rc = await run_batch(
+                url,
+                grades_path,
+                page_size,
+                headless,
+                lean=lean,
+                journal_path=grades_path.with_name(f"{strategy}.journal.jsonl"),
+                metrics_path=metrics_path,
+                browser=browser,
+                login=BENCH_USER,
+            )
+        finally:
+            await browser.close()
+    total_s = time.perf_counter() - t0
+    metrics = json.loads(metrics_path.read_text(encoding="utf-8"))
+    return {
+        "rc": rc,
+        "launch_s": round(launch_s, 3),
+        "navigation_s": _op_s(metrics, "load"),
+        "page_turn_s": _op_s(metrics, "navigate"),
+        "read_s": _op_s(metrics, "read"),
+        "fill_s": _op_s(metrics, "fill"),
+        "submit_s": _op_s(metrics, "submit"),
+        "total_s": round(total_s, 3),
+    }
+
+
+def run_api_strategy(url: str, grades_path: Path) -> Dict[str, Any]:
+    from run_api_driver import run as run_api
+
+    t0 = time.perf_counter()
+    rc = run_api(url, grades_path, *BENCH_USER)
+    return {"rc": rc, "total_s": round(time.perf_counter() - t0, 3)}
+
+
+def bench_one(
+    server: StandInServer,
+    strategy: str,
+    size: int,
+    grades: List[Dict[str, Any]],
+    rows: List[Dict[str, Any]],
+    grades_path: Path,
+    page_size: int,
+    headless: bool,
+    verbose: bool,
+) -> Dict[str, Any]:
+    server.preload(BENCH_USER[0], roster_state(rows, CLASS_NAME, COURSE))
+    server.reset_stats()
+    log = io.StringIO()
+    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(log)
+    try:
+        with sink:
+            if strategy == "api":
+                res = run_api_strategy(server.url, grades_path)
+            else:
+                res = asyncio.run(run_browser_strategy(strategy, server.url, grades_path, page_size, headless))
+    except Exception as e:
+        res = {"rc": None, "error": f"{type(e).__name__}: {e}"}
+        if not verbose:
+            print(log.getvalue()[-2000:], file=sys.stderr)
+
+    t0 = time.perf_counter()
+    check = verify_server_state(server, BENCH_USER[0], grades)
+    res["verify_s"] = round(time.perf_counter() - t0, 3)
+    res["verified"] = check
+    total = res.get("total_s")
+    res["rows_per_sec"] = round(check["ok"] / total, 2) if total else 0.0
+    res["server"] = dict(server.stats)
+    return {"strategy": strategy, "rows": size, **res}
+
+
+def summarize(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按 (策略, 人数) 取中位数。"""
+    groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+    for r in runs:
+        groups.setdefault((r["strategy"], r["rows"]), []).append(r)
+    keys = ("extract_s", "launch_s", "navigation_s", "page_turn_s", "read_s", "fill_s", "submit_s", "verify_s", "total_s", "rows_per_sec")
+    out: List[Dict[str, Any]] = []
+    for (strategy, size), rs in groups.items():
+        item: Dict[str, Any] = {"strategy": strategy, "rows": size, "runs": len(rs)}
+        for k in keys:
+            xs = [r[k] for r in rs if r.get(k) is not None]
+            item[k] = round(statistics.median(xs), 3) if xs else None
+        item["all_verified"] = all(r["verified"]["ok"] == size for r in rs)
+        out.append(item)
+    return out
+
+
+def print_table(summary: List[Dict[str, Any]]) -> None:
+    cols = ("extract_s", "launch_s", "navigation_s", "fill_s", "submit_s", "verify_s", "total_s", "rows_per_sec")
+    print(f"\n{'策略':<12}{'人数':>6}" + "".join(f"{c:>14}" for c in cols) + "  校验")
+    for s in summary:
+        cells = "".join(f"{'-' if s[c] is None else s[c]:>14}" for c in cols)
+        print(f"{s['strategy']:<12}{s['rows']:>6}{cells}  {'通过' if s['all_verified'] else '未通过'}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="端到端吞吐基准：替身服务器 + 合成名单，逐策略跑完整录入流程并输出 JSON 报告")
+    ap.add_argument("--sizes", default="100,500,1000,5000", help="名单人数，逗号分隔（默认 100,500,1000,5000）")
+    ap.add_argument("--strategies", default=",".join(STRATEGIES), help=f"录入策略，逗号分隔（可选：{', '.join(STRATEGIES)}）")
+    ap.add_argument("--repeat", type=int, default=1, help="每个 (策略, 人数) 重复次数（默认 1）")
+    ap.add_argument("--page-size", type=int, default=20, choices=(10, 15, 20, 38), help="每页条数（需是网页下拉里的选项，默认 20）")
+    ap.add_argument("--headed", action="store_true", help="有头模式（默认无头）")
+    ap.add_argument("--skip-extract", action="store_true", help="不生成/解析 Excel，直接写 grades.json（只测录入侧）")
+    ap.add_argument("--seed", type=int, default=0, help="合成名单随机种子")
+    ap.add_argument("--work-dir", default=None, help="中间文件目录（默认临时目录，结束后删除）")
+    ap.add_argument("--out", default=None, help="JSON 报告路径（默认只打印）")
+    ap.add_argument("--verbose", action="store_true", help="显示各录入脚本自身的输出")
+    args = ap.parse_args()
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        ap.error(f"未知策略：{unknown}")
+
+    work = Path(args.work_dir).resolve() if args.work_dir else Path(tempfile.mkdtemp(prefix="bench_e2e-"))
+    runs: List[Dict[str, Any]] = []
+    try:
+        with StandInServer({BENCH_USER[0]: BENCH_USER[1]}) as server:
+            print(f"替身服务器：{server.url}")
+            for size in sizes:
+                rows, targets = synthetic_roster(size, CLASS_NAME, COURSE, args.seed)
+                size_dir = work / f"n{size}"
+                size_dir.mkdir(parents=True, exist_ok=True)
+                grades_path = size_dir / "grades.json"
+                extract_s: Optional[float] = None
+                if args.skip_extract:
+                    payload = {"meta": {"mode": "synthetic", "count": size}, "grades": targets}
+                    grades_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+                    grades = targets
+                else:
+                    excel_path = size_dir / "roster.xlsx"
+                    write_synthetic_excel(targets, excel_path)
+                    grades, extract_s = extract(excel_path, grades_path)
+                for strategy in strategies:
+                    for i in range(1, max(1, args.repeat) + 1):
+                        # 每次都从干净的 grades.json 开始：清掉上一次运行留下的索引/日志/报告
+                        for f in size_dir.glob("grades.*"):
+                            if f.name != "grades.json":
+                                f.unlink()
+                        r = bench_one(
+                            server, strategy, size, grades, rows, grades_path, args.page_size, not args.headed, args.verbose
+                        )
+                        r["repeat"] = i
+                        r["extract_s"] = round(extract_s, 3) if extract_s is not None else None
+                        runs.append(r)
+                        v = r["verified"]
+                        print(
+                            f"[{strategy} × {size} #{i}] rc={r['rc']} 总 {r.get('total_s')}s，{r['rows_per_sec']} 行/秒，"
+                            f"校验 {v['ok']}/{size}，state 整份写入 {r['server']['state_puts']} 次、增量 {r['server']['row_patches']} 批，"
+                            f"上传 {r['server']['state_bytes_in']} 字节"
+                            + (f"；{r['error']}" if r.get("error") else "")
+                        )
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    summary = summarize(runs)
+    print_table(summary)
+    if args.out:
+        out = Path(args.out).resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "python": sys.version.split()[0],
+            "page_size": args.page_size,
+            "headless": not args.headed,
+            "extract": not args.skip_extract,
+            "summary": summary,
+            "runs": runs,
+        }
+        out.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"已写入：{out}")
+    return 0 if all(s["all_verified"] for s in summary) else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""
+CLI 冷启动基准：每个入口以子进程运行多次（默认 --help），取墙钟耗时中位数；
+再用 python -X importtime 跑一次，列出启动时加载了哪些重依赖及其累计导入耗时。
+
+重依赖应只在需要它的路径上加载：--help / 参数错误不应出现 pandas、playwright、browser_use。
+
+用法：
+  python automation/bench_startup.py
+  python automation/bench_startup.py --repeat 10 --out automation/startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+HERE = Path(__file__).resolve().parent
+
+ENTRIES: List[Tuple[str, List[str]]] = [
+    ("extract_excel --help", ["extract_excel.py", "--help"]),
+    ("run_batch_playwright --help", ["run_batch_playwright.py", "--help"]),
+    ("run_full_pipeline --help", ["run_full_pipeline.py", "--help"]),
+    ("run_single_browser_use --help", ["run_single_browser_use.py", "--help"]),
+    ("run_api_driver --help", ["run_api_driver.py", "--help"]),
+    ("admin_audit --help", ["admin_audit.py", "--help"]),
+    ("delta_client --help", ["delta_client.py", "--help"]),
+    ("browser_service --help", ["browser_service.py", "--help"]),
+    ("grade_store --help", ["grade_store.py", "--help"]),
+    ("bench_e2e --help", ["bench_e2e.py", "--help"]),
+    ("page_sim --help", ["page_sim.py", "--help"]),
+]
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "playwright", "browser_use", "httpx")
+
+
+def _run_once(argv: List[str]) -> Tuple[float, int]:
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, *argv], cwd=HERE, capture_output=True)
+    return (time.perf_counter() - t0) * 1000, proc.returncode
+
+
+def _heavy_imports(argv: List[str]) -> Dict[str, float]:
+    """解析 -X importtime 输出（stderr：`import time: self | cumulative | name`），返回顶层重依赖 → 累计毫秒。"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=HERE, capture_output=True, text=True)
+    found: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].rstrip()
+        top = name.strip().split(".")[0]
+        if top in HEAVY_MODULES and name.strip() == top:
+            try:
+                found[top] = round(int(parts[1].strip()) / 1000, 1)
+            except ValueError:
+                pass
+    return found
+
+
+def bench(repeat: int) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for label, argv in ENTRIES:
+        _run_once(argv)  # 预热一次（pyc、文件系统缓存），不计入
+        times: List[float] = []
+        rc = 0
+        for _ in range(repeat):
+            ms, rc = _run_once(argv)
+            times.append(ms)
+        results.append(
+            {
+                "entry": label,
+                "median_ms": round(statistics.median(times), 1),
+                "min_ms": round(min(times), 1),
+                "max_ms": round(max(times), 1),
+                "exit_code": rc,
+                "heavy_imports_ms": _heavy_imports(argv),
+            }
+        )
+    return results
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="各 CLI 入口的冷启动耗时与重依赖加载情况")
+    ap.add_argument("--repeat", type=int, default=5, help="每个入口重复次数（默认 5）")
+    ap.add_argument("--out", default=None, help="把结果写成 JSON（可选）")
+    args = ap.parse_args()
+
+    results = bench(max(1, args.repeat))
+    print(f"{'入口':<34}{'中位数(ms)':>12}{'最小':>9}{'最大':>9}  重依赖")
+    for r in results:
+        heavy = ", ".join(f"{k} {v}ms" for k, v in r["heavy_imports_ms"].items()) or "-"
+        flag = "" if r["exit_code"] == 0 else f"  [exit {r['exit_code']}]"
+        print(f"{r['entry']:<34}{r['median_ms']:>12}{r['min_ms']:>9}{r['max_ms']:>9}  {heavy}{flag}")
+    if args.out:
+        out = Path(args.out).resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"python": sys.version.split()[0], "repeat": args.repeat, "entries": results}
+        out.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"已写入：{out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,405 @@
+"""
+常驻浏览器服务：Chromium 只启动一次并保持热状态，各 CLI 通过 CDP 连接，每个作业新建一个 context。
+
+- 服务端：启动 Chromium（--remote-debugging-port），并在本地开一个很小的 HTTP 控制口：
+    GET  /health    健康检查（Chromium 进程存活 + /json/version 可达）
+    POST /acquire   申请一个作业租约，返回 CDP 地址；超过并发上限返回 429
+    POST /renew     续租（长作业定期调用，避免被当成崩溃回收）
+    POST /release   归还租约
+    POST /shutdown  关闭服务
+- 空闲（无租约）超过 --idle-timeout 秒自动退出；Chromium 意外退出时自动拉起。
+- 客户端：lease_browser() 负责申请/归还租约，调用方用 connect_over_cdp 连接后自行 new_context()。
+
+用法：
+  python automation/browser_service.py serve --port 9400 --headless
+  python automation/run_batch_playwright.py --url http://localhost:5173 --grades automation/grades.json --browser-service http://127.0.0.1:9400
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+DEFAULT_SERVICE_PORT = 9400
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+class ServiceHTTPError(RuntimeError):
+    """控制口返回了 4xx/5xx；code 为状态码，payload 为响应 JSON（例如 503 时的 /health 详情）。"""
+
+    def __init__(self, message: str, code: int, payload: Dict[str, Any]) -> None:
+        super().__init__(message)
+        self.code = code
+        self.payload = payload
+
+
+def _http_json(method: str, url: str, body: Optional[Dict[str, Any]] = None, timeout: float = 5.0) -> Dict[str, Any]:
+    """极简 JSON 请求（标准库实现，服务端/客户端共用；localhost 不走系统代理）。"""
+    data = json.dumps(body or {}).encode("utf-8") if method != "GET" else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    try:
+        with opener.open(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8") or "{}")
+    except urllib.error.HTTPError as e:
+        try:
+            payload = json.loads(e.read().decode("utf-8") or "{}")
+        except Exception:
+            payload = {}
+        raise ServiceHTTPError(f"{method} {url} -> {e.code}: {payload.get('error') or e.reason}", e.code, payload) from e
+
+
+def find_chromium_executable() -> str:
+    """优先用 Playwright 自带的 Chromium；否则在 PATH 中找 chromium/chrome。"""
+    try:
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as p:
+            path = p.chromium.executable_path
+            if path:
+                return path
+    except Exception:
+        pass
+    for name in ("chromium", "chromium-browser", "google-chrome", "chrome", "msedge"):
+        path = shutil.which(name)
+        if path:
+            return path
+    raise RuntimeError("未找到 Chromium。请先运行：python -m playwright install chromium")
+
+
+@dataclass
+class Lease:
+    lease_id: str
+    job: str
+    acquired_at: float
+    expires_at: float
+
+
+class BrowserService:
+    """管理一个常驻 Chromium 进程 + 作业租约。"""
+
+    def __init__(
+        self,
+        headless: bool,
+        max_contexts: int,
+        idle_timeout: float,
+        lease_ttl: float,
+        extra_args: Optional[List[str]] = None,
+    ) -> None:
+        self.headless = headless
+        self.max_contexts = max_contexts
+        self.idle_timeout = idle_timeout
+        self.lease_ttl = lease_ttl
+        self.extra_args = list(extra_args or [])
+        self.started_at = time.time()
+        self.last_active = time.time()
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._leases: Dict[str, Lease] = {}
+        self._proc: Optional[subprocess.Popen] = None
+        self._profile_dir: Optional[str] = None
+        self._exe = find_chromium_executable()
+        self.cdp_port = _free_port()
+        self.stopped = threading.Event()
+
+    # ---------- Chromium 进程 ----------
+    @property
+    def cdp_url(self) -> str:
+        return f"http://127.0.0.1:{self.cdp_port}"
+
+    def launch(self, ready_timeout: float = 30.0) -> None:
+        self._profile_dir = tempfile.mkdtemp(prefix="browser-service-")
+        args = [
+            self._exe,
+            f"--remote-debugging-port={self.cdp_port}",
+            "--remote-debugging-address=127.0.0.1",
+            f"--user-data-dir={self._profile_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            *self.extra_args,
+        ]
+        if self.headless:
+            args.append("--headless=new")
+        args.append("about:blank")
+        self._proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + ready_timeout
+        while time.time() < deadline:
+            if self.browser_version() is not None:
+                return
+            time.sleep(0.05)
+        raise RuntimeError(f"Chromium 在 {ready_timeout}s 内未就绪：{self.cdp_url}")
+
+    def browser_version(self) -> Optional[Dict[str, Any]]:
+        try:
+            return _http_json("GET", f"{self.cdp_url}/json/version", timeout=1.0)
+        except Exception:
+            return None
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def stop_browser(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        self._proc = None
+        if self._profile_dir:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+            self._profile_dir = None
+
+    # ---------- 租约 ----------
+    def acquire(self, job: str) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired()
+            if len(self._leases) >= self.max_contexts:
+                raise OverflowError(f"并发 context 已达上限 {self.max_contexts}")
+            version = self.browser_version() or {}
+            now = time.time()
+            lease = Lease(uuid.uuid4().hex, job, now, now + self.lease_ttl)
+            self._leases[lease.lease_id] = lease
+            self.last_active = now
+            return {
+                "lease": lease.lease_id,
+                "cdp_url": self.cdp_url,
+                "ws_endpoint": version.get("webSocketDebuggerUrl"),
+                "expires_in": self.lease_ttl,
+            }
+
+    def renew(self, lease_id: str) -> bool:
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is None:
+                return False
+            lease.expires_at = time.time() + self.lease_ttl
+            self.last_active = time.time()
+            return True
+
+    def release(self, lease_id: str) -> bool:
+        with self._lock:
+            self.last_active = time.time()
+            return self._leases.pop(lease_id, None) is not None
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        for lid in [lid for lid, l in self._leases.items() if l.expires_at < now]:
+            self._leases.pop(lid, None)
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired()
+            leases = [{"lease": l.lease_id, "job": l.job, "age": round(time.time() - l.acquired_at, 1)} for l in self._leases.values()]
+        version = self.browser_version()
+        return {
+            "ok": self.alive() and version is not None,
+            "browser": (version or {}).get("Browser"),
+            "cdp_url": self.cdp_url,
+            "leases": leases,
+            "max_contexts": self.max_contexts,
+            "uptime": round(time.time() - self.started_at, 1),
+            "idle": round(time.time() - self.last_active, 1) if not leases else 0.0,
+            "restarts": self.restarts,
+        }
+
+    # ---------- 看护线程：回收过期租约、空闲退出、崩溃拉起 ----------
+    def watchdog(self, interval: float = 1.0) -> None:
+        while not self.stopped.wait(interval):
+            with self._lock:
+                self._purge_expired()
+                idle = not self._leases and (time.time() - self.last_active) > self.idle_timeout
+            if idle:
+                print(f"[browser-service] 空闲超过 {self.idle_timeout:.0f}s，自动退出", flush=True)
+                self.stopped.set()
+                return
+            if not self.alive():
+                print("[browser-service] Chromium 已退出，正在重新启动…", flush=True)
+                self.stop_browser()
+                try:
+                    self.launch()
+                    self.restarts += 1
+                except Exception as e:
+                    print(f"[browser-service] 重启失败：{e}", flush=True)
+
+
+def _make_handler(service: BrowserService):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt: str, *args: Any) -> None:  # 静默访问日志
+            pass
+
+        def _send(self, code: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> Dict[str, Any]:
+            n = int(self.headers.get("Content-Length") or 0)
+            if n <= 0:
+                return {}
+            try:
+                return json.loads(self.rfile.read(n).decode("utf-8"))
+            except Exception:
+                return {}
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                h = service.health()
+                self._send(200 if h["ok"] else 503, h)
+                return
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            body = self._body()
+            if self.path == "/acquire":
+                try:
+                    self._send(200, service.acquire(str(body.get("job") or "")))
+                except OverflowError as e:
+                    self._send(429, {"error": str(e)})
+                return
+            if self.path == "/renew":
+                ok = service.renew(str(body.get("lease") or ""))
+                self._send(200 if ok else 404, {"ok": ok})
+                return
+            if self.path == "/release":
+                self._send(200, {"ok": service.release(str(body.get("lease") or ""))})
+                return
+            if self.path == "/shutdown":
+                self._send(200, {"ok": True})
+                service.stopped.set()
+                return
+            self._send(404, {"error": "not found"})
+
+    return Handler
+
+
+def serve(
+    host: str,
+    port: int,
+    headless: bool,
+    max_contexts: int,
+    idle_timeout: float,
+    lease_ttl: float,
+    extra_args: Optional[List[str]] = None,
+) -> int:
+    service = BrowserService(headless, max_contexts, idle_timeout, lease_ttl, extra_args)
+    service.launch()
+    httpd = ThreadingHTTPServer((host, port), _make_handler(service))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    threading.Thread(target=service.watchdog, daemon=True).start()
+    print(f"[browser-service] 控制口 http://{host}:{port}  CDP {service.cdp_url}  并发上限 {max_contexts}", flush=True)
+    try:
+        service.stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.shutdown()
+        service.stop_browser()
+    return 0
+
+
+# ---------- 客户端 ----------
+@asynccontextmanager
+async def lease_browser(
+    service_url: str,
+    job: str = "",
+    wait_seconds: float = 60.0,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    向浏览器服务申请一个作业租约；并发已满时按短间隔重试，直到 wait_seconds。
+    返回 {"lease", "cdp_url", "ws_endpoint", ...}；退出上下文时自动归还，并在持有期间定期续租。
+    """
+    base = service_url.rstrip("/")
+    deadline = time.monotonic() + wait_seconds
+    delay = 0.2
+    while True:
+        try:
+            lease = await asyncio.to_thread(_http_json, "POST", f"{base}/acquire", {"job": job})
+            break
+        except ServiceHTTPError as e:
+            if e.code != 429 or time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+    async def _keep_renewing() -> None:
+        interval = max(5.0, float(lease.get("expires_in") or 60) / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(_http_json, "POST", f"{base}/renew", {"lease": lease["lease"]})
+            except Exception:
+                pass
+
+    renewer = asyncio.create_task(_keep_renewing())
+    try:
+        yield lease
+    finally:
+        renewer.cancel()
+        try:
+            await asyncio.to_thread(_http_json, "POST", f"{base}/release", {"lease": lease["lease"]})
+        except Exception:
+            pass
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="常驻浏览器服务：Chromium 保持热启动，CLI 通过 CDP 连接，每个作业一个 context")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("serve", help="启动服务")
+    sp.add_argument("--host", default="127.0.0.1", help="控制口监听地址（默认仅本机）")
+    sp.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT, help=f"控制口端口（默认 {DEFAULT_SERVICE_PORT}）")
+    sp.add_argument("--headless", action="store_true", help="无头模式运行 Chromium")
+    sp.add_argument("--max-contexts", type=int, default=4, help="同时进行的作业（context）上限，默认 4")
+    sp.add_argument("--idle-timeout", type=float, default=600, help="无租约空闲多少秒后自动退出（默认 600）")
+    sp.add_argument("--lease-ttl", type=float, default=1800, help="租约未续期多少秒后视为作业已崩溃并回收（默认 1800）")
+
+    hp = sub.add_parser("health", help="查询服务健康状态")
+    hp.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_SERVICE_PORT}", help="服务控制口地址")
+
+    kp = sub.add_parser("stop", help="关闭服务")
+    kp.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_SERVICE_PORT}", help="服务控制口地址")
+
+    args = ap.parse_args()
+    if args.cmd == "serve":
+        return serve(args.host, args.port, args.headless, args.max_contexts, args.idle_timeout, args.lease_ttl)
+    if args.cmd == "health":
+        try:
+            h = _http_json("GET", f"{args.url.rstrip('/')}/health")
+        except ServiceHTTPError as e:
+            if not e.payload:
+                print(f"服务不可用：{e}")
+                return 1
+            h = e.payload  # 503：服务在，但 Chromium 不健康；详情里说明原因
+        except Exception as e:
+            print(f"服务不可用：{e}")
+            return 1
+        print(json.dumps(h, ensure_ascii=False, indent=2))
+        return 0 if h.get("ok") else 1
+    _http_json("POST", f"{args.url.rstrip('/')}/shutdown")
+    print("已请求关闭服务")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
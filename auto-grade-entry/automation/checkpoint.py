@@ -0,0 +1,119 @@
+"""
+批量录入的断点日志（append-only JSONL），用于崩溃/超时/Ctrl-C 后断点续跑。
+
+每处理完一页追加一条记录并立即 fsync：
+  {"event": "run_start", "run_key": ..., "ts": ...}
+  {"event": "filled",    "page": 3, "rows": [[row_id, usual, exam], ...], "ts": ...}
+  {"event": "submitted", "page": 3, "rows": [[row_id, usual, exam], ...], "ts": ...}
+  {"event": "run_end",   "ts": ...}
+
+--resume 时：某页当前可见行及其目标成绩与日志中「已提交」记录完全一致 → 跳过该页。
+名单或成绩有变化的页不会被误跳过（按 行 id + 目标值 比对，而不是只看页码）。
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+RowTarget = Tuple[str, Any, Any]
+
+
+def default_journal_path(grades_path: Path) -> Path:
+    return grades_path.with_name(grades_path.name + ".journal.jsonl")
+
+
+def make_run_key(url: str, grades_path: Path, page_size: int, content: Optional[bytes] = None) -> str:
+    """content：grades.json 的字节内容；调用方已在内存里持有时传入，省一次读盘（文件可能还在后台写）。"""
+    h = hashlib.sha256()
+    h.update(url.encode("utf-8"))
+    h.update(str(page_size).encode("utf-8"))
+    h.update(grades_path.read_bytes() if content is None else content)
+    return h.hexdigest()[:16]
+
+
+def _canon(rows: Iterable[Sequence[Any]]) -> List[Tuple[str, str, str]]:
+    return sorted((str(r[0]), json.dumps(r[1]), json.dumps(r[2])) for r in rows)
+
+
+class RunJournal:
+    """断点日志：写入端每条记录 fsync；读取端容忍最后一行被截断（进程被杀时可能写了一半）。"""
+
+    def __init__(self, path: Path, run_key: str, resume: bool = False) -> None:
+        self.path = path
+        self.run_key = run_key
+        self._confirmed: Dict[int, List[Tuple[str, str, str]]] = {}
+        previous_key: Optional[str] = None
+        if resume and path.exists():
+            previous_key = self._load()
+        if resume and previous_key not in (None, run_key):
+            print(f"提示：断点日志来自不同的输入（run_key {previous_key} ≠ {run_key}），将逐页按行比对后决定是否跳过。")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and path.stat().st_size > 0 and not path.read_bytes().endswith(b"\n"):
+            self._fh.write("\n")  # 上次被杀时尾行写了一半：另起一行，避免与新记录粘连
+        self.record("run_start", run_key=run_key, resume=resume)
+
+    def _load(self) -> Optional[str]:
+        run_key: Optional[str] = None
+        with open(self.path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    ev = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 截断的尾行
+                if ev.get("event") == "run_start":
+                    run_key = ev.get("run_key")
+                elif ev.get("event") == "submitted":
+                    self._confirmed[int(ev["page"])] = _canon(ev.get("rows", []))
+        return run_key
+
+    def record(self, event: str, page: Optional[int] = None, rows: Optional[List[RowTarget]] = None, **extra: Any) -> None:
+        ev: Dict[str, Any] = {"event": event, "ts": round(time.time(), 3)}
+        if page is not None:
+            ev["page"] = page
+        if rows is not None:
+            ev["rows"] = [list(r) for r in rows]
+        ev.update(extra)
+        self._fh.write(json.dumps(ev, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        if event == "submitted" and page is not None:
+            self._confirmed[page] = _canon(rows or [])
+
+    def page_confirmed(self, page: int, rows: List[RowTarget]) -> bool:
+        """该页（同样的行、同样的目标成绩）是否已被日志确认提交。"""
+        done = self._confirmed.get(page)
+        return done is not None and done == _canon(rows)
+
+    def close(self, ok: bool = True) -> None:
+        if not self._fh.closed:
+            self.record("run_end", ok=ok)
+            self._fh.close()
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self.close(ok=exc_type is None)
+
+
+class NullJournal:
+    """不落盘的断点日志（页面模拟器、微基准用）：接口同 RunJournal，不记录、不确认任何页。"""
+
+    def record(self, event: str, page: Optional[int] = None, rows: Optional[List[RowTarget]] = None, **extra: Any) -> None:
+        pass
+
+    def page_confirmed(self, page: int, rows: List[RowTarget]) -> bool:
+        return False
+
+    def close(self, ok: bool = True) -> None:
+        pass
+
+    def __enter__(self) -> "NullJournal":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        pass
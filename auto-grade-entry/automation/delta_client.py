@@ -0,0 +1,180 @@
+"""
+行级增量上传：只把改动过的行发给服务器（PATCH /api/state/rows），代替整份 PUT /api/state。
+
+- fetch_state_versioned()：GET /api/state，同时拿到版本号（响应体 version，或 ETag）；
+- diff_rows()：对比改动前后的 state，按行 id 产出只含变化字段的增量；
+- push_changes()：只有行变化时走增量；选中的班级/课程、搜索词等顶层字段也变了时走整份 PUT（同样带版本校验），
+  否则这些字段到不了服务器，回读和网页都还停在旧的选择上；
+- push_row_deltas()：全部增量一次 PATCH（带 If-Match: "<version>"），服务器整批原子生效，
+  不会出现前几批已写入、后一批冲突的半截状态；版本不符（409，别人/网页在此期间保存过）抛 VersionConflict，
+  由调用方重新拉取后重做。改动超过服务器单次上限（MAX_DELTA_ROWS）或老版本服务器没有该接口（404/405）时退回整份 PUT。
+
+上传体积与服务器写盘开销只跟改动行数有关，与名单大小无关。
+
+用法（把 after.json 相对服务器当前 state 的改动推上去）：
+  python automation/delta_client.py --url http://localhost:5173 --user teacher1 --password *** --state after.json
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from grade_state import ROW_DELTA_FIELDS
+from run_api_driver import _raise_for_api, login, make_client
+
+# 与 server/server.js 的 MAX_DELTA_ROWS 一致：单次 PATCH 的行数上限
+MAX_DELTA_ROWS = 5000
+
+
+class VersionConflict(RuntimeError):
+    """服务器上的 state 已被别处改过（409）；server_version 为服务器当前版本。"""
+
+    def __init__(self, server_version: Optional[int]) -> None:
+        super().__init__(f"服务器上的成绩已被修改（当前版本 {server_version}），请重新拉取后再提交。")
+        self.server_version = server_version
+
+
+def _etag_version(resp: httpx.Response) -> Optional[int]:
+    tag = (resp.headers.get("ETag") or "").strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    return int(tag) if tag.isdigit() else None
+
+
+def _version_of(resp: httpx.Response, data: Dict[str, Any]) -> Optional[int]:
+    v = data.get("version")
+    return v if isinstance(v, int) else _etag_version(resp)
+
+
+def fetch_state_versioned(client: httpx.Client) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+    """返回 (state, version)；老服务器不带版本时 version 为 None（之后的上传不做版本校验）。"""
+    resp = client.get("/api/state")
+    data = _raise_for_api(resp)
+    return data.get("state"), _version_of(resp, data)
+
+
+def diff_rows(before: Dict[str, Any], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    按行 id 对比，返回 [{id, <变化的字段>...}]（只含 ROW_DELTA_FIELDS 中真正变了的字段）。
+    after 里新增/删除的行、以及名单字段的变化都不在增量范围内，出现时抛 ValueError（应改用整份 PUT）。
+    """
+    old = {r.get("id"): r for r in before.get("rows") or []}
+    new_ids = [r.get("id") for r in after.get("rows") or []]
+    if set(new_ids) != set(old):
+        raise ValueError("名单的行发生了增删，不能用行级增量上传。")
+    deltas: List[Dict[str, Any]] = []
+    for r in after.get("rows") or []:
+        o = old[r.get("id")]
+        if any(o.get(k) != r.get(k) for k in r.keys() - set(ROW_DELTA_FIELDS) - {"id"}):
+            raise ValueError(f"行 {r.get('id')} 的名单信息有变化，不能用行级增量上传。")
+        changed = {k: r.get(k) for k in ROW_DELTA_FIELDS if o.get(k) != r.get(k)}
+        if changed:
+            deltas.append({"id": r.get("id"), **changed})
+    return deltas
+
+
+def state_fields_changed(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """
+    after 中与 before 不同的顶层字段（selectedClass/selectedCourse/search 等）；行和 version（服务器维护）不算，
+    after 里没有的字段视为未改动。
+    """
+    keys = after.keys() - {"rows", "version"}
+    return sorted(k for k in keys if before.get(k) != after.get(k))
+
+
+def push_changes(
+    client: httpx.Client,
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+    version: Optional[int],
+) -> Tuple[Optional[int], int, bool]:
+    """
+    把 after 相对 before 的改动推上去，返回 (新版本号, 改动行数, 是否整份 PUT)。
+    顶层字段有变化时整份 PUT，否则只传改动的行。版本不符抛 VersionConflict。
+    """
+    deltas = diff_rows(before, after)
+    if state_fields_changed(before, after) or len(deltas) > MAX_DELTA_ROWS:
+        return put_state_versioned(client, after, version), len(deltas), True
+    return push_row_deltas(client, deltas, version, full_state=after), len(deltas), False
+
+
+def push_row_deltas(
+    client: httpx.Client,
+    deltas: List[Dict[str, Any]],
+    version: Optional[int],
+    full_state: Optional[Dict[str, Any]] = None,
+) -> Optional[int]:
+    """
+    一次 PATCH 上传全部增量（要么全部生效，要么一行不改），返回服务器的最新版本号。
+    full_state：服务器不支持 PATCH（404/405）或改动超过单次上限（413）时用于整份 PUT 的 state；不传则直接报错。
+    """
+    if not deltas:
+        return version
+    if len(deltas) > MAX_DELTA_ROWS and full_state is None:
+        raise ValueError(f"改动 {len(deltas)} 行，超过单次增量上限 {MAX_DELTA_ROWS}，请改用整份 PUT。")
+    resp = None
+    if len(deltas) <= MAX_DELTA_ROWS:
+        headers = {"If-Match": f'"{version}"'} if version is not None else {}
+        resp = client.patch("/api/state/rows", json={"rows": deltas}, headers=headers)
+    if full_state is not None and (resp is None or resp.status_code in (404, 405, 413)):
+        return put_state_versioned(client, full_state, version)
+    if resp.status_code == 409:
+        raise VersionConflict(_version_of(resp, _safe_json(resp)))
+    return _version_of(resp, _raise_for_api(resp))
+
+
+def put_state_versioned(client: httpx.Client, state: Dict[str, Any], version: Optional[int]) -> Optional[int]:
+    """整份覆盖（带版本校验）；返回新版本号。"""
+    headers = {"If-Match": f'"{version}"'} if version is not None else {}
+    resp = client.put("/api/state", json={"state": state}, headers=headers)
+    if resp.status_code == 409:
+        raise VersionConflict(_version_of(resp, _safe_json(resp)))
+    return _version_of(resp, _raise_for_api(resp))
+
+
+def _safe_json(resp: httpx.Response) -> Dict[str, Any]:
+    try:
+        data = resp.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def main() -> int:
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="把本地 state 相对服务器当前 state 的改动，按行增量上传")
+    ap.add_argument("--url", required=True, help="成绩录入系统地址，例如 http://localhost:5173")
+    ap.add_argument("--user", default=os.getenv("GRADE_ENTRY_USER"), help="登录用户名（默认取环境变量 GRADE_ENTRY_USER）")
+    ap.add_argument("--password", default=os.getenv("GRADE_ENTRY_PASSWORD"), help="登录密码（默认取环境变量 GRADE_ENTRY_PASSWORD）")
+    ap.add_argument("--state", required=True, help="改动后的 state JSON（可以是 {state: ...} 或 state 本身）")
+    ap.add_argument("--dry-run", action="store_true", help="只打印会上传多少行，不写服务器")
+    args = ap.parse_args()
+
+    if not args.user or not args.password:
+        ap.error("需要登录账号：--user/--password 或环境变量 GRADE_ENTRY_USER/GRADE_ENTRY_PASSWORD")
+    doc = json.loads(Path(args.state).read_text(encoding="utf-8"))
+    after = doc.get("state", doc) if isinstance(doc, dict) else None
+    if not isinstance(after, dict):
+        ap.error("--state 文件里没有 state 对象")
+    with make_client(args.url) as client:
+        login(client, args.user, args.password)
+        before, version = fetch_state_versioned(client)
+        if not before or not before.get("rows"):
+            raise RuntimeError("服务器上该账号还没有名单（state.rows 为空），请先在网页导入学生名单。")
+        deltas = diff_rows(before, after)
+        fields = state_fields_changed(before, after)
+        print(f"服务器版本 {version}，改动 {len(deltas)} / {len(before['rows'])} 行" + (f"，顶层字段 {fields}" if fields else ""))
+        if args.dry_run or not (deltas or fields):
+            return 0
+        version, _, full = push_changes(client, before, after, version)
+    print(f"✅ 已上传（{'整份' if full else '增量'}），服务器版本 {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
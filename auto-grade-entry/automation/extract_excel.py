@@ -1,5 +1,6 @@
 """
 从 Excel 成绩单导出 grades.json（报表/规范表均兼容）。
+也接受 CSV/TSV（.csv/.tsv/.txt，UTF-8/UTF-8 BOM/GBK 自动识别，见 csv_grid.py）：读成与工作表同形的表格后走同一套规范表/报表识别。
 
 报表解析设计原则（不信版面，只信语义）：
 - 不信版面，只信语义：不依赖列号、空列、合并单元格等版面信息。
@@ -8,11 +9,18 @@
 """
 import argparse
 import json
+import math
 from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import pandas as pd
+from csv_grid import is_csv_path, read_csv_grid
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas 只在真正读 Excel 时导入（read_excel_grades / read_excel_grades_report 内部），
+# 让 --help、参数错误和只引用 GradeRow 的调用方不付出 pandas 的导入开销。
 
 
 @dataclass
@@ -24,6 +32,7 @@ class GradeRow:
     exam: Optional[int]
     final: Optional[int]
     source_row: int
+    student_no: Optional[str] = None
 
 
 def _norm_col(s: str) -> str:
@@ -41,7 +50,7 @@ def _pick_col(columns: List[str], aliases: List[str]) -> Optional[str]:
 def _to_int(v: Any) -> Optional[int]:
     if v is None:
         return None
-    if isinstance(v, float) and pd.isna(v):
+    if isinstance(v, float) and math.isnan(v):
         return None
     if isinstance(v, str) and v.strip() == "":
         return None
@@ -55,11 +64,35 @@ def _to_int(v: Any) -> Optional[int]:
 def _cell_text(v: Any) -> str:
     if v is None:
         return ""
-    if isinstance(v, float) and pd.isna(v):
+    if isinstance(v, float) and math.isnan(v):
         return ""
     return str(v)
 
 
+def _student_no(v: Any) -> Optional[str]:
+    """学号按文本保存；Excel 里存成数字的学号会读成 2023001.0，去掉小数部分。"""
+    if isinstance(v, float) and not math.isnan(v) and v.is_integer():
+        return str(int(v))
+    t = _cell_text(v).strip()
+    return t or None
+
+
+def _load_sheet(
+    excel_path: Path, sheet: Optional[str], header: Optional[int]
+) -> Tuple["pd.DataFrame", Optional[str]]:
+    """
+    读指定（默认第一个）工作表，返回 (表格, 工作表名)。
+    CSV/TSV 没有工作表：名字取 sheet 参数或文件名（报表按工作表名识别「考查科目」）。
+    """
+    if is_csv_path(excel_path):
+        return read_csv_grid(excel_path, header=header), sheet or Path(excel_path).stem
+    import pandas as pd
+
+    with pd.ExcelFile(excel_path) as xf:
+        resolved_sheet = sheet if sheet is not None else xf.sheet_names[0]
+        return xf.parse(resolved_sheet, header=header), resolved_sheet
+
+
 def _find_cell_contains(df: "pd.DataFrame", keyword: str, max_rows: int = 40) -> Optional[Tuple[int, int]]:
     rmax = min(max_rows, len(df))
     for r in range(rmax):
@@ -259,9 +292,9 @@ def read_excel_grades_report(
       读取 Excel → 识别课程（一次）→ 按行扫描 → 每一行识别 0/1/2 个学生 → 全部塞进同一个 Course
     绝对不做：发现新成绩表头 → new Course()
     """
-    sheet_name = sheet if sheet is not None else 0
-    resolved_sheet = sheet if sheet is not None else pd.ExcelFile(excel_path).sheet_names[0]
-    df = pd.read_excel(excel_path, sheet_name=sheet_name, header=None)
+    import pandas as pd
+
+    df, resolved_sheet = _load_sheet(excel_path, sheet, header=None)
 
     # ---------- Step 1：提前定位“姓名列”（可能有多个，如左栏 2、右栏 14），只做一次 ----------
     name_row: Optional[int] = None
@@ -280,6 +313,14 @@ def read_excel_grades_report(
     if name_row is None or not name_cols:
         raise ValueError("Excel 未找到“姓名”表头。该文件可能不是可解析的表格（例如扫描件/图片）。")
 
+    # 学号列（可选）：与姓名列同一表头行；每个姓名列取它左侧、且不越过上一姓名列的最近一个
+    no_cols = [c for c in range(df.shape[1]) if "学号" in _cell_text(df.iat[name_row, c])]
+
+    def student_no_col(name_col: int) -> Optional[int]:
+        prev = max([c for c in name_cols if c < name_col], default=-1)
+        left = [c for c in no_cols if prev < c < name_col]
+        return left[-1] if left else None
+
     score_row = name_row + 1
     if score_row >= len(df):
         score_row = name_row
@@ -324,7 +365,7 @@ def read_excel_grades_report(
 
     # ---------- 为每个姓名列建立「相对列偏移」：姓名列 → 平时列、考试列（不写死列号，兼容中间空列） ----------
     groups: List[Dict[str, Any]] = []
-    column_groups: List[Tuple[int, int, int, Optional[float], Optional[float]]] = []
+    column_groups: List[Tuple[int, int, int, Optional[float], Optional[float], Optional[int]]] = []
     for name_col in name_cols:
         usual_col: Optional[int] = None
         for c in range(name_col + 1, df.shape[1]):
@@ -360,10 +401,12 @@ def read_excel_grades_report(
             and 0 < w_exam <= 1
             and abs((w_usual + w_exam) - 1) < 0.02
         )
+        no_col = student_no_col(name_col)
         groups.append({
             "name_col": name_col,
             "usual_col": usual_col,
             "exam_col": exam_col,
+            "student_no_col": no_col,
             "weights": {"usual": w_usual, "exam": w_exam} if has_weights else None,
         })
         column_groups.append((
@@ -372,6 +415,7 @@ def read_excel_grades_report(
             exam_col,
             w_usual if has_weights else None,
             w_exam if has_weights else None,
+            no_col,
         ))
 
     # ---------- Step 2：逐行扫描（单行驱动）。一行可解析 0/1/2 个学生，全部塞进同一个 Course ----------
@@ -381,7 +425,7 @@ def read_excel_grades_report(
     #         if 合法学生姓名(name): addStudent(course, parseStudent(row, nameCol))
     by_name: Dict[str, GradeRow] = {}
     for r in range(data_start, len(df)):
-        for name_col, usual_col, exam_col, w_usual, w_exam in column_groups:
+        for name_col, usual_col, exam_col, w_usual, w_exam, no_col in column_groups:
             name = _cell_text(df.iat[r, name_col]).strip()
             # 防炸 1：排除表头（学生姓名、空、null）
             if _is_header_or_empty_name(name):
@@ -411,6 +455,7 @@ def read_excel_grades_report(
                 exam=exam,
                 final=final,
                 source_row=int(r) + 1,
+                student_no=_student_no(df.iat[r, no_col]) if no_col is not None else None,
             )
 
     rows = list(by_name.values())
@@ -438,9 +483,9 @@ def read_excel_grades(
     default_class: Optional[str],
     default_course: Optional[str],
 ) -> Tuple[List[GradeRow], Dict[str, Any]]:
-    sheet_name = sheet if sheet is not None else 0
-    resolved_sheet = sheet if sheet is not None else pd.ExcelFile(excel_path).sheet_names[0]
-    df = pd.read_excel(excel_path, sheet_name=sheet_name)
+    import pandas as pd
+
+    df, resolved_sheet = _load_sheet(excel_path, sheet, header=0)
     df = df.copy()
     df.columns = [str(c).strip() for c in df.columns]
 
@@ -450,6 +495,7 @@ def read_excel_grades(
     col_course = _pick_col(cols, ["课程", "course", "科目", "学科"])
     col_usual = _pick_col(cols, ["平时成绩", "平时", "usual", "平时分", "过程性评价"])
     col_exam = _pick_col(cols, ["考试成绩", "考试", "exam", "期末", "期末成绩"])
+    col_no = _pick_col(cols, ["学号", "学籍号", "student_no", "studentno", "studentid"])
 
     # 如果不是“规范表格”（例如报表格式，列名全是 Unnamed），走报表解析
     if not col_name:
@@ -493,6 +539,7 @@ def read_excel_grades(
                 exam=exam,
                 final=final,
                 source_row=int(i) + 2,  # +2：Excel 通常 1 行表头
+                student_no=_student_no(r.get(col_no)) if col_no else None,
             )
         )
 
@@ -506,16 +553,44 @@ def read_excel_grades(
             "course": col_course,
             "usual": col_usual,
             "exam": col_exam,
+            "student_no": col_no,
         },
         "count": len(rows),
     }
     return rows, meta
 
 
+def grades_payload(rows: List[GradeRow], meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": meta,
+        "grades": [asdict(x) for x in rows],
+    }
+
+
+def extract_grades_json(
+    excel_path: Path,
+    sheet: Optional[str] = None,
+    default_class: Optional[str] = None,
+    default_course: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], bytes]:
+    """
+    读 Excel 并序列化成 grades.json 的字节内容，返回 (grades 列表, 字节内容)；字节与 main 写出的文件一致。
+    模块级函数、结果只含基本类型：可以直接交给线程池/进程池并行解析。
+    """
+    rows, meta = read_excel_grades(
+        excel_path=excel_path,
+        sheet=sheet,
+        default_class=default_class,
+        default_course=default_course,
+    )
+    payload = grades_payload(rows, meta)
+    return payload["grades"], json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+
+
 def main() -> int:
     p = argparse.ArgumentParser(description="从 Excel 成绩单导出 grades.json（给自动化脚本使用）")
-    p.add_argument("--excel", required=True, help="Excel 路径，例如 data.xlsx")
-    p.add_argument("--sheet", default=None, help="工作表名称（不填则读取第一个）")
+    p.add_argument("--excel", required=True, help="Excel 或 CSV/TSV 路径，例如 data.xlsx、data.csv")
+    p.add_argument("--sheet", default=None, help="工作表名称（不填则读取第一个；CSV 无工作表，此值只用于识别考查科目，默认取文件名）")
     p.add_argument("--out", required=True, help="输出 JSON 路径，例如 automation/grades.json")
     p.add_argument("--default-class", default=None, help="当 Excel 没有班级列时使用")
     p.add_argument("--default-course", default=None, help="当 Excel 没有课程列时使用")
@@ -525,20 +600,16 @@ def main() -> int:
     out_path = Path(args.out).expanduser().resolve()
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    rows, meta = read_excel_grades(
-        excel_path=excel_path,
-        sheet=args.sheet,
-        default_class=args.default_class,
-        default_course=args.default_course,
-    )
+    grades, raw = extract_grades_json(excel_path, args.sheet, args.default_class, args.default_course)
+    out_path.write_bytes(raw)
+    print(f"已导出：{out_path}（{len(grades)} 条）")
 
-    payload = {
-        "meta": meta,
-        "grades": [asdict(x) for x in rows],
-    }
+    # 顺手建好查询索引（<out 同名>.grades.sqlite），并把重复的姓名/学号报出来
+    from grade_store import GradeStore, default_store_path, print_duplicates
 
-    out_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"已导出：{out_path}（{len(rows)} 条）")
+    with GradeStore.for_json(out_path) as store:
+        print_duplicates(store.duplicates())
+    print(f"索引：{default_store_path(out_path)}")
     return 0
 
 
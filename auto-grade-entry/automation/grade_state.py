@@ -0,0 +1,116 @@
+"""
+成绩录入网页 state 的 Python 侧语义（与 web/app.js 保持一致）。
+
+state 结构见 server/data/states/*.json：
+  { rows: [{id, className, name, course, usual, exam, dirty, submitted, submittedAt, lastUpdatedAt}],
+    selectedClass, selectedCourse, pageSize, pageIndex, search, ... }
+
+这里只复刻自动化用得到的几条规则：
+- clamp_int：同 app.js clampInt（空 → None，非数字 → None，四舍五入后夹到 [0, 100]）
+- set_row_scores：同钩子 setRowScores（写入后 dirty=True、submitted=False、submittedAt=None）
+- filtered_rows / submit_rows：同 getFilteredRows / submitAllDirty（只提交当前班级+课程的 dirty 行）
+- select_if_present / clear_unsubmitted：同 #classSelect/#courseSelect 的 change（切走时清空原班级/课程的未提交成绩）
+- ROW_DELTA_FIELDS：行级增量（PATCH /api/state/rows）允许改的字段，同 server/storage.js
+"""
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# 与 server/storage.js 的 ROW_DELTA_FIELDS 一致：名单信息（姓名、班级等）只能整份 PUT
+ROW_DELTA_FIELDS = ("usual", "exam", "dirty", "submitted", "submittedAt", "lastUpdatedAt")
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def clamp_int(v: Any, lo: int = 0, hi: int = 100) -> Optional[int]:
+    """对应 app.js 的 clampInt：Math.round 是「.5 向上」，不是 Python 的银行家舍入。"""
+    if v is None or v == "":
+        return None
+    if isinstance(v, str) and not v.strip():
+        n = 0.0  # JS: Number("  ") === 0
+    else:
+        try:
+            n = float(v.strip()) if isinstance(v, str) else float(v)
+        except (TypeError, ValueError):
+            return None
+    if math.isnan(n):
+        return None
+    if math.isinf(n):
+        return hi if n > 0 else lo
+    r = math.floor(n + 0.5)
+    return min(hi, max(lo, r))
+
+
+def set_row_scores(row: Dict[str, Any], usual: Any, exam: Any, ts: Optional[int] = None) -> Dict[str, Any]:
+    """返回写入成绩后的新行（不修改入参），语义同钩子 setRowScores。"""
+    updated = dict(row)
+    updated["usual"] = clamp_int(usual)
+    updated["exam"] = clamp_int(exam)
+    updated["dirty"] = True
+    updated["submitted"] = False
+    updated["submittedAt"] = None
+    updated["lastUpdatedAt"] = ts if ts is not None else now_ms()
+    return updated
+
+
+def filtered_rows(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """当前班级+课程下、按搜索词过滤后的行（getFilteredRows）。"""
+    cls = state.get("selectedClass")
+    course = state.get("selectedCourse")
+    rows = [r for r in state.get("rows", []) if r.get("className") == cls and r.get("course") == course]
+    kw = str(state.get("search") or "").strip()
+    if kw:
+        rows = [r for r in rows if kw in str(r.get("name", ""))]
+    return rows
+
+
+def submit_rows(state: Dict[str, Any], ids: Optional[Iterable[str]] = None, ts: Optional[int] = None) -> List[str]:
+    """
+    提交 dirty 行（原地修改 state.rows），返回被提交的行 id。
+    只提交当前班级+课程的行；ids 非空时再限定在这些行内（submitCurrentPage），否则等同 submitAllDirty。
+    """
+    only = set(ids) if ids is not None else None
+    cls = state.get("selectedClass")
+    course = state.get("selectedCourse")
+    ts = ts if ts is not None else now_ms()
+    submitted: List[str] = []
+    rows = state.get("rows", [])
+    for i, r in enumerate(rows):
+        if only is not None and r.get("id") not in only:
+            continue
+        if not r.get("dirty"):
+            continue
+        if r.get("className") != cls or r.get("course") != course:
+            continue
+        rows[i] = {**r, "dirty": False, "submitted": True, "submittedAt": ts}
+        submitted.append(r.get("id"))
+    return submitted
+
+
+def clear_unsubmitted(state: Dict[str, Any], key: str, value: Any, ts: Optional[int] = None) -> None:
+    """同 clearUnsubmittedScoresForClass/ForCourse：key 为 className 或 course，已提交的行不动。"""
+    ts = now_ms() if ts is None else ts
+    rows = state.get("rows", [])
+    for i, r in enumerate(rows):
+        if r.get(key) == value and r.get("dirty") is True and r.get("submitted") is not True:
+            rows[i] = {**r, "usual": None, "exam": None, "dirty": False, "lastUpdatedAt": ts}
+
+
+def select_if_present(state: Dict[str, Any], class_name: Optional[str], course: Optional[str]) -> None:
+    """
+    对应批量脚本里的 select_option(#classSelect/#courseSelect)：只有网页下拉里存在该值时才切换。
+    下拉选项来自行数据，这里以「rows 中出现过」近似。
+    切换到不同的班级/课程时与网页一样清空原班级/课程的未提交成绩，并回到第 1 页，
+    免浏览器写回后的 state 与浏览器路径一致。
+    """
+    rows = state.get("rows", [])
+    for key, state_key, value in (("className", "selectedClass", class_name), ("course", "selectedCourse", course)):
+        if not value or not any(r.get(key) == value for r in rows):
+            continue
+        previous = state.get(state_key)
+        if previous != value:
+            clear_unsubmitted(state, key, previous)
+        state[state_key] = value
+        state["pageIndex"] = 1
@@ -0,0 +1,369 @@
+"""
+grades.json 的 SQLite 索引：按姓名、(班级, 课程, 姓名)、学号三种键查找都走索引，批量取数一次查询。
+
+- 缓存文件：<grades 同名>.grades.sqlite，记录来源 JSON 的大小/修改时间与表结构版本，任一变化即重建；
+  交互式改分时查一个人只打开索引，不再解析整份 JSON。
+- 重复键不静默覆盖：同一姓名、同一 (班级, 课程, 姓名)、同一学号出现多次时，duplicates() 列出全部冲突行。
+  单键查找仍按「后出现的记录优先」（与旧的 build_grade_map 一致）。
+- 班级取 class_name，没有时取 className（手写 grades.json 常照网页 state 的写法）。
+- 姓名键：NFKC（全角 → 半角）后去掉所有空白，「张 三」「张三」视为同一人；返回的记录保留原样。
+  网页钩子（web/app.js 的 normalizeName）用同一规则，两侧对同一姓名得到同一个键。
+- NameIndex：录入时用的内存匹配索引，按学号/班级/课程消歧，写入前用 preflight() 一次报告缺失与同名无法区分的行。
+
+用法：
+  python automation/grade_store.py --grades automation/grades.json                 # 建索引并报告重复键
+  python automation/grade_store.py --grades automation/grades.json --name 张三     # 查一个人
+"""
+import argparse
+import json
+import os
+import sqlite3
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA_VERSION = "2"
+
+# SQLite 默认单条语句最多 999 个参数，批量 IN 查询按块拆分
+_IN_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE grades (
+    seq INTEGER PRIMARY KEY,
+    name_key TEXT NOT NULL,
+    class_name TEXT,
+    course TEXT,
+    student_no TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX idx_grades_name ON grades (name_key);
+CREATE INDEX idx_grades_scope ON grades (class_name, course, name_key);
+CREATE INDEX idx_grades_student_no ON grades (student_no);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def normalize_name(name: Any) -> str:
+    return "".join(unicodedata.normalize("NFKC", str(name or "")).split())
+
+
+def _opt_text(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    s = str(v).strip()
+    return s if s and s.lower() != "nan" else None
+
+
+def load_grades_json(path: Path) -> List[Dict[str, Any]]:
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict) and "grades" in payload and isinstance(payload["grades"], list):
+        return payload["grades"]
+    raise ValueError("grades.json 格式不支持：需要是 list 或包含 grades 字段的 dict。")
+
+
+def class_of(g: Dict[str, Any]) -> Optional[str]:
+    """记录的班级；兼容手写 grades.json 里的 className（网页 state 的写法）。"""
+    return _opt_text(g.get("class_name")) or _opt_text(g.get("className"))
+
+
+def default_store_path(grades_path: Path) -> Path:
+    return grades_path.with_name(grades_path.stem + ".grades.sqlite")
+
+
+def _source_signature(grades_path: Path) -> str:
+    st = grades_path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _fill(conn: sqlite3.Connection, grades: Iterable[Dict[str, Any]]) -> None:
+    conn.executescript(_SCHEMA)
+    conn.executemany(
+        "INSERT INTO grades (name_key, class_name, course, student_no, record) VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                normalize_name(g.get("name")),
+                class_of(g),
+                _opt_text(g.get("course")),
+                _opt_text(g.get("student_no")),
+                json.dumps(g, ensure_ascii=False),
+            )
+            for g in grades
+            if normalize_name(g.get("name"))
+        ),
+    )
+
+
+class GradeStore:
+    """只读的成绩索引。用 from_grades（内存）或 for_json（磁盘缓存）创建。"""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    @classmethod
+    def from_grades(cls, grades: Iterable[Dict[str, Any]]) -> "GradeStore":
+        conn = sqlite3.connect(":memory:")
+        _fill(conn, grades)
+        return cls(conn)
+
+    @classmethod
+    def for_json(cls, grades_path: Path, rebuild: bool = False) -> "GradeStore":
+        """打开 grades.json 对应的索引文件；不存在、过期或 rebuild=True 时重新解析 JSON 并建索引。"""
+        db_path = default_store_path(grades_path)
+        signature = _source_signature(grades_path)
+        if not rebuild and db_path.is_file():
+            conn = sqlite3.connect(db_path)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+            except sqlite3.DatabaseError:
+                meta = {}
+            if meta.get("schema") == SCHEMA_VERSION and meta.get("source") == signature:
+                return cls(conn)
+            conn.close()
+
+        grades = load_grades_json(grades_path)
+        tmp = db_path.with_suffix(".sqlite.tmp")
+        tmp.unlink(missing_ok=True)
+        conn = sqlite3.connect(tmp)
+        try:
+            _fill(conn, grades)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [("schema", SCHEMA_VERSION), ("source", signature)])
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp, db_path)  # 先写临时文件再替换，并发读者不会看到半成品
+        return cls(sqlite3.connect(db_path))
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "GradeStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+
+    def _records(self, sql: str, params: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        return [json.loads(r[0]) for r in self._conn.execute(sql, tuple(params))]
+
+    def all(self) -> List[Dict[str, Any]]:
+        return self._records("SELECT record FROM grades ORDER BY seq")
+
+    def select(self, class_name: Optional[str] = None, course: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按班级/课程过滤（None 表示不限），保持原始顺序。"""
+        where, params = [], []
+        if class_name is not None:
+            where.append("class_name = ?")
+            params.append(class_name)
+        if course is not None:
+            where.append("course = ?")
+            params.append(course)
+        cond = f" WHERE {' AND '.join(where)}" if where else ""
+        return self._records(f"SELECT record FROM grades{cond} ORDER BY seq", params)
+
+    def by_name(self, name: str) -> List[Dict[str, Any]]:
+        """同名的全部记录（可能跨班级/课程）。"""
+        return self._records("SELECT record FROM grades WHERE name_key = ? ORDER BY seq", (normalize_name(name),))
+
+    def get(
+        self,
+        name: Optional[str] = None,
+        class_name: Optional[str] = None,
+        course: Optional[str] = None,
+        student_no: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        单条查找：给了学号按学号；否则按姓名，给了班级/课程时在该范围内查（None 表示不限）。
+        有重复时取后出现的记录（重复键请用 duplicates() 报告）。
+        """
+        if student_no is not None:
+            rows = self._records(
+                "SELECT record FROM grades WHERE student_no = ? ORDER BY seq DESC LIMIT 1", (str(student_no).strip(),)
+            )
+        else:
+            where, params = ["name_key = ?"], [normalize_name(name)]
+            if class_name is not None:
+                where.append("class_name = ?")
+                params.append(class_name)
+            if course is not None:
+                where.append("course = ?")
+                params.append(course)
+            rows = self._records(
+                f"SELECT record FROM grades WHERE {' AND '.join(where)} ORDER BY seq DESC LIMIT 1", params
+            )
+        return rows[0] if rows else None
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """批量按姓名取数：返回 {归一化姓名: 记录}，找不到的姓名不出现在结果里。"""
+        keys = sorted({normalize_name(n) for n in names} - {""})
+        out: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(keys), _IN_CHUNK):
+            chunk = keys[i : i + _IN_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for key, record in self._conn.execute(
+                f"SELECT name_key, record FROM grades WHERE name_key IN ({marks}) ORDER BY seq", chunk
+            ):
+                out[key] = json.loads(record)
+        return out
+
+    def grade_map(self) -> Dict[str, Dict[str, Any]]:
+        """{归一化姓名: 记录}，整表一次读出；查找时用 normalize_name(网页上的姓名)。"""
+        rows = self._conn.execute("SELECT name_key, record FROM grades ORDER BY seq")
+        return {key: json.loads(record) for key, record in rows}
+
+    def duplicates(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        重复键：{"name": [...], "class_course_name": [...], "student_no": [...]}，
+        每项为 {"key": 键, "count": 出现次数, "source_rows": [Excel 行号...]}。
+        """
+        queries = {
+            "name": ("name_key", "name_key"),
+            "class_course_name": (
+                "COALESCE(class_name, '') || ' / ' || COALESCE(course, '') || ' / ' || name_key",
+                "class_name, course, name_key",
+            ),
+            "student_no": ("student_no", "student_no"),
+        }
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for kind, (label, cols) in queries.items():
+            where = " WHERE student_no IS NOT NULL" if kind == "student_no" else ""
+            rows = self._conn.execute(
+                f"SELECT {label}, COUNT(*), GROUP_CONCAT(json_extract(record, '$.source_row')) "
+                f"FROM grades{where} GROUP BY {cols} HAVING COUNT(*) > 1 ORDER BY MIN(seq)"
+            ).fetchall()
+            out[kind] = [
+                {"key": key, "count": count, "source_rows": [int(x) for x in (srcs or "").split(",") if x]}
+                for key, count, srcs in rows
+            ]
+        return out
+
+
+MATCHED = "matched"
+MISSING = "missing"
+AMBIGUOUS = "ambiguous"
+
+
+class NameIndex:
+    """
+    名单匹配索引：归一化姓名 → 成绩记录列表，每次运行建一次，之后逐行 O(1) 查找。
+    同名多条时依次按学号、班级、课程消歧；剩下的多条成绩完全相同视为同一人（Excel 里重复列出），否则为 ambiguous。
+    """
+
+    def __init__(self, grades: Iterable[Dict[str, Any]]) -> None:
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        for g in grades:
+            key = normalize_name(g.get("name"))
+            if key:
+                self._by_key.setdefault(key, []).append(g)
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def resolve(
+        self,
+        name: Any,
+        class_name: Optional[str] = None,
+        course: Optional[str] = None,
+        student_no: Any = None,
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """返回 (记录, 状态)；状态为 MATCHED / MISSING / AMBIGUOUS，后两者记录为 None。"""
+        cands = self._by_key.get(normalize_name(name)) or []
+        no = _opt_text(student_no)
+        if len(cands) > 1 and no:
+            cands = [g for g in cands if _opt_text(g.get("student_no")) == no] or cands
+        if len(cands) > 1 and class_name is not None:
+            cands = [g for g in cands if not class_of(g) or class_of(g) == class_name]
+        if len(cands) > 1 and course is not None:
+            cands = [g for g in cands if not _opt_text(g.get("course")) or _opt_text(g.get("course")) == course]
+        if not cands:
+            return None, MISSING
+        if len({(g.get("usual"), g.get("exam")) for g in cands}) > 1:
+            return None, AMBIGUOUS
+        return cands[-1], MATCHED
+
+    def resolve_row(self, row: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], str]:
+        """按网页 state 里的一行（name / className / course / studentNo）查找。"""
+        return self.resolve(row.get("name"), row.get("className"), row.get("course"), row.get("studentNo"))
+
+    def preflight(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        写入前一次性比对整份名单：{"matched": 命中行数, "missing": [网页有、成绩里没有], "ambiguous": [无法区分的同名],
+        "unused": [成绩里有、网页名单里没有]}。
+        """
+        matched = 0
+        missing: List[str] = []
+        ambiguous: List[str] = []
+        seen: set = set()
+        for r in rows:
+            _, status = self.resolve_row(r)
+            seen.add(normalize_name(r.get("name")))
+            if status == MATCHED:
+                matched += 1
+            elif status == MISSING:
+                missing.append(str(r.get("name", "")))
+            else:
+                ambiguous.append(str(r.get("name", "")))
+        unused = [str(gs[0].get("name", "")) for key, gs in self._by_key.items() if key not in seen]
+        return {"matched": matched, "missing": missing, "ambiguous": ambiguous, "unused": unused}
+
+
+def print_preflight(report: Dict[str, Any]) -> None:
+    def head(xs: List[str]) -> str:
+        return f"{xs[:10]}{'...' if len(xs) > 10 else ''}"
+
+    print(
+        f"名单预检：命中 {report['matched']} 行，网页有但成绩缺失 {len(report['missing'])}，"
+        f"同名无法区分 {len(report['ambiguous'])}，成绩有但网页没有 {len(report['unused'])}"
+    )
+    if report["ambiguous"]:
+        print(f"  同名无法区分（不写入，请补学号/班级）：{head(report['ambiguous'])}")
+    if report["missing"]:
+        print(f"  网页有但成绩缺失：{head(report['missing'])}")
+    if report["unused"]:
+        print(f"  成绩有但网页名单没有：{head(report['unused'])}")
+
+
+def print_duplicates(dups: Dict[str, List[Dict[str, Any]]]) -> int:
+    """打印重复键，返回冲突键的总数（0 表示没有重复）。"""
+    labels = {"name": "姓名", "class_course_name": "班级/课程/姓名", "student_no": "学号"}
+    total = sum(len(v) for v in dups.values())
+    if not total:
+        return 0
+    print("⚠️ grades 中有重复键（单键查找取后出现的记录，请核对）：")
+    for kind, items in dups.items():
+        for d in items[:10]:
+            print(f"  {labels[kind]} {d['key']}：{d['count']} 条（Excel 行 {d['source_rows']}）")
+        if len(items) > 10:
+            print(f"  {labels[kind]} 另有 {len(items) - 10} 个重复键未列出")
+    return total
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="为 grades.json 建 SQLite 索引（姓名/班级+课程+姓名/学号），报告重复键或查询单人")
+    ap.add_argument("--grades", required=True, help="grades.json 路径（extract_excel.py 输出）")
+    ap.add_argument("--rebuild", action="store_true", help="忽略已有索引，强制重建")
+    ap.add_argument("--name", default=None, help="按姓名查询（可配合 --class/--course 限定范围）")
+    ap.add_argument("--class", dest="class_name", default=None, help="班级")
+    ap.add_argument("--course", default=None, help="课程")
+    ap.add_argument("--student-no", default=None, help="按学号查询")
+    args = ap.parse_args()
+
+    grades_path = Path(args.grades).expanduser().resolve()
+    with GradeStore.for_json(grades_path, rebuild=args.rebuild) as store:
+        if args.name is None and args.student_no is None:
+            print(f"索引：{default_store_path(grades_path)}（{len(store)} 条）")
+            return 1 if print_duplicates(store.duplicates()) else 0
+        g = store.get(args.name, args.class_name, args.course, args.student_no)
+        if g is None:
+            print("未找到。")
+            return 1
+        print(json.dumps(g, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,291 @@
+"""
+多工作簿作业队列：按清单（manifest）批量跑「Excel 解析 → 批量分页录入 → 提交」，期末一次性录完整个院系的成绩单。
+
+- 解析：所有作业一开始就提交到进程池（pandas 解析吃 CPU，多进程不争 GIL）；
+- 录入：共用一个 Chromium，同时最多 --contexts 个作业各开一个 context（指定 --browser-service 时各自申请租约）；
+  先解析完的作业先排队拿 context，解析与录入两边同时有活干；
+- 每个作业用自己的账号登录；录入失败按 --job-retries 重试（以断点续跑方式，已确认提交的页不重做；指定 --resume 时第一次尝试也如此），解析失败不重试；
+- 结束打印汇总表，并写 JSON 汇总（默认 <清单同名>.summary.json）。
+
+清单（JSON）：作业数组，或 {"defaults": {...}, "jobs": [...]}，defaults 中的字段作为每个作业的默认值。
+  {
+    "defaults": {"url": "http://localhost:5173", "user": "teacher1", "password_env": "GRADE_ENTRY_PASSWORD"},
+    "jobs": [
+      {"excel": "一班数学.xlsx", "class": "一班", "course": "数学"},
+      {"excel": "二班.xlsx", "sheet": "语文", "user": "teacher2", "password": "..."}
+    ]
+  }
+作业字段：excel（必填）、url（必填）、sheet、class、course、user、password / password_env、page_size、out、name。
+相对路径相对于清单所在目录；未写账号时使用环境变量 GRADE_ENTRY_USER / GRADE_ENTRY_PASSWORD（都没有则不登录）。
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from run_full_pipeline import write_artifact
+
+STATUS_DONE = "完成"
+STATUS_UNCLEAN = "未完成"
+STATUS_FAILED = "失败"
+STATUS_EXTRACT_FAILED = "解析失败"
+
+
+@dataclass
+class Job:
+    index: int
+    name: str
+    excel: Path
+    url: str
+    out: Path
+    sheet: Optional[str] = None
+    class_name: Optional[str] = None
+    course: Optional[str] = None
+    user: Optional[str] = None
+    password: Optional[str] = None
+    page_size: int = 10
+
+
+@dataclass
+class JobResult:
+    index: int
+    name: str
+    status: str = STATUS_FAILED
+    rows: int = 0
+    filled: int = 0
+    attempts: int = 0
+    extract_wait_s: float = 0.0
+    fill_s: float = 0.0
+    rc: Optional[int] = None
+    reconciliation: Optional[Dict[str, int]] = None
+    detail: str = ""
+
+
+def load_manifest(manifest_path: Path, out_dir: Path, page_size: int = 10) -> List[Job]:
+    payload = json.loads(manifest_path.read_text(encoding="utf-8"))
+    defaults: Dict[str, Any] = {}
+    if isinstance(payload, dict):
+        defaults = payload.get("defaults") or {}
+        payload = payload.get("jobs")
+    if not isinstance(payload, list) or not payload:
+        raise ValueError("清单格式不支持：需要是作业数组，或包含非空 jobs 字段的 dict。")
+
+    base = manifest_path.parent
+    jobs: List[Job] = []
+    for i, raw in enumerate(payload, 1):
+        spec = {**defaults, **raw}
+        if not spec.get("excel") or not spec.get("url"):
+            raise ValueError(f"清单第 {i} 个作业缺少 excel 或 url。")
+        excel = (base / spec["excel"]).resolve()
+        sheet = spec.get("sheet")
+        user = spec.get("user") or os.getenv("GRADE_ENTRY_USER") or None
+        password = spec.get("password")
+        if password is None and spec.get("password_env"):
+            password = os.getenv(spec["password_env"])
+        if password is None:
+            password = os.getenv("GRADE_ENTRY_PASSWORD")
+        if user and not password:
+            raise ValueError(f"清单第 {i} 个作业有账号 {user} 但没有密码（password / password_env）。")
+        stem = excel.stem + (f"-{sheet}" if sheet else "")
+        out = (base / spec["out"]).resolve() if spec.get("out") else out_dir / f"{i:02d}-{stem}.grades.json"
+        jobs.append(
+            Job(
+                index=i,
+                name=spec.get("name") or stem,
+                excel=excel,
+                url=spec["url"],
+                out=out,
+                sheet=sheet,
+                class_name=spec.get("class") or spec.get("class_name"),
+                course=spec.get("course"),
+                user=user,
+                password=password if user else None,
+                page_size=int(spec.get("page_size") or page_size),
+            )
+        )
+    return jobs
+
+
+class SharedBrowser:
+    """多个作业共用的本地 Chromium；断开（崩溃）后下一个取用者重新拉起。"""
+
+    def __init__(self, headless: bool, lean: bool) -> None:
+        self.headless = headless
+        self.lean = lean
+        self._pw = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> Any:
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                from lean_profile import LEAN_CHROMIUM_ARGS
+                from playwright.async_api import async_playwright
+
+                if self._pw is None:
+                    self._pw = await async_playwright().start()
+                self._browser = await self._pw.chromium.launch(
+                    headless=self.headless, args=LEAN_CHROMIUM_ARGS if self.lean else None
+                )
+            return self._browser
+
+    async def close(self) -> None:
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._pw is not None:
+            await self._pw.stop()
+
+
+def _read_metrics(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+async def _run_job(
+    job: Job,
+    extraction: "asyncio.Future[Tuple[List[Dict[str, Any]], bytes]]",
+    slots: asyncio.Semaphore,
+    shared: Optional[SharedBrowser],
+    opts: Dict[str, Any],
+) -> JobResult:
+    from run_batch_playwright import run as run_batch
+
+    res = JobResult(index=job.index, name=job.name)
+    t0 = time.perf_counter()
+    try:
+        grades, raw = await extraction
+    except Exception as e:
+        res.status = STATUS_EXTRACT_FAILED
+        res.detail = f"{type(e).__name__}: {e}"
+        print(f"[作业 {job.index} {job.name}] 解析失败：{res.detail}")
+        return res
+    res.extract_wait_s = round(time.perf_counter() - t0, 2)
+    res.rows = len(grades)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, write_artifact, job.out, raw)
+
+    metrics_path = job.out.with_name(job.out.stem + ".metrics.json")
+    retries = opts["job_retries"]
+    async with slots:
+        t1 = time.perf_counter()
+        print(f"[作业 {job.index} {job.name}] 开始录入：{res.rows} 条 → {job.url}")
+        for attempt in range(1, retries + 2):
+            res.attempts = attempt
+            ready = loop.create_future()  # 成绩已在内存里：交给录入的是一个已完成的 future
+            ready.set_result((grades, raw))
+            try:
+                res.rc = await run_batch(
+                    job.url,
+                    job.out,
+                    job.page_size,
+                    opts["headless"],
+                    browser_service=opts["browser_service"],
+                    lean=opts["lean"],
+                    resume=opts["resume"] or attempt > 1,  # 重试时跳过断点日志里已确认提交的页
+                    metrics_path=metrics_path,
+                    pending_grades=ready,
+                    browser=await shared.get() if shared else None,
+                    login=(job.user, job.password) if job.user else None,
+                )
+            except Exception as e:
+                res.rc = None
+                res.detail = f"{type(e).__name__}: {e}"
+            else:
+                res.detail = "" if res.rc == 0 else f"退出码 {res.rc}"
+                if res.rc == 0:
+                    break
+            if attempt <= retries:
+                delay = opts["retry_backoff"] * (2 ** (attempt - 1))
+                print(f"[作业 {job.index} {job.name}] 第 {attempt} 次未完成（{res.detail}），{delay:.1f}s 后重试")
+                await asyncio.sleep(delay)
+        res.fill_s = round(time.perf_counter() - t1, 2)
+
+    metrics = _read_metrics(metrics_path) if res.rc is not None else {}
+    # 作业汇总看整个作业：最后一次尝试实际写入的人数 + 按断点日志跳过的（之前的尝试已写入并提交）
+    res.filled = int(metrics.get("rows") or 0) + int(metrics.get("skipped_rows") or 0)
+    res.reconciliation = metrics.get("reconciliation")
+    if res.rc == 0:
+        res.status = STATUS_DONE
+    elif res.rc is not None:
+        res.status = STATUS_UNCLEAN
+    print(f"[作业 {job.index} {job.name}] {res.status}{'：' + res.detail if res.detail else ''}")
+    return res
+
+
+def print_summary_table(results: List[JobResult], wall_s: float) -> None:
+    print("\n===== 作业汇总 =====")
+    print(f"{'#':>3}  {'作业':<24}{'状态':<8}{'条数':>6}{'已填':>6}{'尝试':>6}{'解析等待(s)':>12}{'录入(s)':>9}  说明")
+    for r in results:
+        recon = r.reconciliation or {}
+        note = r.detail
+        if recon:
+            note = (f"对账：一致 {recon.get('matched', 0)}，不一致 {recon.get('mismatched', 0)}，"
+                    f"未提交 {recon.get('unsubmitted', 0)}，缺失 {recon.get('missing', 0)}") + (f"；{note}" if note else "")
+        print(
+            f"{r.index:>3}  {r.name:<24}{r.status:<8}{r.rows:>6}{r.filled:>6}{r.attempts:>6}"
+            f"{r.extract_wait_s:>12}{r.fill_s:>9}  {note}"
+        )
+    done = sum(1 for r in results if r.status == STATUS_DONE)
+    print(f"完成 {done}/{len(results)} 个作业，已填 {sum(r.filled for r in results)} 条，总耗时 {wall_s:.1f}s")
+
+
+async def run_queue(
+    jobs: List[Job],
+    contexts: int = 2,
+    extract_workers: Optional[int] = None,
+    headless: bool = True,
+    lean: bool = False,
+    browser_service: Optional[str] = None,
+    job_retries: int = 1,
+    retry_backoff: float = 2.0,
+    summary_path: Optional[Path] = None,
+    resume: bool = False,
+) -> int:
+    """跑完清单中的全部作业；全部完成返回 0，否则返回 2。resume：第一次尝试也按断点日志跳过已确认提交的页。"""
+    from extract_excel import extract_grades_json
+
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max(1, contexts))
+    shared = None if browser_service else SharedBrowser(headless, lean)
+    opts = {
+        "headless": headless,
+        "lean": lean,
+        "browser_service": browser_service,
+        "job_retries": max(0, job_retries),
+        "retry_backoff": retry_backoff,
+        "resume": resume,
+    }
+    for job in jobs:
+        job.out.parent.mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=extract_workers) as pool:
+        extractions = [
+            loop.run_in_executor(pool, extract_grades_json, job.excel, job.sheet, job.class_name, job.course)
+            for job in jobs
+        ]
+        try:
+            results = await asyncio.gather(
+                *(_run_job(job, ex, slots, shared, opts) for job, ex in zip(jobs, extractions))
+            )
+        finally:
+            if shared is not None:
+                await shared.close()
+
+    wall_s = time.perf_counter() - t0
+    print_summary_table(results, wall_s)
+    if summary_path is not None:
+        summary_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"wall_s": round(wall_s, 2), "jobs": [{**asdict(r), "out": str(j.out)} for r, j in zip(results, jobs)]}
+        summary_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"汇总：{summary_path}")
+    return 0 if all(r.status == STATUS_DONE for r in results) else 2
@@ -0,0 +1,123 @@
+"""
+无头批量录入用的「精简页面配置」（lean profile）。
+
+批量模式只通过 window.__AUTO_GRADE_ENTRY__ 钩子读写数据，从不看页面：
+- 请求路由里直接拦掉图片、字体、媒体、样式表等非必要资源；
+- 拦掉第三方域名的脚本（如 xlsx CDN，仅网页端「导入 Excel」用得到，钩子不依赖它）；
+- 关闭动画/过渡（reduced_motion + 注入样式），避免提交闪烁等动画拖慢渲染；
+- 使用为自动化调优的 Chromium 启动参数。
+
+measure_load() 用于对比「原行为」与 lean 的加载耗时（run_batch_playwright.py --measure-lean）。
+"""
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet", "texttrack", "manifest"})
+
+# 与 excel-form-fill/fill_form.py 的 --lean 用同一组参数（tools/check_shared_copies.py 校验）
+LEAN_CHROMIUM_ARGS: List[str] = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "--disable-renderer-backgrounding",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--blink-settings=imagesEnabled=false",
+    "--force-prefers-reduced-motion",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+]
+
+NO_ANIMATION_CSS = "*,*::before,*::after{animation:none!important;transition:none!important;caret-color:transparent!important}"
+
+_NO_ANIMATION_SCRIPT = (
+    "document.addEventListener('DOMContentLoaded', () => {"
+    " const s = document.createElement('style');"
+    f" s.textContent = {NO_ANIMATION_CSS!r};"
+    " document.head.appendChild(s);"
+    "});"
+)
+
+
+def _same_site(url: str, origin_host: str) -> bool:
+    host = urlparse(url).hostname or ""
+    if host == origin_host:
+        return True
+    return host in ("", "localhost", "127.0.0.1") and origin_host in ("localhost", "127.0.0.1")
+
+
+async def apply_lean_profile(context, target_url: str, stats: Optional[Dict[str, int]] = None) -> None:
+    """给 BrowserContext 装上资源拦截与关动画脚本；stats 传入时累计 blocked/allowed 计数。"""
+    origin_host = urlparse(target_url).hostname or ""
+
+    async def _route(route) -> None:
+        req = route.request
+        blocked = req.resource_type in BLOCKED_RESOURCE_TYPES or (
+            req.resource_type == "script" and not _same_site(req.url, origin_host)
+        )
+        if stats is not None:
+            key = "blocked" if blocked else "allowed"
+            stats[key] = stats.get(key, 0) + 1
+        if blocked:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", _route)
+    await context.add_init_script(_NO_ANIMATION_SCRIPT)
+
+
+def lean_context_options() -> Dict[str, Any]:
+    """new_context() 的附加参数。"""
+    return {"reduced_motion": "reduce", "service_workers": "block"}
+
+
+async def measure_load(p, url: str, headless: bool = True, repeats: int = 3) -> Dict[str, Any]:
+    """
+    分别以「原行为」与 lean 配置加载页面若干次（每次全新浏览器，冷启动），
+    统计 goto(domcontentloaded) 到钩子就绪的耗时中位数。
+    两种配置逐轮交替、先后顺序轮换，磁盘缓存预热与机器负载的漂移不会只落在一边。
+    """
+
+    async def _once(lean: bool) -> Dict[str, Any]:
+        stats: Dict[str, int] = {}
+        browser = await p.chromium.launch(headless=headless, args=LEAN_CHROMIUM_ARGS if lean else None)
+        try:
+            context = await browser.new_context(**(lean_context_options() if lean else {}))
+            if lean:
+                await apply_lean_profile(context, url, stats)
+            page = await context.new_page()
+            t0 = time.perf_counter()
+            await page.goto(url, wait_until="domcontentloaded")
+            await page.wait_for_function("() => !!window.__AUTO_GRADE_ENTRY__")
+            ms = (time.perf_counter() - t0) * 1000
+        finally:
+            await browser.close()
+        return {"ms": ms, **stats}
+
+    baseline: List[Dict[str, Any]] = []
+    lean: List[Dict[str, Any]] = []
+    for i in range(repeats):
+        for is_lean in ((False, True) if i % 2 == 0 else (True, False)):
+            (lean if is_lean else baseline).append(await _once(is_lean))
+    base_ms = statistics.median(x["ms"] for x in baseline)
+    lean_ms = statistics.median(x["ms"] for x in lean)
+    return {
+        "url": url,
+        "repeats": repeats,
+        "baseline_ms": round(base_ms, 1),
+        "lean_ms": round(lean_ms, 1),
+        "saved_ms": round(base_ms - lean_ms, 1),
+        "saved_pct": round((base_ms - lean_ms) / base_ms * 100, 1) if base_ms else 0.0,
+        "blocked_requests": lean[-1].get("blocked", 0),
+        "allowed_requests": lean[-1].get("allowed", 0),
+    }
@@ -0,0 +1,81 @@
+"""
+批量录入的耗时统计：按操作类型（导航/读取/填写/提交…）记录每次耗时，结束时输出 JSON 报告。
+
+报告字段：
+  ops.<op>: {count, p50_ms, p95_ms, max_ms, total_ms}
+  rows, elapsed_s, rows_per_sec, retries, failures, failed_pages
+"""
+import asyncio
+import json
+import math
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """线性插值分位数（q 取 0–100）；空列表返回 0。"""
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    if len(xs) == 1:
+        return xs[0]
+    k = (len(xs) - 1) * q / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+class RunMetrics:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.samples: Dict[str, List[float]] = {}
+        self.rows = 0
+        self.retries = 0
+        self.failures = 0
+        self.failed_pages: List[int] = []
+        self.extra: Dict[str, Any] = {}
+
+    def observe(self, op: str, seconds: float) -> None:
+        self.samples.setdefault(op, []).append(seconds * 1000.0)
+
+    async def timed(self, op: str, aw: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """计时执行一个操作；timeout（秒）非空时超时抛 asyncio.TimeoutError。失败的耗时同样计入。"""
+        t0 = time.perf_counter()
+        try:
+            if timeout is None:
+                return await aw
+            return await asyncio.wait_for(aw, timeout)
+        finally:
+            self.observe(op, time.perf_counter() - t0)
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        ops = {
+            op: {
+                "count": len(xs),
+                "p50_ms": round(percentile(xs, 50), 1),
+                "p95_ms": round(percentile(xs, 95), 1),
+                "max_ms": round(max(xs), 1),
+                "total_ms": round(sum(xs), 1),
+            }
+            for op, xs in self.samples.items()
+        }
+        return {
+            "ops": ops,
+            "rows": self.rows,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_sec": round(self.rows / elapsed, 2) if elapsed > 0 else 0.0,
+            "retries": self.retries,
+            "failures": self.failures,
+            "failed_pages": self.failed_pages,
+            **self.extra,
+        }
+
+    def write(self, path: Path) -> Dict[str, Any]:
+        rep = self.report()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(rep, ensure_ascii=False, indent=2), encoding="utf-8")
+        return rep
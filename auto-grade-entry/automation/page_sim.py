@@ -0,0 +1,308 @@
+"""
+成绩录入网页的纯 Python 模拟器：复刻 web/app.js 给自动化用的那一面（不含 DOM、网络），用来测试和微基准录入策略。
+
+复刻的规则（与页面一致）：
+- 分页：当前班级+课程、按搜索词过滤后再分页；页码越界时按 renderAll 夹回 [1, 总页数]；
+- setRowScores / setRowScoresBulk：成绩按 clampInt 夹到 0–100，写入后 dirty、未提交；
+- submitPage：只提交本页中当前班级+课程的 dirty 行；submitAll：提交当前班级+课程的全部 dirty 行；
+- 切换班级/课程：先清空原班级/课程中未提交的成绩（clearUnsubmittedScoresFor*），再回到第 1 页；
+- 计数：hook_calls（每次钩子调用 = 真实页面上一次浏览器往返）、saves（saveState，真实页面每次都 PUT 整份 state）、renders。
+
+SimDriver 实现与 run_batch_playwright.PlaywrightDriver 相同的驱动接口，fill_pages 可原样跑在模拟器上。
+
+用法（微基准：10 万人名单，整页批量 vs 逐行写入）：
+  python automation/page_sim.py --rows 100000 --page-size 20
+  python automation/page_sim.py --rows 100000 --page-size 20 --per-row --out automation/page_sim.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from grade_state import clear_unsubmitted, now_ms, set_row_scores, submit_rows
+
+
+class SimPage:
+    """一个已登录、名单已载入的录入页面（state 结构同 web/app.js）。"""
+
+    def __init__(self, state: Dict[str, Any]) -> None:
+        self.state: Dict[str, Any] = {
+            "pageSize": 10,
+            "pageIndex": 1,
+            "search": "",
+            **state,
+            "rows": [dict(r) for r in state.get("rows", [])],
+        }
+        self.hook_calls = 0
+        self.saves = 0
+        self.renders = 0
+        self._by_id: Optional[Dict[str, int]] = None
+        self._filtered: Optional[List[int]] = None
+        self._filtered_key: Optional[Tuple[Any, ...]] = None
+
+    # ---------- 页面内部（不计钩子调用） ----------
+    def _index_of(self, row_id: str) -> Optional[int]:
+        if self._by_id is None:
+            self._by_id = {r.get("id"): i for i, r in enumerate(self.state["rows"])}
+        return self._by_id.get(row_id)
+
+    def _filtered_indices(self) -> List[int]:
+        """getFilteredRows 的下标版；行的姓名/班级/课程不会变，按 (班级, 课程, 搜索词) 缓存。"""
+        st = self.state
+        key = (st.get("selectedClass"), st.get("selectedCourse"), str(st.get("search") or "").strip())
+        if self._filtered_key != key:
+            cls, course, kw = key
+            self._filtered = [
+                i
+                for i, r in enumerate(st["rows"])
+                if r.get("className") == cls and r.get("course") == course and (not kw or kw in str(r.get("name", "")))
+            ]
+            self._filtered_key = key
+        return self._filtered or []
+
+    def paged(self) -> Tuple[List[int], int, int, int]:
+        """getPagedRows：(本页行下标, 总行数, 总页数, 夹取后的页码)。"""
+        rows = self._filtered_indices()
+        size = int(self.state["pageSize"])
+        total_pages = max(1, -(-len(rows) // size))
+        page_index = min(total_pages, max(1, int(self.state["pageIndex"])))
+        start = (page_index - 1) * size
+        return rows[start:start + size], len(rows), total_pages, page_index
+
+    def _save(self) -> None:
+        self.saves += 1
+
+    def _render(self) -> None:
+        """renderAll：先把越界的页码夹回来（夹了就再保存一次），再渲染。"""
+        page_index = self.paged()[3]
+        if page_index != self.state["pageIndex"]:
+            self.state["pageIndex"] = page_index
+            self._save()
+        self.renders += 1
+
+    def _select(self, key: str, state_key: str, value: str) -> bool:
+        # 下拉选项来自行数据：名单里没有该值时选不中（同 select_option 失败）
+        if not any(r.get(key) == value for r in self.state["rows"]):
+            return False
+        previous = self.state.get(state_key)
+        if previous != value:
+            clear_unsubmitted(self.state, key, previous)
+        self.state[state_key] = value
+        self.state["pageIndex"] = 1
+        self._save()
+        self._render()
+        return True
+
+    # ---------- 用户操作（下拉框、搜索框） ----------
+    def select_class(self, class_name: str) -> bool:
+        return self._select("className", "selectedClass", class_name)
+
+    def select_course(self, course: str) -> bool:
+        return self._select("course", "selectedCourse", course)
+
+    def set_search(self, keyword: str) -> None:
+        self.state["search"] = keyword
+        self.state["pageIndex"] = 1
+        self._save()
+        self._render()
+
+    def set_page_size(self, size: int) -> None:
+        self.state["pageSize"] = int(size)
+        self.state["pageIndex"] = 1
+        self._save()
+        self._render()
+
+    # ---------- 钩子（window.__AUTO_GRADE_ENTRY__） ----------
+    def get_state(self) -> Dict[str, Any]:
+        self.hook_calls += 1
+        return {**self.state, "rows": [dict(r) for r in self.state["rows"]]}
+
+    def get_visible_row_ids(self) -> List[str]:
+        self.hook_calls += 1
+        return [self.state["rows"][i].get("id") for i in self.paged()[0]]
+
+    def visible_rows(self) -> List[Dict[str, Any]]:
+        """同 run_batch_playwright.get_visible_rows 的一次 evaluate。"""
+        self.hook_calls += 1
+        rows = self.state["rows"]
+        return [
+            {
+                "id": rows[i].get("id"),
+                "name": rows[i].get("name"),
+                "className": rows[i].get("className"),
+                "course": rows[i].get("course"),
+                "studentNo": rows[i].get("studentNo"),
+            }
+            for i in self.paged()[0]
+        ]
+
+    def set_row_scores(self, row_id: str, usual: Any, exam: Any) -> bool:
+        self.hook_calls += 1
+        i = self._index_of(row_id)
+        if i is None:
+            return False
+        self.state["rows"][i] = set_row_scores(self.state["rows"][i], usual, exam)
+        self._save()
+        self._render()
+        return True
+
+    def set_row_scores_bulk(self, items: List[Dict[str, Any]]) -> int:
+        self.hook_calls += 1
+        ts = now_ms()
+        n = 0
+        for it in items:
+            i = self._index_of(it.get("rowId"))
+            if i is None:
+                continue
+            self.state["rows"][i] = set_row_scores(self.state["rows"][i], it.get("usual"), it.get("exam"), ts)
+            n += 1
+        if n:
+            self._save()
+            self._render()
+        return n
+
+    def go_to_page(self, p: Any) -> None:
+        self.hook_calls += 1
+        try:
+            self.state["pageIndex"] = int(p) or 1
+        except (TypeError, ValueError):
+            self.state["pageIndex"] = 1
+        self._save()
+        self._render()
+
+    def submit_page(self) -> List[str]:
+        """submitCurrentPage：本页行都属于当前班级+课程（分页前已过滤），只需看 dirty。"""
+        self.hook_calls += 1
+        ts = now_ms()
+        rows = self.state["rows"]
+        submitted: List[str] = []
+        for i in self.paged()[0]:
+            r = rows[i]
+            if r.get("dirty"):
+                rows[i] = {**r, "dirty": False, "submitted": True, "submittedAt": ts}
+                submitted.append(r.get("id"))
+        if submitted:
+            self._save()
+            self._render()
+        return submitted
+
+    def submit_all(self) -> List[str]:
+        self.hook_calls += 1
+        if not any(r.get("dirty") for r in self.state["rows"]):
+            return []
+        submitted = submit_rows(self.state)
+        self._save()
+        self._render()
+        return submitted
+
+    def counters(self) -> Dict[str, int]:
+        return {"hook_calls": self.hook_calls, "saves": self.saves, "renders": self.renders}
+
+
+class SimDriver:
+    """run_batch_playwright.PageDriver 的模拟器实现。bulk=False 时逐行调用 setRowScores（模拟没有批量钩子的旧页面）。"""
+
+    def __init__(self, sim: SimPage, bulk: bool = True) -> None:
+        self.sim = sim
+        self.bulk = bulk
+
+    async def state(self) -> Dict[str, Any]:
+        return self.sim.get_state()
+
+    async def visible_rows(self) -> List[Dict[str, Any]]:
+        return self.sim.visible_rows()
+
+    async def go_to_page(self, p: int) -> None:
+        self.sim.go_to_page(p)
+
+    async def set_scores_bulk(self, targets: List[Tuple[str, Any, Any]]) -> int:
+        if self.bulk:
+            return self.sim.set_row_scores_bulk([{"rowId": rid, "usual": u, "exam": e} for rid, u, e in targets])
+        return sum(1 for rid, u, e in targets if self.sim.set_row_scores(rid, u, e))
+
+    async def submit_page(self) -> None:
+        self.sim.submit_page()
+
+    async def submit_all(self) -> None:
+        self.sim.submit_all()
+
+    async def select(self, class_name: Optional[str], course: Optional[str]) -> None:
+        if class_name:
+            self.sim.select_class(class_name)
+        if course:
+            self.sim.select_course(course)
+
+
+async def simulate_fill(
+    state: Dict[str, Any],
+    grades: List[Dict[str, Any]],
+    page_size: int,
+    bulk: bool = True,
+) -> Dict[str, Any]:
+    """在模拟器上跑一遍 fill_pages（与真实批量录入同一套算法），返回耗时、计数与对账结果。"""
+    from checkpoint import NullJournal
+    from grade_store import NameIndex
+    from metrics import RunMetrics
+    from selection import reconcile_state
+    from run_batch_playwright import fill_pages
+
+    sim = SimPage(state)
+    sim.set_page_size(page_size)
+    t0 = time.perf_counter()
+    index = NameIndex(grades)
+    metrics = RunMetrics()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = await fill_pages(SimDriver(sim, bulk=bulk), grades, index, NullJournal(), metrics, page_size)
+    elapsed = time.perf_counter() - t0
+    recon = reconcile_state(grades, result["state"])
+    metrics.rows = result["filled"]
+    rep = metrics.report()
+    return {
+        "rows": len(state.get("rows", [])),
+        "page_size": page_size,
+        "bulk": bulk,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "filled": result["filled"],
+        "pages": result["total_pages"],
+        **sim.counters(),
+        "ops": rep["ops"],
+        "reconciliation": recon["counts"],
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="页面模拟器上的录入微基准（同一套 fill_pages 算法，不启动浏览器）")
+    ap.add_argument("--rows", type=int, default=100000, help="合成名单人数（默认 100000）")
+    ap.add_argument("--page-size", type=int, default=20, help="每页条数（默认 20）")
+    ap.add_argument("--per-row", action="store_true", help="逐行调用 setRowScores（对比整页批量写入）")
+    ap.add_argument("--repeat", type=int, default=3, help="重复次数，取耗时中位数（默认 3）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="把结果写成 JSON（可选）")
+    args = ap.parse_args()
+
+    from standin_server import roster_state, synthetic_roster
+
+    rows, grades = synthetic_roster(args.rows, seed=args.seed)
+    state = roster_state(rows, "一班", "数学")
+    runs = [asyncio.run(simulate_fill(state, grades, args.page_size, bulk=not args.per_row)) for _ in range(max(1, args.repeat))]
+    best = sorted(runs, key=lambda r: r["elapsed_ms"])[len(runs) // 2]
+    recon = best["reconciliation"]
+    print(
+        f"{best['rows']} 人 / 每页 {best['page_size']}（{'整页批量' if best['bulk'] else '逐行'}）：{best['elapsed_ms']} ms，"
+        f"{best['pages']} 页，钩子调用 {best['hook_calls']} 次，saveState {best['saves']} 次，渲染 {best['renders']} 次"
+    )
+    print(f"对账：一致且已提交 {recon['matched']}，未提交 {recon['unsubmitted']}，数值不一致 {recon['mismatched']}，缺失 {recon['missing']}")
+    if args.out:
+        out = Path(args.out).resolve()
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps({"median": best, "runs": runs}, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"已写入：{out}")
+    return 0 if recon["mismatched"] == recon["unsubmitted"] == recon["missing"] == 0 else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+# 与 excel-form-fill/reconcile.py 逐字节相同（本行除外），改动后运行 tools/check_shared_copies.py 校验。
+"""
+填表后的确定性对账：一次性读回系统里所有行（页面钩子 getState / 状态接口），与校验过的目标成绩逐条比对。
+
+分类（每个目标姓名恰好落入一类）：
+- matched       平时/考试与目标一致，且已提交
+- unsubmitted   数值一致，但仍有未提交修改（dirty）或从未提交
+- mismatched    找到该姓名的行，但数值与目标不一致
+- missing       系统里没有该姓名的行
+
+姓名按 NFKC + 去空白比对（「张 三」与「张三」视为同一人）；同名出现在多个班级/课程时，优先取数值一致的那一行。目标值按网页规则（四舍五入后夹到 0–100）归一再比。
+"""
+import json
+import math
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def _norm_score(v: Any) -> Optional[int]:
+    """
+    同网页 clampInt（auto-grade-entry 的 grade_state.clamp_int）：空 → None，纯空白 → 0（JS Number("  ") === 0），
+    非数字/NaN → None，±Infinity 夹到边界；Math.round 是「.5 向上」，再夹到 [0, 100]。
+    """
+    if v is None or v == "":
+        return None
+    try:
+        n = float(v.strip() or 0) if isinstance(v, str) else float(v)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(n):
+        return None
+    if math.isinf(n):
+        return 100 if n > 0 else 0
+    return min(100, max(0, math.floor(n + 0.5)))
+
+
+def _name_key(name: Any) -> str:
+    return "".join(unicodedata.normalize("NFKC", str(name or "")).split())
+
+
+def _row_state(row: Dict[str, Any]) -> str:
+    if row.get("dirty") or not row.get("submitted"):
+        return "unsubmitted"
+    return "matched"
+
+
+def reconcile(targets: List[Dict[str, Any]], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    targets: [{"name", "usual", "exam"}]；rows: 系统状态里的行（name/usual/exam/dirty/submitted/className/course）。
+    返回 {"counts": {...}, "matched": [...], "unsubmitted": [...], "mismatched": [...], "missing": [...]}。
+    """
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        by_name.setdefault(_name_key(r.get("name")), []).append(r)
+
+    out: Dict[str, List[Dict[str, Any]]] = {"matched": [], "unsubmitted": [], "mismatched": [], "missing": []}
+    for t in targets:
+        name = str(t.get("name", "")).strip()
+        want = (_norm_score(t.get("usual")), _norm_score(t.get("exam")))
+        candidates = by_name.get(_name_key(name)) or []
+        if not candidates:
+            out["missing"].append({"name": name, "usual": want[0], "exam": want[1]})
+            continue
+        same = [r for r in candidates if (_norm_score(r.get("usual")), _norm_score(r.get("exam"))) == want]
+        if same:
+            best = next((r for r in same if _row_state(r) == "matched"), same[0])
+            out[_row_state(best)].append(
+                {"name": name, "usual": want[0], "exam": want[1], "class": best.get("className"), "course": best.get("course")}
+            )
+            continue
+        r = candidates[0]
+        out["mismatched"].append(
+            {
+                "name": name,
+                "want": {"usual": want[0], "exam": want[1]},
+                "got": {"usual": r.get("usual"), "exam": r.get("exam")},
+                "class": r.get("className"),
+                "course": r.get("course"),
+            }
+        )
+    return {"counts": {k: len(v) for k, v in out.items()}, "total": len(targets), **out}
+
+
+def is_clean(report: Dict[str, Any], allow_missing: bool = False) -> bool:
+    """allow_missing：批量脚本里「表中有、网页名单没有」只做提示（同 print_report 的未匹配），不算失败。"""
+    c = report["counts"]
+    return c["mismatched"] == 0 and c["unsubmitted"] == 0 and (allow_missing or c["missing"] == 0)
+
+
+def print_reconciliation(report: Dict[str, Any], allow_missing: bool = False) -> None:
+    c = report["counts"]
+    print("\n===== 对账（读回系统数据逐条比对）=====")
+    print(
+        f"目标 {report['total']} 条：一致且已提交 {c['matched']}，未提交 {c['unsubmitted']}，"
+        f"数值不一致 {c['mismatched']}，系统中缺失 {c['missing']}"
+    )
+    for m in report["mismatched"][:10]:
+        print(f"  不一致：{m['name']} 目标 {m['want']['usual']}/{m['want']['exam']}，系统 {m['got']['usual']}/{m['got']['exam']}")
+    if report["unsubmitted"]:
+        names = [u["name"] for u in report["unsubmitted"]]
+        print(f"  未提交：{names[:10]}{'...' if len(names) > 10 else ''}")
+    if report["missing"]:
+        names = [u["name"] for u in report["missing"]]
+        print(f"  缺失：{names[:10]}{'...' if len(names) > 10 else ''}")
+    print("✅ 对账通过。" if is_clean(report, allow_missing) else "⚠️ 对账未通过，请按上面的明细复核。")
+
+
+def write_reconciliation(report: Dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -0,0 +1,159 @@
+"""
+免浏览器版：直接通过成绩录入服务器的 HTTP 接口写入成绩（不启动 Chromium）。
+
+流程：POST /api/auth/login → GET /api/state → 按 grades.json 写入成绩并提交
+→ PATCH /api/state/rows 只上传改动的行（见 delta_client.py；切换了班级/课程、清了搜索词或老服务器时整份 PUT）→ 回读对账
+语义与网页一致（见 grade_state.py）：成绩按 clampInt 夹到 0–100；写入后 dirty，
+提交只作用于当前班级+课程下的 dirty 行；报告格式同 run_batch_playwright.py。
+上传带版本校验：期间有人在网页上保存过（409）时重新拉取、重做一次。
+
+用法：
+  python automation/run_api_driver.py --url http://localhost:5173 --grades automation/grades.json --user teacher1 --password ***
+  （也可用环境变量 GRADE_ENTRY_USER / GRADE_ENTRY_PASSWORD 提供账号）
+"""
+import argparse
+import copy
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from grade_state import clamp_int, filtered_rows, now_ms, select_if_present, set_row_scores, submit_rows
+from grade_store import MATCHED, MISSING, GradeStore, NameIndex, class_of, print_duplicates, print_preflight
+from reconcile import is_clean, print_reconciliation, write_reconciliation
+from run_batch_playwright import print_report, unique_value
+from selection import reconcile_state, selection_rows
+
+
+def make_client(base_url: str, timeout: float = 30.0) -> httpx.Client:
+    """带连接池与 keep-alive 的会话；登录后 cookie（token）由 client 自动携带。localhost 不走系统代理。"""
+    return httpx.Client(
+        base_url=base_url.rstrip("/"),
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        trust_env=False,
+    )
+
+
+def _raise_for_api(resp: httpx.Response) -> Dict[str, Any]:
+    try:
+        data = resp.json()
+    except ValueError:
+        data = {}
+    if resp.status_code >= 400:
+        raise RuntimeError(f"{resp.request.method} {resp.request.url.path} 失败（{resp.status_code}）：{data.get('error') or resp.text[:200]}")
+    return data
+
+
+def login(client: httpx.Client, username: str, password: str) -> Dict[str, Any]:
+    return _raise_for_api(client.post("/api/auth/login", json={"username": username, "password": password}))
+
+
+def fetch_state(client: httpx.Client) -> Optional[Dict[str, Any]]:
+    return _raise_for_api(client.get("/api/state")).get("state")
+
+
+def _already_submitted(row: Dict[str, Any], g: Dict[str, Any]) -> bool:
+    return (
+        bool(row.get("submitted"))
+        and not row.get("dirty")
+        and row.get("usual") == clamp_int(g.get("usual"))
+        and row.get("exam") == clamp_int(g.get("exam"))
+    )
+
+
+def apply_grades(
+    state: Dict[str, Any],
+    grades: List[Dict[str, Any]],
+    index: Optional[NameIndex] = None,
+) -> Dict[str, Any]:
+    """
+    在 state 上就地写入成绩并提交，返回 {filled, missing, ambiguous, submitted, preflight}。
+    与批量脚本一致：清空搜索；班级/课程在 grades 中唯一时切换过去；只处理当前班级+课程可见的行。
+    index：已建好的 NameIndex，不传则由 grades 现建；同名无法区分的行不写入，记在 ambiguous。
+    已是目标成绩且已提交、没有未提交修改的行原样保留（计入 filled），重跑时增量上传只含真正的改动。
+    """
+    index = index if index is not None else NameIndex(grades)
+    if not len(index):
+        raise ValueError("grades.json 中没有有效的 name 记录。")
+    state["search"] = ""
+    select_if_present(state, unique_value(grades, class_of), unique_value(grades, "course"))
+    preflight = index.preflight(selection_rows(state))
+
+    ts = now_ms()
+    index_by_id = {r.get("id"): i for i, r in enumerate(state.get("rows", []))}
+    filled = 0
+    missing: List[str] = []
+    ambiguous: List[str] = []
+    for r in filtered_rows(state):
+        g, status = index.resolve_row(r)
+        if status == MISSING:
+            missing.append(r.get("name"))
+            continue
+        if status != MATCHED:
+            ambiguous.append(r.get("name"))
+            continue
+        filled += 1
+        if _already_submitted(r, g):
+            continue
+        state["rows"][index_by_id[r.get("id")]] = set_row_scores(r, g.get("usual"), g.get("exam"), ts)
+    submitted = submit_rows(state, ts=ts)
+    return {"filled": filled, "missing": missing, "ambiguous": ambiguous, "submitted": submitted, "preflight": preflight}
+
+
+def run(url: str, grades_path: Path, username: str, password: str) -> int:
+    from delta_client import VersionConflict, fetch_state_versioned, push_changes
+
+    with GradeStore.for_json(grades_path) as store:
+        grades = store.all()
+        print_duplicates(store.duplicates())
+    index = NameIndex(grades)
+    with make_client(url) as client:
+        login(client, username, password)
+        for attempt in range(2):
+            state, version = fetch_state_versioned(client)
+            if not state or not state.get("rows"):
+                raise RuntimeError("服务器上该账号还没有名单（state.rows 为空），请先在网页导入学生名单。")
+            before = copy.deepcopy(state)
+            result = apply_grades(state, grades, index)
+            try:
+                _, changed, full = push_changes(client, before, state, version)
+                break
+            except VersionConflict as e:
+                if attempt:
+                    raise
+                print(f"⚠️ {e} 重新拉取后重做一次。")
+        print_preflight(result["preflight"])
+        print(f"上传改动 {changed} / {len(state['rows'])} 行" + ("（班级/课程或搜索词有变化，整份保存）" if full else ""))
+        # 回读确认：以服务器实际保存的数据为准
+        saved = fetch_state(client) or {}
+    dirty_left = [r["name"] for r in saved.get("rows", []) if r.get("dirty")]
+    rc = print_report(result["filled"], result["missing"], dirty_left)
+    recon = reconcile_state(grades, saved)
+    print_reconciliation(recon, allow_missing=True)
+    recon_path = grades_path.with_name(grades_path.stem + ".reconcile.json")
+    write_reconciliation(recon, recon_path)
+    print(f"对账明细：{recon_path}")
+    return rc if is_clean(recon, allow_missing=True) else (rc or 2)
+
+
+def main() -> int:
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="免浏览器：通过 /api/state 直接写入成绩并提交（报告格式同 run_batch_playwright.py）")
+    ap.add_argument("--url", required=True, help="成绩录入系统地址，例如 http://localhost:5173")
+    ap.add_argument("--grades", required=True, help="grades.json 路径（extract_excel.py 输出）")
+    ap.add_argument("--user", default=os.getenv("GRADE_ENTRY_USER"), help="登录用户名（默认取环境变量 GRADE_ENTRY_USER）")
+    ap.add_argument("--password", default=os.getenv("GRADE_ENTRY_PASSWORD"), help="登录密码（默认取环境变量 GRADE_ENTRY_PASSWORD）")
+    ap.add_argument("--page-size", type=int, default=10, help="与 run_batch_playwright.py 保持一致（HTTP 写入不分页，忽略）")
+    ap.add_argument("--headless", action="store_true", help="与 run_batch_playwright.py 保持一致（不启动浏览器，忽略）")
+    args = ap.parse_args()
+
+    if not args.user or not args.password:
+        ap.error("需要登录账号：--user/--password 或环境变量 GRADE_ENTRY_USER/GRADE_ENTRY_PASSWORD")
+    return run(args.url, Path(args.grades).resolve(), args.user, args.password)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
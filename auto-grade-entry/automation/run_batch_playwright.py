@@ -1,33 +1,27 @@
 import argparse
 import asyncio
 import json
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Protocol, Tuple, Union
+from urllib.parse import urljoin
 
-from playwright.async_api import async_playwright
+from grade_store import MATCHED, MISSING, GradeStore, NameIndex, class_of, print_duplicates, print_preflight
+from selection import selection_rows
 
 
-def load_grades_json(path: Path) -> List[Dict[str, Any]]:
-    payload = json.loads(path.read_text(encoding="utf-8"))
-    if isinstance(payload, list):
-        return payload
-    if isinstance(payload, dict) and "grades" in payload and isinstance(payload["grades"], list):
-        return payload["grades"]
-    raise ValueError("grades.json 格式不支持：需要是 list 或包含 grades 字段的 dict。")
+# 钩子就绪：新版页面在 boot() 载入远端名单后置 ready=true；旧版页面没有 ready 字段，钩子存在即可。
+# boot() 失败时页面写 bootError，这里同样返回，由调用方立即报错，不等到超时
+HOOKS_READY_JS = (
+    "() => { const api = window.__AUTO_GRADE_ENTRY__; return !!api && (api.ready !== false || !!api.bootError); }"
+)
 
 
-def build_grade_map(grades: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
-    mp: Dict[str, Dict[str, Any]] = {}
-    for g in grades:
-        name = str(g.get("name", "")).strip()
-        if not name:
-            continue
-        mp[name] = g
-    return mp
-
-
-def unique_value(grades: List[Dict[str, Any]], key: str) -> Optional[str]:
-    vals = {str(g.get(key)).strip() for g in grades if g.get(key) not in (None, "", "nan")}
+def unique_value(grades: List[Dict[str, Any]], key: Union[str, Callable[[Dict[str, Any]], Any]]) -> Optional[str]:
+    """key：字段名，或从记录取值的函数（班级用 grade_store.class_of，兼容 className）。"""
+    get = key if callable(key) else (lambda g: g.get(key))
+    vals = {str(get(g)).strip() for g in grades if get(g) not in (None, "", "nan")}
     if len(vals) == 1:
         return next(iter(vals))
     return None
@@ -37,24 +31,61 @@ async def get_state(page) -> Dict[str, Any]:
     return await page.evaluate("window.__AUTO_GRADE_ENTRY__.getState()")
 
 
-async def get_visible_rows(page) -> List[Dict[str, str]]:
-    # 返回当前页可见学生：[{id,name}]
+async def get_visible_rows(page) -> List[Dict[str, Any]]:
+    # 返回当前页可见学生：[{id,name,className,course,studentNo}]（后三项用于同名消歧）
+    # 可见行以页面自己的分页为准（当前班级+课程、搜索过滤后再分页）；旧版页面没有 getVisibleRowIds 时按下标切片
     return await page.evaluate(
         """
 () => {
-  const st = window.__AUTO_GRADE_ENTRY__.getState();
-  const start = (st.pageIndex - 1) * st.pageSize;
-  const end = start + st.pageSize;
-  return st.rows.slice(start, end).map(r => ({ id: r.id, name: r.name }));
+  const api = window.__AUTO_GRADE_ENTRY__;
+  const st = api.getState();
+  let rows;
+  if (api.getVisibleRowIds) {
+    const byId = new Map(st.rows.map(r => [r.id, r]));
+    rows = api.getVisibleRowIds().map(id => byId.get(id)).filter(Boolean);
+  } else {
+    const start = (st.pageIndex - 1) * st.pageSize;
+    rows = st.rows.slice(start, start + st.pageSize);
+  }
+  return rows.map(r => ({
+    id: r.id, name: r.name, className: r.className, course: r.course, studentNo: r.studentNo ?? null,
+  }));
 }
 """
     )
 
 
-async def set_scores(page, row_id: str, usual: Any, exam: Any) -> bool:
+def page_targets(
+    visible: List[Dict[str, Any]], index: NameIndex
+) -> Tuple[List[Tuple[str, Any, Any]], List[str]]:
+    """
+    本页要写入的 (row_id, usual, exam) 列表，以及在 grades.json 中找不到的姓名。
+    同名无法区分的行不写入（已在名单预检里报告）。
+    """
+    targets: List[Tuple[str, Any, Any]] = []
+    missing: List[str] = []
+    for r in visible:
+        g, status = index.resolve_row(r)
+        if status == MATCHED:
+            targets.append((r["id"], g.get("usual"), g.get("exam")))
+        elif status == MISSING:
+            missing.append(r["name"])
+    return targets, missing
+
+
+async def set_scores_bulk(page, targets: List[Tuple[str, Any, Any]]) -> int:
+    """整页一次写入（一次往返、页面只保存/渲染一次）；旧版页面没有批量钩子时逐行写。返回成功条数。"""
     return await page.evaluate(
-        "(args) => window.__AUTO_GRADE_ENTRY__.setRowScores(args.rowId, args.usual, args.exam)",
-        {"rowId": row_id, "usual": usual, "exam": exam},
+        """
+(items) => {
+  const api = window.__AUTO_GRADE_ENTRY__;
+  if (api.setRowScoresBulk) return api.setRowScoresBulk(items);
+  let n = 0;
+  for (const it of items) if (api.setRowScores(it.rowId, it.usual, it.exam)) n++;
+  return n;
+}
+""",
+        [{"rowId": rid, "usual": usual, "exam": exam} for rid, usual, exam in targets],
     )
 
 
@@ -68,71 +99,372 @@ async def submit_page(page) -> None:
     await page.evaluate("() => window.__AUTO_GRADE_ENTRY__.submitPage()")
 
 
-async def run(url: str, grades_path: Path, page_size: int, headless: bool) -> int:
-    grades = load_grades_json(grades_path)
-    grade_map = build_grade_map(grades)
-    if not grade_map:
-        raise ValueError("grades.json 中没有有效的 name 记录。")
-
-    class_unique = unique_value(grades, "class_name")
-    course_unique = unique_value(grades, "course")
+class PageDriver(Protocol):
+    """
+    批量录入面对的页面操作面（与 web/app.js 的钩子一一对应）。
+    PlaywrightDriver 驱动真实页面；page_sim.SimDriver 驱动纯 Python 的页面模拟器，录入算法两边共用。
+    """
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless)
-        page = await browser.new_page()
+    async def state(self) -> Dict[str, Any]: ...
 
-        await page.goto(url, wait_until="domcontentloaded")
-        await page.wait_for_function("() => !!window.__AUTO_GRADE_ENTRY__")
+    async def visible_rows(self) -> List[Dict[str, Any]]: ...
 
-        # 统一设置：清空搜索、设置每页条数
-        await page.fill("#searchInput", "")
-        await page.select_option("#pageSizeSelect", str(page_size))
+    async def go_to_page(self, p: int) -> None: ...
 
-        # 如果 Excel 里的班级/课程都是同一个，则直接设置（该网页是“全班/全课程”录入模型）
-        if class_unique:
-            try:
-                await page.select_option("#classSelect", class_unique)
-            except Exception:
-                pass
-        if course_unique:
+    async def set_scores_bulk(self, targets: List[Tuple[str, Any, Any]]) -> int: ...
+
+    async def submit_page(self) -> None: ...
+
+    async def submit_all(self) -> None: ...
+
+    async def select(self, class_name: Optional[str], course: Optional[str]) -> None: ...
+
+
+class PlaywrightDriver:
+    """真实页面：通过 window.__AUTO_GRADE_ENTRY__ 钩子与下拉框操作。"""
+
+    def __init__(self, page) -> None:
+        self.page = page
+
+    async def state(self) -> Dict[str, Any]:
+        return await get_state(self.page)
+
+    async def visible_rows(self) -> List[Dict[str, Any]]:
+        return await get_visible_rows(self.page)
+
+    async def go_to_page(self, p: int) -> None:
+        await go_to_page(self.page, p)
+
+    async def set_scores_bulk(self, targets: List[Tuple[str, Any, Any]]) -> int:
+        return await set_scores_bulk(self.page, targets)
+
+    async def submit_page(self) -> None:
+        await submit_page(self.page)
+
+    async def submit_all(self) -> None:
+        await self.page.evaluate("() => window.__AUTO_GRADE_ENTRY__.submitAll()")
+
+    async def select(self, class_name: Optional[str], course: Optional[str]) -> None:
+        # 下拉里没有该值时 select_option 会失败：保持页面当前选择
+        for selector, value in (("#classSelect", class_name), ("#courseSelect", course)):
+            if value:
+                try:
+                    await self.page.select_option(selector, value)
+                except Exception:
+                    pass
+
+
+async def fill_one_page(
+    driver: PageDriver,
+    pi: int,
+    index: NameIndex,
+    journal,
+    metrics,
+    op_timeout: Optional[float],
+) -> Tuple[int, List[str]]:
+    """处理一页：翻页 → 读可见行 → 整页写入 → 一次提交。返回 (写入成功人数, 未匹配姓名)。各操作单独限时并计时。"""
+    await metrics.timed("navigate", driver.go_to_page(pi), op_timeout)
+    visible = await metrics.timed("read", driver.visible_rows(), op_timeout)
+    targets, page_missing = page_targets(visible, index)
+
+    # 整页批量写入
+    filled = await metrics.timed("fill", driver.set_scores_bulk(targets), op_timeout)
+    journal.record("filled", pi, targets)
+
+    # 一次提交
+    await metrics.timed("submit", driver.submit_page(), op_timeout)
+    journal.record("submitted", pi, targets)
+    return filled, page_missing
+
+
+async def fill_pages(
+    driver: PageDriver,
+    grades: List[Dict[str, Any]],
+    index: NameIndex,
+    journal,
+    metrics,
+    page_size: int,
+    resume: bool = False,
+    op_timeout: Optional[float] = None,
+    retries: int = 2,
+    retry_backoff: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    批量录入主循环（与页面实现无关）：切班级/课程 → 名单预检 → 逐页写入并提交（失败按页重试）→ 读回全部数据。
+    返回 {filled, missing, skipped_pages, skipped_rows, total_pages, preflight, state}，state 为结束时读回的页面 state。
+    filled 只算本次实际写入的人数；断点续跑按日志跳过的页及其行数记在 skipped_pages / skipped_rows。
+    本页行按 filtered_rows（当前班级+课程、搜索过滤）分页推算，与页面 getVisibleRowIds 同一口径。
+    """
+    from grade_state import filtered_rows
+
+    # 如果 Excel 里的班级/课程都是同一个，则直接设置（该网页是“全班/全课程”录入模型）
+    await driver.select(unique_value(grades, class_of), unique_value(grades, "course"))
+
+    st = await driver.state()
+    # 写入前一次性比对当前班级+课程的整份名单：缺失、同名无法区分的行先报出来，不用等翻到那一页
+    preflight = index.preflight(selection_rows(st))
+    print_preflight(preflight)
+    all_rows = filtered_rows(st)  # 与页面分页同一口径：当前班级+课程、搜索过滤后的行
+    page_size_effective = int(st.get("pageSize", page_size))
+    total_pages = max(1, (len(all_rows) + page_size_effective - 1) // page_size_effective)
+
+    filled = 0
+    missing: List[str] = []
+    skipped_pages = 0
+    skipped_rows = 0
+    for pi in range(1, total_pages + 1):
+        # 断点续跑：先用已取到的 state 推算本页行，日志已确认的页连翻页都省掉
+        if resume:
+            start = (pi - 1) * page_size_effective
+            planned = page_targets(all_rows[start:start + page_size_effective], index)[0]
+            if journal.page_confirmed(pi, planned):
+                skipped_pages += 1
+                skipped_rows += len(planned)
+                continue
+
+        for attempt in range(retries + 1):
             try:
-                await page.select_option("#courseSelect", course_unique)
-            except Exception:
-                pass
-
-        st = await get_state(page)
-        total = len(st.get("rows", []))
-        page_size_effective = int(st.get("pageSize", page_size))
-        total_pages = max(1, (total + page_size_effective - 1) // page_size_effective)
-
-        filled = 0
-        missing: List[str] = []
-
-        for pi in range(1, total_pages + 1):
-            await go_to_page(page, pi)
-            visible = await get_visible_rows(page)
-
-            # 整页批量写入（循环调用 hook，成本极低）
-            for r in visible:
-                name = r["name"]
-                rid = r["id"]
-                g = grade_map.get(name)
-                if not g:
-                    missing.append(name)
-                    continue
-                ok = await set_scores(page, rid, g.get("usual"), g.get("exam"))
-                if ok:
-                    filled += 1
-
-            # 一次提交
-            await submit_page(page)
-
-        # 校验：是否还有 dirty
-        st2 = await get_state(page)
-        dirty_left = [r["name"] for r in st2.get("rows", []) if r.get("dirty")]
-
-        await browser.close()
+                n, page_missing = await fill_one_page(driver, pi, index, journal, metrics, op_timeout)
+            except Exception as e:
+                if attempt >= retries:
+                    metrics.failures += 1
+                    metrics.failed_pages.append(pi)
+                    print(f"第 {pi} 页失败（已重试 {retries} 次），跳过：{type(e).__name__}: {e}")
+                    break
+                delay = retry_backoff * (2 ** attempt)
+                metrics.retries += 1
+                print(f"第 {pi} 页出错（第 {attempt + 1} 次），{delay:.1f}s 后重试：{type(e).__name__}: {e}")
+                await asyncio.sleep(delay)
+                continue
+            filled += n
+            missing.extend(page_missing)
+            break
+
+    return {
+        "filled": filled,
+        "missing": missing,
+        "skipped_pages": skipped_pages,
+        "skipped_rows": skipped_rows,
+        "total_pages": total_pages,
+        "preflight": preflight,
+        "state": await driver.state(),
+    }
+
+
+@asynccontextmanager
+async def playwright_unless(browser: Any) -> AsyncIterator[Any]:
+    """已有共用浏览器时不再启动 Playwright 驱动（每个驱动是一个 Node 子进程），直接给 None。"""
+    if browser is not None:
+        yield None
+        return
+    from playwright.async_api import async_playwright
 
+    async with async_playwright() as p:
+        yield p
+
+
+async def login_context(context, url: str, login: Tuple[str, str]) -> None:
+    """用账号登录（POST /api/auth/login）；token cookie 写入 context，之后打开的页面都带登录态。"""
+    username, password = login
+    resp = await context.request.post(urljoin(url, "/api/auth/login"), data={"username": username, "password": password})
+    if not resp.ok:
+        raise RuntimeError(f"登录失败（{resp.status}）：账号 {username}")
+
+
+@asynccontextmanager
+async def open_page(
+    p,
+    headless: bool,
+    browser_service: Optional[str] = None,
+    job: str = "",
+    lean_url: Optional[str] = None,
+    browser: Any = None,
+    login: Optional[Tuple[str, str]] = None,
+    login_url: str = "",
+) -> AsyncIterator[Any]:
+    """
+    打开一个干净的页面。
+    - 未指定 browser_service：本地启动 Chromium，结束时关闭（原行为）。
+    - 指定 browser_service：向常驻浏览器服务申请租约，通过 CDP 连接并新建独立 context，结束时只关 context。
+    - 给出 browser（调用方已启动、多个作业共用）：只在其上新建 context，结束时只关 context。
+    - lean_url 非空：启用 lean profile（拦截非必要资源、关动画；本地启动时附加自动化 Chromium 参数）。
+    - login 非空：新建 context 后先用 (账号, 密码) 登录 login_url 所在的服务器。
+    """
+    from lean_profile import LEAN_CHROMIUM_ARGS, apply_lean_profile, lean_context_options
+
+    context_kw = lean_context_options() if lean_url else {}
+
+    async def new_page(b) -> Tuple[Any, Any]:
+        context = await b.new_context(**context_kw)
+        if lean_url:
+            await apply_lean_profile(context, lean_url)
+        if login:
+            await login_context(context, login_url, login)
+        return context, await context.new_page()
+
+    if browser is not None:
+        context, page = await new_page(browser)
+        try:
+            yield page
+        finally:
+            await context.close()
+        return
+
+    if not browser_service:
+        browser = await p.chromium.launch(headless=headless, args=LEAN_CHROMIUM_ARGS if lean_url else None)
+        try:
+            yield (await new_page(browser))[1]
+        finally:
+            await browser.close()
+        return
+
+    from browser_service import lease_browser
+
+    async with lease_browser(browser_service, job=job) as lease:
+        browser = await p.chromium.connect_over_cdp(lease.get("ws_endpoint") or lease["cdp_url"])
+        try:
+            context, page = await new_page(browser)
+            try:
+                yield page
+            finally:
+                await context.close()
+        finally:
+            await browser.close()  # 对 CDP 连接只是断开，不会关闭服务里的 Chromium
+
+
+async def open_entry_page(page, url: str, page_size: int, metrics: Any) -> None:
+    """打开阶段：导航、等待页面钩子、清空搜索、设置每页条数。与成绩数据无关，可与 Excel 解析并行。"""
+    t0 = time.perf_counter()
+    await page.goto(url, wait_until="domcontentloaded")
+    await page.wait_for_function(HOOKS_READY_JS)
+    boot_error = await page.evaluate("() => window.__AUTO_GRADE_ENTRY__.bootError || null")
+    if boot_error:
+        raise RuntimeError(f"录入页面启动失败：{boot_error}")
+    metrics.observe("load", time.perf_counter() - t0)
+
+    # 统一设置：清空搜索、设置每页条数
+    await page.fill("#searchInput", "")
+    await page.select_option("#pageSizeSelect", str(page_size))
+
+
+async def run(
+    url: str,
+    grades_path: Path,
+    page_size: int,
+    headless: bool,
+    browser_service: Optional[str] = None,
+    lean: bool = False,
+    journal_path: Optional[Path] = None,
+    resume: bool = False,
+    op_timeout: Optional[float] = 15.0,
+    retries: int = 2,
+    retry_backoff: float = 0.5,
+    metrics_path: Optional[Path] = None,
+    pending_grades: Optional[Awaitable[Tuple[List[Dict[str, Any]], bytes]]] = None,
+    browser: Any = None,
+    login: Optional[Tuple[str, str]] = None,
+) -> int:
+    """
+    op_timeout：每个操作（导航/读取/填写/提交）的超时秒数；
+    retries / retry_backoff：某页失败后的重试次数与指数退避基数（秒），已成功的页不会重做；
+    metrics_path：耗时报告（JSON）输出路径，默认 <grades 同名>.metrics.json；
+    pending_grades：尚未完成的成绩来源，结果为 (grades 列表, grades.json 的字节内容)。给出时先启动浏览器、
+    打开页面并等到钩子就绪，再等它完成（run_full_pipeline 借此让 Excel 解析与浏览器启动并行），
+    此时不读 grades_path（它可能还在后台写入），只用来推导日志/报告等旁路文件的路径；
+    browser：多个作业共用的已启动浏览器（每次只新建/关闭自己的 context）；login：(账号, 密码)，打开页面前先登录。
+    """
+    from checkpoint import RunJournal, default_journal_path, make_run_key
+    from metrics import RunMetrics
+    from reconcile import is_clean, print_reconciliation, write_reconciliation
+    from selection import reconcile_state
+
+    grades: List[Dict[str, Any]] = []
+    if pending_grades is None:
+        with GradeStore.for_json(grades_path) as store:
+            grades = store.all()
+            print_duplicates(store.duplicates())
+        if not grades:
+            raise ValueError("grades.json 中没有有效的 name 记录。")
+
+    journal_path = journal_path or default_journal_path(grades_path)
+    metrics = RunMetrics()
+    metrics_path = metrics_path or grades_path.with_name(grades_path.stem + ".metrics.json")
+
+    async with playwright_unless(browser) as p, open_page(
+        p,
+        headless,
+        browser_service,
+        job=grades_path.name,
+        lean_url=url if lean else None,
+        browser=browser,
+        login=login,
+        login_url=url,
+    ) as page:
+        if op_timeout:
+            page.set_default_timeout(op_timeout * 1000)
+        await open_entry_page(page, url, page_size, metrics)
+
+        if pending_grades is None:
+            run_key = make_run_key(url, grades_path, page_size)
+        else:
+            # 页面已就绪，剩下的等待全部是 Excel 解析；wait_grades 即关键路径上解析比浏览器启动多出来的部分
+            t0 = time.perf_counter()
+            grades, raw = await pending_grades
+            metrics.observe("wait_grades", time.perf_counter() - t0)
+            with GradeStore.from_grades(grades) as store:
+                print_duplicates(store.duplicates())
+            if not grades:
+                raise ValueError("Excel 中没有有效的 name 记录。")
+            run_key = make_run_key(url, grades_path, page_size, content=raw)
+
+        index = NameIndex(grades)  # 整次运行只建一次，翻页时逐行 O(1) 匹配
+        with RunJournal(journal_path, run_key, resume=resume) as journal:
+            result = await fill_pages(
+                PlaywrightDriver(page),
+                grades,
+                index,
+                journal,
+                metrics,
+                page_size,
+                resume=resume,
+                op_timeout=op_timeout,
+                retries=retries,
+                retry_backoff=retry_backoff,
+            )
+            st2 = result["state"]
+            dirty_left = [r["name"] for r in st2.get("rows", []) if r.get("dirty")]
+            # 对账：同一次读回的全部行与 grades.json 逐条比对（数值、是否已提交）
+            recon = reconcile_state(grades, st2)
+
+    filled, missing = result["filled"], result["missing"]
+    skipped_pages, total_pages, preflight = result["skipped_pages"], result["total_pages"], result["preflight"]
+    metrics.rows = filled
+    metrics.extra["skipped_pages"] = skipped_pages
+    metrics.extra["skipped_rows"] = result["skipped_rows"]
+    metrics.extra["reconciliation"] = recon["counts"]
+    metrics.extra["preflight"] = {k: v if isinstance(v, int) else len(v) for k, v in preflight.items()}
+    rep = metrics.write(metrics_path)
+    print(f"耗时报告：{metrics_path}（{rep['rows_per_sec']} 行/秒，重试 {rep['retries']} 次，失败 {rep['failures']} 页）")
+    if skipped_pages:
+        print(
+            f"断点续跑：按日志跳过 {skipped_pages}/{total_pages} 页、{result['skipped_rows']} 人"
+            f"（此前已写入并提交，不计入本次已填；{journal_path}）"
+        )
+    rc = print_report(filled, missing, dirty_left)
+    recon_path = grades_path.with_name(grades_path.stem + ".reconcile.json")
+    print_reconciliation(recon, allow_missing=True)
+    write_reconciliation(recon, recon_path)
+    print(f"对账明细：{recon_path}")
+    if not is_clean(recon, allow_missing=True):
+        rc = rc or 2
+    if metrics.failed_pages:
+        print(f"以下页在重试后仍失败，可加 --resume 重跑：{metrics.failed_pages}")
+        return rc or 2
+    return rc
+
+
+def print_report(filled: int, missing: List[str], dirty_left: List[str]) -> int:
+    """打印录入结果；仍有未提交修改时返回 2（各录入驱动共用同一报告格式）。"""
     print(f"完成：已填 {filled} 人（按姓名匹配）")
     if missing:
         uniq = sorted(set(missing))
@@ -143,15 +475,69 @@ async def run(url: str, grades_path: Path, page_size: int, headless: bool) -> in
     return 0
 
 
+async def _measure_lean(url: str, headless: bool) -> int:
+    from playwright.async_api import async_playwright
+
+    from lean_profile import measure_load
+
+    async with async_playwright() as p:
+        report = await measure_load(p, url, headless=headless)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="优化版：Playwright 整页批量输入 + 分页循环 + 一次提交")
     ap.add_argument("--url", required=True, help="成绩录入网页 URL，例如 http://localhost:5173")
     ap.add_argument("--grades", required=True, help="grades.json 路径（extract_excel.py 输出）")
     ap.add_argument("--page-size", type=int, default=10, help="每页条数（需与网页选项一致）")
     ap.add_argument("--headless", action="store_true", help="无头模式运行（默认有头，方便观察）")
+    ap.add_argument(
+        "--browser-service",
+        default=None,
+        help="常驻浏览器服务地址（browser_service.py serve 启动），例如 http://127.0.0.1:9400；不填则本次单独启动 Chromium",
+    )
+    ap.add_argument(
+        "--lean",
+        action="store_true",
+        help="精简页面配置：拦截图片/字体/样式表/第三方脚本、关闭动画、使用自动化 Chromium 参数（建议配合 --headless）",
+    )
+    ap.add_argument(
+        "--measure-lean",
+        action="store_true",
+        help="只做测量：分别以原行为与 --lean 冷启动加载页面，输出加载耗时对比（JSON），不录入成绩",
+    )
+    ap.add_argument(
+        "--journal",
+        default=None,
+        help="断点日志路径（默认 <grades>.journal.jsonl）；每页填写/提交后立即落盘",
+    )
+    ap.add_argument("--resume", action="store_true", help="断点续跑：跳过断点日志中已确认提交（且行与成绩未变）的页")
+    ap.add_argument("--op-timeout", type=float, default=15.0, help="单个操作（翻页/读取/填写/提交）超时秒数，默认 15；0 表示不限")
+    ap.add_argument("--retries", type=int, default=2, help="某页失败后的重试次数（指数退避），默认 2")
+    ap.add_argument("--retry-backoff", type=float, default=0.5, help="重试退避基数（秒），第 k 次重试等待 base*2^k，默认 0.5")
+    ap.add_argument("--metrics-out", default=None, help="耗时报告 JSON 路径（默认 <grades>.metrics.json）")
     args = ap.parse_args()
 
-    return asyncio.run(run(args.url, Path(args.grades).resolve(), args.page_size, args.headless))
+    if args.measure_lean:
+        return asyncio.run(_measure_lean(args.url, args.headless))
+
+    return asyncio.run(
+        run(
+            args.url,
+            Path(args.grades).resolve(),
+            args.page_size,
+            args.headless,
+            browser_service=args.browser_service,
+            lean=args.lean,
+            journal_path=Path(args.journal).resolve() if args.journal else None,
+            resume=args.resume,
+            op_timeout=args.op_timeout or None,
+            retries=args.retries,
+            retry_backoff=args.retry_backoff,
+            metrics_path=Path(args.metrics_out).resolve() if args.metrics_out else None,
+        )
+    )
 
 
 if __name__ == "__main__":
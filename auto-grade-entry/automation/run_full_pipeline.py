@@ -1,46 +1,111 @@
+"""
+完整闭环：Excel → 浏览器批量分页录入 → 一次提交（grades.json 作为产物另存）。
+
+Excel 解析（pandas）放到工作线程里，与浏览器启动、打开页面、等待钩子同时进行；解析结果直接在内存里交给录入，
+grades.json 在后台线程写盘，只作为留档/断点续跑的产物。关键路径从「解析 + 启动浏览器」变为两者取最大。
+"""
 import argparse
 import asyncio
-import json
+import time
 from pathlib import Path
+from typing import Any, Dict, List, Tuple
 
-from extract_excel import read_excel_grades
-from run_batch_playwright import run as run_batch
 
+def write_artifact(out_path: Path, raw: bytes) -> None:
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    tmp.write_bytes(raw)
+    tmp.replace(out_path)
 
-def write_grades_json(out_path: Path, grades_rows, meta) -> None:
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    payload = {
-        "meta": meta,
-        "grades": [g.__dict__ for g in grades_rows],
-    }
-    out_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+async def run_pipeline(args: argparse.Namespace, excel_path: Path, out_path: Path) -> int:
+    from extract_excel import extract_grades_json
+    from run_batch_playwright import run as run_batch
+
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    writes: List["asyncio.Future[None]"] = []
+
+    async def pending_grades() -> Tuple[List[Dict[str, Any]], bytes]:
+        # 字节内容与 grades.json 文件一致：断点日志的 run key 由它计算，单独跑 run_batch_playwright 也能续上
+        grades, raw = await loop.run_in_executor(
+            None, extract_grades_json, excel_path, args.sheet, args.default_class, args.default_course
+        )
+        print(f"Excel 解析完成：{len(grades)} 条（{time.perf_counter() - t0:.2f}s）")
+        writes.append(loop.run_in_executor(None, write_artifact, out_path, raw))
+        return grades, raw
+
+    # 先把解析任务交给线程池，再启动浏览器；run_batch 等页面钩子就绪后才 await 解析结果
+    extraction = asyncio.ensure_future(pending_grades())
+    try:
+        rc = await run_batch(
+            args.url,
+            out_path,
+            args.page_size,
+            args.headless,
+            browser_service=args.browser_service,
+            lean=args.lean,
+            resume=args.resume,
+            pending_grades=extraction,
+        )
+    finally:
+        if not extraction.done():
+            extraction.cancel()  # 浏览器一侧先失败：不再等解析结果（线程里的解析会自行跑完）
+        await asyncio.gather(*writes)
+    print(f"已生成：{out_path}")
+    return rc
 
 
 def main() -> int:
-    ap = argparse.ArgumentParser(description="完整闭环：Excel → JSON → 浏览器批量分页录入 → 一次提交")
-    ap.add_argument("--excel", required=True, help="Excel 路径，例如 data.xlsx")
-    ap.add_argument("--url", required=True, help="成绩录入网页 URL，例如 http://localhost:5173")
+    ap = argparse.ArgumentParser(
+        description="完整闭环：Excel 解析与浏览器启动并行 → 批量分页录入 → 一次提交（grades.json 另存）；--manifest 批量跑多个工作簿"
+    )
+    ap.add_argument("--excel", default=None, help="Excel 路径，例如 data.xlsx（单作业模式必填）")
+    ap.add_argument("--url", default=None, help="成绩录入网页 URL，例如 http://localhost:5173（单作业模式必填）")
     ap.add_argument("--sheet", default=None, help="工作表名称（不填则读取第一个）")
     ap.add_argument("--out", default="automation/grades.json", help="输出 JSON 路径（默认 automation/grades.json）")
     ap.add_argument("--default-class", default=None, help="当 Excel 没有班级列时使用")
     ap.add_argument("--default-course", default=None, help="当 Excel 没有课程列时使用")
     ap.add_argument("--page-size", type=int, default=10, help="每页条数（需与网页选项一致）")
     ap.add_argument("--headless", action="store_true", help="无头模式运行（默认有头，方便观察）")
+    ap.add_argument("--browser-service", default=None, help="常驻浏览器服务地址，例如 http://127.0.0.1:9400（可选）")
+    ap.add_argument("--lean", action="store_true", help="精简页面配置（拦截非必要资源、关动画），建议配合 --headless")
+    ap.add_argument("--resume", action="store_true", help="断点续跑：跳过断点日志（<out>.journal.jsonl）中已确认提交的页（清单模式对每个作业生效）")
+    ap.add_argument("--manifest", default=None, help="作业清单 JSON（多个工作簿/班级/课程/网址/账号，格式见 job_queue.py）")
+    ap.add_argument("--out-dir", default="automation/jobs", help="清单模式：各作业 grades.json 等产物目录（默认 automation/jobs）")
+    ap.add_argument("--contexts", type=int, default=2, help="清单模式：同时录入的作业数（浏览器 context 数，默认 2）")
+    ap.add_argument("--extract-workers", type=int, default=None, help="清单模式：Excel 解析进程数（默认 CPU 核数）")
+    ap.add_argument("--job-retries", type=int, default=1, help="清单模式：单个作业录入失败后的重试次数（默认 1）")
+    ap.add_argument("--summary-out", default=None, help="清单模式：JSON 汇总路径（默认 <清单同名>.summary.json）")
     args = ap.parse_args()
 
+    if args.manifest:
+        from job_queue import load_manifest, run_queue
+
+        manifest = Path(args.manifest).expanduser().resolve()
+        jobs = load_manifest(manifest, Path(args.out_dir).expanduser().resolve(), args.page_size)
+        summary = Path(args.summary_out).resolve() if args.summary_out else manifest.with_name(manifest.stem + ".summary.json")
+        return asyncio.run(
+            run_queue(
+                jobs,
+                contexts=args.contexts,
+                extract_workers=args.extract_workers,
+                headless=args.headless,
+                lean=args.lean,
+                browser_service=args.browser_service,
+                job_retries=args.job_retries,
+                summary_path=summary,
+                resume=args.resume,
+            )
+        )
+    if not args.excel or not args.url:
+        ap.error("单作业模式需要 --excel 和 --url（或用 --manifest 批量运行）")
+
     excel_path = Path(args.excel).expanduser().resolve()
     out_path = Path(args.out).expanduser().resolve()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    grades_rows, meta = read_excel_grades(
-        excel_path=excel_path,
-        sheet=args.sheet,
-        default_class=args.default_class,
-        default_course=args.default_course,
-    )
-    write_grades_json(out_path, grades_rows, meta)
-    print(f"已生成：{out_path}")
-
-    return asyncio.run(run_batch(args.url, out_path, args.page_size, args.headless))
+    # 重依赖（pandas / playwright）在 run_pipeline 里才导入：--help / 参数错误不加载
+    return asyncio.run(run_pipeline(args, excel_path, out_path))
 
 
 if __name__ == "__main__":
@@ -1,30 +1,41 @@
 import argparse
 import asyncio
-import json
 import os
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from dotenv import load_dotenv
-
-from browser_use import Agent
-from browser_use.llm import ChatDeepSeek
+from grade_store import GradeStore, print_duplicates
 
 
 def load_grades_for_name(grades_path: Path, name: str) -> Optional[Dict[str, Any]]:
-    payload = json.loads(grades_path.read_text(encoding="utf-8"))
-    grades: List[Dict[str, Any]]
-    if isinstance(payload, list):
-        grades = payload
-    elif isinstance(payload, dict) and isinstance(payload.get("grades"), list):
-        grades = payload["grades"]
-    else:
-        return None
+    # 走 grades.json 旁的 SQLite 索引（首次或 JSON 变化后自动重建），改一个人不再解析整份 JSON
+    with GradeStore.for_json(grades_path) as store:
+        return store.get(name)
 
-    for g in grades:
-        if str(g.get("name", "")).strip() == name:
-            return g
-    return None
+
+def select_students(
+    store: GradeStore,
+    names: List[str],
+    class_name: Optional[str] = None,
+    course: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    多人模式的名单：names 非空时按给定顺序逐个查找，否则取全部（可按班级/课程过滤）。
+    只保留平时、考试都有值的记录；返回 (学生列表, 找不到或缺成绩的姓名)。
+    """
+    if names:
+        found = [(n, store.get(n, class_name, course)) for n in names]
+    else:
+        found = [(str(g.get("name", "")).strip(), g) for g in store.select(class_name, course)]
+    students: List[Dict[str, Any]] = []
+    skipped: List[str] = []
+    for n, g in found:
+        if g is None or g.get("usual") is None or g.get("exam") is None:
+            skipped.append(n)
+        else:
+            students.append({"name": str(g.get("name", "")).strip(), "usual": int(g["usual"]), "exam": int(g["exam"])})
+    return students, skipped
 
 
 def build_task(url: str, name: str, usual: int, exam: int) -> str:
@@ -46,45 +57,237 @@ def build_task(url: str, name: str, usual: int, exam: int) -> str:
 """
 
 
-async def main_async(url: str, name: str, usual: int, exam: int) -> None:
+# 两种模式共用的省 token 设置
+AGENT_SETTINGS: Dict[str, Any] = {
+    "use_vision": False,
+    "max_history_items": 8,  # 重点：限制历史上下文，减少 token
+    "flash_mode": True,  # 重点：跳过冗余思考/评估，进一步降 token
+    "max_actions_per_step": 6,
+}
+
+# 多人模式下 Agent 在 done 里逐行汇报的状态
+OUTCOME_STATUSES = ("已提交", "失败")
+
+
+def build_batch_task(url: str, students: List[Dict[str, Any]], first: bool) -> str:
+    rows = "\n".join(f"{s['name']}|{s['usual']}|{s['exam']}" for s in students)
+    opening = f"1) 打开网址：{url}" if first else "1) 继续使用当前已打开的成绩录入页面，不要重新打开或刷新。"
+    return f"""
+你在一个本地网页里批量录入学生成绩。请严格按步骤操作，尽量少走弯路：
+
+{opening}
+2) 对下表每个学生依次完成（可以在同一步里连续执行多个动作）：
+   - 清空“搜索姓名”输入框（id 是 #searchInput），输入该学生姓名，让表格只显示该学生
+   - 点击“平时成绩”单元格 → 弹窗输入框出现 → 输入平时成绩 → 按回车保存
+   - 点击“考试成绩”单元格 → 输入考试成绩 → 按回车保存
+3) 本组全部改完后，清空搜索框，点击“提交全部”按钮（#submitAllBtn）一次；不要每改一人就提交。
+4) 逐个搜索本组学生，确认“状态”为“已提交”。
+5) 调用 done 结束，结果文本每行一个学生，格式为：姓名|已提交 或 姓名|失败|原因。
+
+注意：
+- 每次输入成绩都要按回车保存（ESC 是取消）
+- 搜不到的学生不要新增，直接记为 姓名|失败|找不到该学生
+
+数据（姓名|平时|考试，共 {len(students)} 人）：
+{rows}
+"""
+
+
+def parse_outcomes(text: Optional[str], students: List[Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
+    """解析 Agent 的逐行汇报；没有汇报到的学生记为「未确认」。"""
+    reported: Dict[str, Dict[str, str]] = {}
+    for line in (text or "").splitlines():
+        parts = [x.strip() for x in line.strip().strip("-*").split("|")]
+        if len(parts) >= 2 and parts[1] in OUTCOME_STATUSES:
+            reported[parts[0]] = {"status": parts[1], "detail": parts[2] if len(parts) > 2 else ""}
+    return {s["name"]: reported.get(s["name"], {"status": "未确认", "detail": ""}) for s in students}
+
+
+def _make_llm():
+    from dotenv import load_dotenv
+
+    from browser_use.llm import ChatDeepSeek
+
     load_dotenv()
     api_key = os.getenv("DEEPSEEK_API_KEY")
     if not api_key:
         raise RuntimeError("未设置 DEEPSEEK_API_KEY。请在 .env 中配置，或设置环境变量。")
 
     base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
-
-    llm = ChatDeepSeek(
+    return ChatDeepSeek(
         base_url=base_url,
         model="deepseek-chat",
         api_key=api_key,
     )
 
+
+async def main_async(url: str, name: str, usual: int, exam: int, report_path: Optional[Path] = None) -> None:
+    # browser_use 导入很重（数秒），放到真正要跑 Agent 时再导入，--help / 参数错误秒回
+    from browser_use import Agent
+
+    from agent_telemetry import LLMCallTimer, build_report, print_summary, write_report
+
+    t0 = time.perf_counter()
+    llm = _make_llm()
+    timer = LLMCallTimer()
+    timer.attach(llm)
+
     agent = Agent(
         task=build_task(url=url, name=name, usual=usual, exam=exam),
         llm=llm,
-        use_vision=False,
-        max_history_items=8,  # 重点：限制历史上下文，减少 token
-        flash_mode=True,  # 重点：跳过冗余思考/评估，进一步降 token
-        max_actions_per_step=6,
+        **AGENT_SETTINGS,
     )
 
-    await agent.run(max_steps=25)
+    history = await agent.run(max_steps=25)
+
+    done = bool(history and history.is_done())
+    report = build_report(history, timer.calls, time.perf_counter() - t0, 1 if done else 0, done, name=name)
+    print_summary(report)
+    if report_path is not None:
+        write_report(report, report_path)
+        print(f"运行报告：{report_path}")
+
+
+async def main_async_multi(
+    url: str,
+    students: List[Dict[str, Any]],
+    group_size: int = 10,
+    max_steps: Optional[int] = None,
+    report_path: Optional[Path] = None,
+) -> int:
+    """
+    多人模式：一个浏览器、一个 Agent 串行处理所有学生。
+    按 group_size 分组，每组改完再「提交全部」一次；第二组起用 add_new_task 追加到同一会话，
+    页面、登录状态与 LLM 连接都保持热的，不再每人冷启动一次。
+    """
+    from browser_use import Agent, Browser
+
+    from agent_telemetry import LLMCallTimer, build_report, print_summary, write_report
+
+    t0 = time.perf_counter()
+    llm = _make_llm()
+    timer = LLMCallTimer()
+    timer.attach(llm)
+
+    browser = Browser(keep_alive=True)  # 各组之间不关浏览器，最后统一关闭
+    groups = [students[i : i + group_size] for i in range(0, len(students), group_size)]
+    outcomes: Dict[str, Dict[str, str]] = {}
+    history = None
+    agent = None
+    all_done = True
+    group_done = False
+    try:
+        for gi, group in enumerate(groups, 1):
+            # 上一组出错或没跑完时页面状态未知（可能根本没打开）：本组重新打开网址，而不是沿用当前页面
+            task = build_batch_task(url, group, first=(gi == 1 or not group_done))
+            if agent is None:
+                agent = Agent(task=task, llm=llm, browser=browser, **AGENT_SETTINGS)
+            else:
+                agent.add_new_task(task)
+            print(f"[组 {gi}/{len(groups)}] {len(group)} 人：{', '.join(s['name'] for s in group)}")
+            try:
+                history = await agent.run(max_steps=max_steps or 6 + 4 * len(group))
+                group_done = bool(history and history.is_done())
+                result = history.final_result() if group_done else None
+            except Exception as e:
+                print(f"[组 {gi}/{len(groups)}] 运行异常：{e}")
+                group_done, result = False, None
+            all_done = all_done and group_done
+            outcomes.update(parse_outcomes(result, group))
+    finally:
+        try:
+            await browser.kill()
+        except Exception:
+            pass
+
+    per_student = [{**s, **outcomes.get(s["name"], {"status": "未确认", "detail": ""})} for s in students]
+    submitted = sum(1 for s in per_student if s["status"] == "已提交")
+    report = build_report(
+        history,
+        timer.calls,
+        time.perf_counter() - t0,
+        submitted,
+        all_done,
+        groups=len(groups),
+        students=per_student,
+    )
+    print_summary(report, title=f"多人运行统计（{len(students)} 人，{len(groups)} 组）")
+    print("\n===== 逐人结果 =====")
+    for s in per_student:
+        detail = f"（{s['detail']}）" if s["detail"] else ""
+        print(f"  {s['name']}  平时 {s['usual']} 考试 {s['exam']}  → {s['status']}{detail}")
+    print(f"已提交 {submitted}/{len(students)}")
+    if report_path is not None:
+        write_report(report, report_path)
+        print(f"运行报告：{report_path}")
+    return 0 if submitted == len(students) else 1
+
+
+def _split_names(values: Optional[List[str]]) -> List[str]:
+    out: List[str] = []
+    for v in values or []:
+        for n in v.replace("，", ",").split(","):
+            n = n.strip()
+            if n and n not in out:
+                out.append(n)
+    return out
 
 
 def main() -> int:
-    ap = argparse.ArgumentParser(description="初版：browser-use + DeepSeek 跑通单个学生录入+提交")
+    ap = argparse.ArgumentParser(description="browser-use + DeepSeek 录入+提交：单个学生，或多人共用一个浏览器/Agent 会话")
     ap.add_argument("--url", required=True, help="成绩录入网页 URL，例如 http://localhost:5173")
-    ap.add_argument("--name", required=True, help="学生姓名（与网页名单匹配）")
+    ap.add_argument(
+        "--name",
+        action="append",
+        default=None,
+        help="学生姓名（与网页名单匹配）；可重复或用逗号分隔多个姓名，多人时成绩从 --grades 读取",
+    )
+    ap.add_argument("--all", action="store_true", help="多人模式：录入 --grades 里的全部学生（可配合 --class/--course 过滤）")
+    ap.add_argument("--class", dest="class_name", default=None, help="多人模式：只取 grades.json 里该班级的学生")
+    ap.add_argument("--course", default=None, help="多人模式：只取 grades.json 里该课程的学生")
+    ap.add_argument("--group-size", type=int, default=10, help="多人模式：每组人数，改完一组提交一次（默认 10）")
+    ap.add_argument("--max-steps", type=int, default=None, help="多人模式：每组最大步数（默认 6 + 4×本组人数）")
     ap.add_argument("--usual", type=int, default=None, help="平时成绩（0-100）。不填则尝试从 --grades 里按姓名读取")
     ap.add_argument("--exam", type=int, default=None, help="考试成绩（0-100）。不填则尝试从 --grades 里按姓名读取")
     ap.add_argument("--grades", default=None, help="grades.json 路径（extract_excel.py 输出），用于自动取数")
+    ap.add_argument(
+        "--report",
+        default="automation/single_run.report.json",
+        help="JSON 运行报告路径（逐步耗时/token/LLM 与浏览器耗时拆分，多人模式含逐人结果；默认 automation/single_run.report.json）",
+    )
     args = ap.parse_args()
 
+    names = _split_names(args.name)
+    if args.all or len(names) > 1:
+        if not args.grades:
+            ap.error("多人模式需要 --grades 提供成绩")
+        if args.usual is not None or args.exam is not None:
+            ap.error("多人模式的成绩从 --grades 读取，不能同时指定 --usual/--exam")
+        with GradeStore.for_json(Path(args.grades).resolve()) as store:
+            print_duplicates(store.duplicates())
+            students, skipped = select_students(store, [] if args.all else names, args.class_name, args.course)
+        if skipped:
+            print(f"⚠️ 以下学生在 grades.json 中找不到或缺少成绩，已跳过：{skipped}")
+        if not students:
+            print("没有可录入的学生。")
+            return 1
+        return asyncio.run(
+            main_async_multi(
+                args.url,
+                students,
+                group_size=max(1, args.group_size),
+                max_steps=args.max_steps,
+                report_path=Path(args.report).resolve(),
+            )
+        )
+    if not names:
+        ap.error("请指定 --name，或用 --all 配合 --grades 录入多人")
+    name = names[0]
+
     usual = args.usual
     exam = args.exam
     if (usual is None or exam is None) and args.grades:
-        g = load_grades_for_name(Path(args.grades).resolve(), args.name)
+        g = load_grades_for_name(Path(args.grades).resolve(), name)
         if g:
             usual = usual if usual is not None else g.get("usual")
             exam = exam if exam is not None else g.get("exam")
@@ -94,10 +297,9 @@ def main() -> int:
     if exam is None:
         exam = 40
 
-    asyncio.run(main_async(args.url, args.name, int(usual), int(exam)))
+    asyncio.run(main_async(args.url, name, int(usual), int(exam), Path(args.report).resolve()))
     return 0
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
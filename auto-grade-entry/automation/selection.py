@@ -0,0 +1,33 @@
+"""
+当前班级+课程的口径：批量脚本与免浏览器写回都只处理网页当前选中的班级+课程，对账也按同一口径取目标与行。
+
+- selection_targets：grades.json 中属于当前选择的记录（班级兼容 className，见 grade_store.class_of）；
+- selection_rows：state 里属于当前选择的全部行（不受搜索词影响）；
+- reconcile_state：两者交给 reconcile.reconcile 逐条比对。
+"""
+from typing import Any, Dict, List
+
+from grade_store import class_of
+from reconcile import reconcile
+
+
+def selection_targets(grades: List[Dict[str, Any]], state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """grades.json 中属于当前班级+课程的记录（记录未写班级/课程时视为属于当前选择）。"""
+    cls, course = state.get("selectedClass"), state.get("selectedCourse")
+    return [
+        g
+        for g in grades
+        if str(g.get("name", "")).strip()
+        and (not class_of(g) or class_of(g) == cls)
+        and (not g.get("course") or g.get("course") == course)
+    ]
+
+
+def selection_rows(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """当前班级+课程下的全部行（不受搜索词影响）。"""
+    cls, course = state.get("selectedClass"), state.get("selectedCourse")
+    return [r for r in state.get("rows", []) if r.get("className") == cls and r.get("course") == course]
+
+
+def reconcile_state(grades: List[Dict[str, Any]], state: Dict[str, Any]) -> Dict[str, Any]:
+    return reconcile(selection_targets(grades, state), selection_rows(state))
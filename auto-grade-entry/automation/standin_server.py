@@ -0,0 +1,433 @@
+"""
+本地替身成绩服务器：不依赖真实学校系统（也不需要 Node），在进程内提供 web/ 页面与录入所需的接口，供基准和联调使用。
+
+- 静态资源：web/ 目录（未知路径回到 login.html，同 server/server.js）；
+- 接口（语义同 server/server.js，状态只放内存）：
+    POST /api/auth/login    账号密码正确时写 token cookie
+    POST /api/auth/logout
+    GET  /api/me
+    GET  /api/state         当前账号的 state（带 version 与 ETag）
+    PUT  /api/state         整份覆盖（If-Match 不符时 409）
+    PATCH /api/state/rows   行级增量（If-Match 不符时 409，未知行 id 时 422）
+    GET  /api/admin/users               管理员：账号列表
+    GET  /api/admin/state/:userId       管理员：某账号的 state（没有时返回空 state）
+- synthetic_roster() 生成可复现的合成名单（班级/课程/学号/不重名的中文姓名）与对应的目标成绩，
+  preload() 把名单写成某个账号的 state；stats 统计请求数、state 整份/增量写入次数与上传字节数。
+- latency：每个接口请求先等这么多秒再处理，模拟校园网/远端服务器的往返延迟（静态资源不受影响）。
+
+用法（单独起一个预置了 500 人名单的服务器，账号 bench / bench）：
+  python automation/standin_server.py --port 5999 --rows 500
+"""
+import argparse
+import json
+import mimetypes
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from grade_state import ROW_DELTA_FIELDS
+
+WEB_DIR = Path(__file__).resolve().parent.parent / "web"
+
+_SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤"
+_GIVEN = "伟芳娜秀敏静丽强磊军洋勇艳杰娟涛明超霞平刚桂英华玉兰萍红鹏辉建文斌宇浩凯晨欣怡博雪琳涵子轩梓萱雨泽思佳嘉俊宏瑞睿"
+
+
+def synthetic_roster(
+    n: int,
+    class_name: str = "一班",
+    course: str = "数学",
+    seed: int = 0,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    生成 n 个不重名学生：返回 (网页 state.rows, grades.json 的 grades 列表)。
+    行未填分、未提交；目标成绩在 40–100 之间，同一 seed 结果相同。
+    """
+    rng = random.Random(seed)
+    space = len(_SURNAMES) * len(_GIVEN) * (len(_GIVEN) + 1)
+    if n > space:
+        raise ValueError(f"合成名单最多 {space} 人")
+    rows: List[Dict[str, Any]] = []
+    grades: List[Dict[str, Any]] = []
+    for i, k in enumerate(rng.sample(range(space), n), 1):
+        k, g2 = divmod(k, len(_GIVEN) + 1)
+        s, g1 = divmod(k, len(_GIVEN))
+        name = _SURNAMES[s] + _GIVEN[g1] + (_GIVEN[g2 - 1] if g2 else "")
+        student_no = f"2024{i:05d}"
+        rows.append(
+            {
+                "id": f"S{i:04d}",
+                "className": class_name,
+                "name": name,
+                "course": course,
+                "studentNo": student_no,
+                "usual": None,
+                "exam": None,
+                "submitted": False,
+                "submittedAt": None,
+                "dirty": False,
+                "lastUpdatedAt": None,
+            }
+        )
+        grades.append(
+            {
+                "name": name,
+                "class_name": class_name,
+                "course": course,
+                "usual": rng.randint(40, 100),
+                "exam": rng.randint(40, 100),
+                "final": None,
+                "source_row": i + 1,
+                "student_no": student_no,
+            }
+        )
+    return rows, grades
+
+
+def roster_state(rows: List[Dict[str, Any]], class_name: str, course: str) -> Dict[str, Any]:
+    """与网页 buildInitialState 同结构的 state，已选中名单所在的班级+课程。"""
+    return {
+        "selectedClass": class_name,
+        "selectedCourse": course,
+        "pageSize": 10,
+        "pageIndex": 1,
+        "search": "",
+        "rows": rows,
+        "isSample": False,
+        "autoSubmitOnImport": True,
+        "deletedAt": None,
+        "gradeFormula": None,
+    }
+
+
+class StandInServer:
+    """进程内替身服务器（后台线程）；可作上下文管理器使用。port=0 时自动选空闲端口。"""
+
+    def __init__(
+        self,
+        users: Dict[str, str],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        web_dir: Path = WEB_DIR,
+        admins: Iterable[str] = (),
+        latency: float = 0.0,
+    ) -> None:
+        self.users = dict(users)
+        self.latency = latency
+        self.admins = set(admins)  # 账号 id 即用户名
+        self.web_dir = web_dir
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._tokens: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self.reset_stats()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {"requests": 0, "state_gets": 0, "state_puts": 0, "row_patches": 0, "state_bytes_in": 0}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def preload(self, username: str, state: Dict[str, Any]) -> None:
+        self.set_state(username, state)
+
+    def get_state(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            st = self._states.get(username)
+            return json.loads(json.dumps(st)) if st is not None else None
+
+    def set_state(self, username: str, state: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        """整份覆盖，返回新版本号；expected_version 与当前版本不符时抛 VersionMismatch。"""
+        data = json.loads(json.dumps(state))
+        with self._lock:
+            version = _version(self._states.get(username))
+            if expected_version is not None and expected_version != version:
+                raise VersionMismatch(version)
+            data["version"] = version + 1
+            self._states[username] = data
+            return data["version"]
+
+    def patch_rows(self, username: str, rows: List[Dict[str, Any]], expected_version: Optional[int] = None) -> int:
+        """行级增量（整批原子生效），返回新版本号；语义同 server/storage.js 的 applyRowDeltasForUser。"""
+        with self._lock:
+            st = self._states.get(username)
+            version = _version(st)
+            if expected_version is not None and expected_version != version:
+                raise VersionMismatch(version)
+            by_id = {r.get("id"): r for r in (st or {}).get("rows") or []}
+            unknown = [d.get("id") for d in rows if d.get("id") not in by_id]
+            if st is None or unknown:
+                raise KeyError(unknown)
+            for d in rows:
+                by_id[d["id"]].update({k: d[k] for k in ROW_DELTA_FIELDS if k in d})
+            st["version"] = version + 1
+            return st["version"]
+
+    def login(self, username: str, password: str) -> Optional[str]:
+        if not username or self.users.get(username) != password:
+            return None
+        token = secrets.token_hex(16)
+        with self._lock:
+            self._tokens[token] = username
+        return token
+
+    def user_for(self, token: Optional[str]) -> Optional[str]:
+        with self._lock:
+            return self._tokens.get(token or "")
+
+    def role_of(self, username: str) -> str:
+        return "admin" if username in self.admins else "teacher"
+
+    def add_user(self, username: str, password: str, admin: bool = False) -> None:
+        with self._lock:
+            self.users[username] = password
+            if admin:
+                self.admins.add(username)
+
+
+class VersionMismatch(Exception):
+    def __init__(self, version: int) -> None:
+        super().__init__("VERSION_CONFLICT")
+        self.version = version
+
+
+def _version(state: Optional[Dict[str, Any]]) -> int:
+    v = (state or {}).get("version")
+    return v if isinstance(v, int) else 0
+
+
+def _make_handler(server: StandInServer):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt: str, *args: Any) -> None:  # 静默访问日志
+            pass
+
+        def _send(self, code: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> Dict[str, Any]:
+            n = int(self.headers.get("Content-Length") or 0)
+            if n <= 0:
+                return {}
+            raw = self.rfile.read(n)
+            if self.command in ("PUT", "PATCH"):
+                server._count("state_bytes_in", len(raw))
+            try:
+                data = json.loads(raw.decode("utf-8"))
+            except Exception:
+                return {}
+            return data if isinstance(data, dict) else {}
+
+        def _if_match(self) -> Optional[int]:
+            tag = (self.headers.get("If-Match") or "").strip().removeprefix("W/").strip('"')
+            return int(tag) if tag.isdigit() else None
+
+        def _delay(self) -> None:
+            if server.latency > 0:
+                time.sleep(server.latency)
+
+        def _user(self) -> Optional[str]:
+            for part in (self.headers.get("Cookie") or "").split(";"):
+                k, _, v = part.strip().partition("=")
+                if k == "token":
+                    return server.user_for(v)
+            return None
+
+        def _static(self, path: str) -> None:
+            rel = unquote(path).lstrip("/") or "index.html"
+            target = (server.web_dir / rel).resolve()
+            if not target.is_relative_to(server.web_dir.resolve()) or not target.is_file():
+                target = server.web_dir / "login.html"
+            body = target.read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", mimetypes.guess_type(target.name)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            server._count("requests")
+            path = urlsplit(self.path).path
+            if path.startswith("/api/"):
+                self._delay()
+            if path == "/api/me":
+                user = self._user()
+                if not user:
+                    self._send(401, {"error": "未登录"})
+                    return
+                self._send(200, {"user": {"id": user, "username": user, "role": server.role_of(user)}})
+                return
+            if path == "/api/state":
+                user = self._user()
+                if not user:
+                    self._send(401, {"error": "未登录"})
+                    return
+                server._count("state_gets")
+                st = server.get_state(user)
+                self._send(200, {"state": st, "version": _version(st)}, {"ETag": f'"{_version(st)}"'})
+                return
+            if path == "/api/admin/users" or path.startswith("/api/admin/state/"):
+                user = self._user()
+                if not user:
+                    self._send(401, {"error": "UNAUTHENTICATED"})
+                    return
+                if server.role_of(user) != "admin":
+                    self._send(403, {"error": "FORBIDDEN"})
+                    return
+                if path == "/api/admin/users":
+                    users = [{"id": u, "username": u, "role": server.role_of(u)} for u in sorted(server.users)]
+                    self._send(200, {"users": users})
+                    return
+                server._count("state_gets")
+                st = server.get_state(unquote(path[len("/api/admin/state/"):]))
+                self._send(200, {"state": st if st is not None else roster_state([], "", "")})
+                return
+            if path.startswith("/api/"):
+                self._send(404, {"error": "not found"})
+                return
+            self._static(path)
+
+        def do_POST(self) -> None:
+            server._count("requests")
+            path = urlsplit(self.path).path
+            self._delay()
+            body = self._body()
+            if path == "/api/auth/login":
+                username, password = str(body.get("username") or ""), str(body.get("password") or "")
+                if not username or not password:
+                    self._send(400, {"error": "缺少用户名或密码"})
+                    return
+                token = server.login(username, password)
+                if not token:
+                    self._send(401, {"error": "用户名或密码错误"})
+                    return
+                user = {"id": username, "username": username, "role": server.role_of(username)}
+                self._send(200, {"ok": True, "user": user}, {"Set-Cookie": f"token={token}; Path=/; HttpOnly; SameSite=Lax"})
+                return
+            if path == "/api/auth/logout":
+                self._send(200, {"ok": True}, {"Set-Cookie": "token=; Path=/; Max-Age=0"})
+                return
+            self._send(404, {"error": "not found"})
+
+        def do_PUT(self) -> None:
+            server._count("requests")
+            self._delay()
+            if urlsplit(self.path).path != "/api/state":
+                self._send(404, {"error": "not found"})
+                return
+            user = self._user()
+            if not user:
+                self._send(401, {"error": "未登录"})
+                return
+            state = self._body().get("state")
+            if not isinstance(state, dict):
+                self._send(400, {"error": "state 必须是对象"})
+                return
+            server._count("state_puts")
+            try:
+                version = server.set_state(user, state, self._if_match())
+            except VersionMismatch as e:
+                self._send(409, {"error": "VERSION_CONFLICT", "version": e.version})
+                return
+            self._send(200, {"ok": True, "version": version}, {"ETag": f'"{version}"'})
+
+        def do_PATCH(self) -> None:
+            server._count("requests")
+            self._delay()
+            if urlsplit(self.path).path != "/api/state/rows":
+                self._send(404, {"error": "not found"})
+                return
+            user = self._user()
+            if not user:
+                self._send(401, {"error": "未登录"})
+                return
+            rows = self._body().get("rows")
+            if not isinstance(rows, list) or not rows or not all(isinstance(d, dict) and isinstance(d.get("id"), str) for d in rows):
+                self._send(400, {"error": "rows 必须是非空数组，且每行都有字符串 id"})
+                return
+            server._count("row_patches")
+            try:
+                version = server.patch_rows(user, rows, self._if_match())
+            except VersionMismatch as e:
+                self._send(409, {"error": "VERSION_CONFLICT", "version": e.version})
+                return
+            except KeyError as e:
+                self._send(422, {"error": "UNKNOWN_ROWS", "ids": (e.args[0] or [])[:50]})
+                return
+            self._send(200, {"ok": True, "version": version, "applied": len(rows)}, {"ETag": f'"{version}"'})
+
+    return Handler
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="本地替身成绩服务器：提供 web/ 页面与 /api/state 等接口，可预置合成名单")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5999)
+    ap.add_argument("--user", default="bench", help="账号（默认 bench）")
+    ap.add_argument("--password", default="bench", help="密码（默认 bench）")
+    ap.add_argument("--rows", type=int, default=0, help="预置的合成名单人数（默认 0：不预置）")
+    ap.add_argument("--class", dest="class_name", default="一班")
+    ap.add_argument("--course", default="数学")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--grades-out", default=None, help="把合成名单对应的目标成绩写成 grades.json（可选）")
+    ap.add_argument("--latency", type=float, default=0.0, help="每个接口请求的模拟延迟（秒，默认 0）")
+    args = ap.parse_args()
+
+    server = StandInServer({args.user: args.password}, host=args.host, port=args.port, latency=args.latency)
+    if args.rows > 0:
+        rows, grades = synthetic_roster(args.rows, args.class_name, args.course, args.seed)
+        server.preload(args.user, roster_state(rows, args.class_name, args.course))
+        if args.grades_out:
+            out = Path(args.grades_out).resolve()
+            out.parent.mkdir(parents=True, exist_ok=True)
+            payload = {"meta": {"mode": "synthetic", "count": len(grades)}, "grades": grades}
+            out.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f"目标成绩：{out}")
+    server.start()
+    print(f"[standin] {server.url}  账号 {args.user}  预置 {args.rows} 人", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,7 +7,16 @@ import bcrypt from "bcryptjs";
 const __dirname = path.dirname(fileURLToPath(import.meta.url));
 
 import { ensureSeedAdmin, findUserByUsername, findUserById, signToken, requireAuth, requireRole, ROLES, createUser, updateUserPassword, deleteUser } from "./auth.js";
-import { loadStateForUser, saveStateForUser, loadUsers, deleteStateForUser } from "./storage.js";
+import {
+  loadStateForUser,
+  saveStateForUser,
+  applyRowDeltasForUser,
+  stateVersion,
+  StateConflictError,
+  UnknownRowsError,
+  loadUsers,
+  deleteStateForUser,
+} from "./storage.js";
 
 const app = express();
 app.use(express.json({ limit: "2mb" }));
@@ -92,12 +101,25 @@ app.post("/api/auth/change-password", requireAuth, (req, res) => {
 // 空 state 占位，仅用于管理员查看某账号时无文件情况，保证前端拿到统一结构
 const EMPTY_STATE = { rows: [], selectedClass: "", selectedCourse: "", isSample: false };
 
+// 乐观并发：客户端可用 If-Match: "<version>"（或请求体 baseVersion）声明基于哪个版本修改；不带则不校验
+function expectedVersionOf(req) {
+  const m = /^(?:W\/)?"?(\d+)"?$/.exec(String(req.get("If-Match") || "").trim());
+  if (m) return Number(m[1]);
+  const v = req.body?.baseVersion;
+  return Number.isInteger(v) ? v : null;
+}
+
+function sendVersioned(res, version, payload) {
+  res.setHeader("ETag", `"${version}"`);
+  res.json({ ...payload, version });
+}
+
 // 账号隔离的状态读写（每个账号一份）；读写均用规范化 userId 保证一致
 app.get("/api/state", requireAuth, (req, res) => {
   const uid = normalizeUserId(req.user.id);
   if (!uid) return res.status(400).json({ error: "无效的 userId" });
   const st = loadStateForUser(uid);
-  res.json({ state: st });
+  sendVersioned(res, stateVersion(st), { state: st });
 });
 
 app.put("/api/state", requireAuth, (req, res) => {
@@ -105,8 +127,34 @@ app.put("/api/state", requireAuth, (req, res) => {
   if (!state || typeof state !== "object") return res.status(400).json({ error: "state 必须是对象" });
   const uid = normalizeUserId(req.user.id);
   if (!uid) return res.status(400).json({ error: "无效的 userId" });
-  saveStateForUser(uid, state);
-  res.json({ ok: true });
+  try {
+    sendVersioned(res, saveStateForUser(uid, state, expectedVersionOf(req)), { ok: true });
+  } catch (e) {
+    if (e instanceof StateConflictError) return res.status(409).json({ error: "VERSION_CONFLICT", version: e.version });
+    throw e;
+  }
+});
+
+// 行级增量更新：只上传改动的行（按行 id），请求体 { rows: [{id, usual?, exam?, dirty?, submitted?, submittedAt?, lastUpdatedAt?}], baseVersion? }。
+// 整批原子生效；名单里没有的行 id → 422（一行都不改）；版本不符 → 409
+const MAX_DELTA_ROWS = 5000;
+app.patch("/api/state/rows", requireAuth, (req, res) => {
+  const rows = req.body?.rows;
+  if (!Array.isArray(rows) || rows.length === 0) return res.status(400).json({ error: "rows 必须是非空数组" });
+  if (rows.length > MAX_DELTA_ROWS) return res.status(413).json({ error: `单次最多 ${MAX_DELTA_ROWS} 行` });
+  if (rows.some((d) => !d || typeof d !== "object" || typeof d.id !== "string")) {
+    return res.status(400).json({ error: "每行都需要字符串 id" });
+  }
+  const uid = normalizeUserId(req.user.id);
+  if (!uid) return res.status(400).json({ error: "无效的 userId" });
+  try {
+    const version = applyRowDeltasForUser(uid, rows, expectedVersionOf(req));
+    sendVersioned(res, version, { ok: true, applied: rows.length });
+  } catch (e) {
+    if (e instanceof StateConflictError) return res.status(409).json({ error: "VERSION_CONFLICT", version: e.version });
+    if (e instanceof UnknownRowsError) return res.status(422).json({ error: "UNKNOWN_ROWS", ids: e.ids.slice(0, 50) });
+    throw e;
+  }
 });
 
 // 管理员：创建老师账号
@@ -21,9 +21,9 @@ export function readJsonSafe(p, fallback) {
   }
 }
 
-export function writeJsonAtomic(p, obj) {
+export function writeJsonAtomic(p, obj, { pretty = true } = {}) {
   const tmp = `${p}.tmp`;
-  fs.writeFileSync(tmp, JSON.stringify(obj, null, 2), "utf-8");
+  fs.writeFileSync(tmp, pretty ? JSON.stringify(obj, null, 2) : JSON.stringify(obj), "utf-8");
   fs.renameSync(tmp, p);
 }
 
@@ -42,22 +42,148 @@ export function userStatePath(userId) {
   return path.join(STATES_DIR, `${userId}.json`);
 }
 
-export function loadStateForUser(userId) {
-  const p = userStatePath(userId);
-  return readJsonSafe(p, null);
+// 行级增量日志：每次 PATCH 追加一行 {v, rows: [...]}；读时在快照上按版本重放，累积到一定量后合并回快照
+export function userDeltaPath(userId) {
+  ensureDirs();
+  return path.join(STATES_DIR, `${userId}.delta.jsonl`);
 }
 
-export function saveStateForUser(userId, state) {
-  const p = userStatePath(userId);
-  writeJsonAtomic(p, state);
+// 增量日志达到这么多条（或体积超过快照的一半）时合并回快照
+const DELTA_COMPACT_EVERY = 200;
+
+// 允许通过行级增量修改的字段（姓名、班级、课程等名单信息只能整份 PUT）
+export const ROW_DELTA_FIELDS = ["usual", "exam", "dirty", "submitted", "submittedAt", "lastUpdatedAt"];
+
+// 每个账号的 state 常驻内存（快照 + 已重放的日志），避免每次请求都读盘、解析、重放
+const cache = new Map();
+
+export class StateConflictError extends Error {
+  constructor(version) {
+    super("VERSION_CONFLICT");
+    this.version = version;
+  }
 }
 
-export function deleteStateForUser(userId) {
-  const p = userStatePath(userId);
+export class UnknownRowsError extends Error {
+  constructor(ids) {
+    super("UNKNOWN_ROWS");
+    this.ids = ids;
+  }
+}
+
+export function stateVersion(state) {
+  return Number.isInteger(state?.version) ? state.version : 0;
+}
+
+function applyDeltaRows(state, rows) {
+  const byId = new Map(state.rows.map((r, i) => [r.id, i]));
+  for (const d of rows) {
+    const i = byId.get(d.id);
+    if (i === undefined) continue;
+    const next = { ...state.rows[i] };
+    for (const k of ROW_DELTA_FIELDS) if (k in d) next[k] = d[k];
+    state.rows[i] = next;
+  }
+}
+
+function readDeltaLog(userId) {
+  let text;
   try {
-    fs.unlinkSync(p);
+    text = fs.readFileSync(userDeltaPath(userId), "utf-8");
   } catch {
-    // 文件不存在则忽略
+    return [];
+  }
+  const entries = [];
+  for (const line of text.split("\n")) {
+    if (!line.trim()) continue;
+    try {
+      entries.push(JSON.parse(line));
+    } catch {
+      // 进程被杀时尾行可能只写了一半：忽略
+    }
   }
+  return entries;
 }
 
+export function loadStateForUser(userId) {
+  const hit = cache.get(userId);
+  if (hit) return hit.state;
+  const state = readJsonSafe(userStatePath(userId), null);
+  let deltaCount = 0;
+  if (state && Array.isArray(state.rows)) {
+    // 只重放比快照新的条目（合并快照后、截断日志前崩溃时，日志里会留有已合并的旧条目）
+    for (const e of readDeltaLog(userId)) {
+      if (e.v <= stateVersion(state)) continue;
+      applyDeltaRows(state, e.rows || []);
+      state.version = e.v;
+      deltaCount++;
+    }
+  }
+  cache.set(userId, { state, deltaCount, deltaBytes: 0 });
+  return state;
+}
+
+function writeSnapshot(userId, state) {
+  // 快照不缩进：体积小、序列化快；合并后日志清空
+  writeJsonAtomic(userStatePath(userId), state, { pretty: false });
+  try {
+    fs.unlinkSync(userDeltaPath(userId));
+  } catch {
+    // 没有日志则忽略
+  }
+}
+
+// 整份覆盖；返回新版本号。expectedVersion 非空时先做版本比对
+export function saveStateForUser(userId, state, expectedVersion = null) {
+  const current = loadStateForUser(userId);
+  const version = stateVersion(current);
+  if (expectedVersion !== null && expectedVersion !== version) throw new StateConflictError(version);
+  const next = { ...state, version: version + 1 };
+  writeSnapshot(userId, next);
+  cache.set(userId, { state: next, deltaCount: 0, deltaBytes: 0 });
+  return next.version;
+}
+
+// 行级增量：rows 为 [{id, usual?, exam?, dirty?, submitted?, submittedAt?, lastUpdatedAt?}]，整批要么全部生效要么都不生效。
+// 只追加一行日志（与改动条数成正比），不重写整份快照；返回新版本号
+export function applyRowDeltasForUser(userId, rows, expectedVersion = null) {
+  const state = loadStateForUser(userId);
+  if (!state || !Array.isArray(state.rows)) throw new UnknownRowsError(rows.map((d) => d.id));
+  const version = stateVersion(state);
+  if (expectedVersion !== null && expectedVersion !== version) throw new StateConflictError(version);
+  const ids = new Set(state.rows.map((r) => r.id));
+  const unknown = rows.filter((d) => !ids.has(d.id)).map((d) => d.id);
+  if (unknown.length) throw new UnknownRowsError(unknown);
+
+  const clean = rows.map((d) => {
+    const out = { id: d.id };
+    for (const k of ROW_DELTA_FIELDS) if (k in d) out[k] = d[k];
+    return out;
+  });
+  const line = JSON.stringify({ v: version + 1, rows: clean }) + "\n";
+  fs.appendFileSync(userDeltaPath(userId), line, "utf-8");
+  applyDeltaRows(state, clean);
+  state.version = version + 1;
+
+  const entry = cache.get(userId);
+  entry.deltaCount += 1;
+  entry.deltaBytes += Buffer.byteLength(line);
+  const snapshotBytes = state.rows.length * 200; // 估算快照体积，避免为了判断是否合并而序列化整份 state
+  if (entry.deltaCount >= DELTA_COMPACT_EVERY || entry.deltaBytes > snapshotBytes / 2) {
+    writeSnapshot(userId, state);
+    entry.deltaCount = 0;
+    entry.deltaBytes = 0;
+  }
+  return state.version;
+}
+
+export function deleteStateForUser(userId) {
+  cache.delete(userId);
+  for (const p of [userStatePath(userId), userDeltaPath(userId)]) {
+    try {
+      fs.unlinkSync(p);
+    } catch {
+      // 文件不存在则忽略
+    }
+  }
+}
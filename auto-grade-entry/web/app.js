@@ -2388,34 +2388,154 @@ async function boot() {
   await saveStateToServerAndConfirm(state);
   wireEvents();
   renderAll();
+  // 远端名单已载入、事件已绑定：自动化脚本可以开始操作
+  window.__AUTO_GRADE_ENTRY__.ready = true;
+}
+
+boot().catch((e) => {
+  // 启动中途失败（如同步到服务器出错）时 ready 永远不会置 true：记下原因，自动化脚本据此立即失败而不是等到超时
+  console.error(e);
+  const api = window.__AUTO_GRADE_ENTRY__;
+  if (api) api.bootError = String(e?.message ?? e);
+});
+
+// 姓名归一化：NFKC（全角→半角、兼容字符）+ 去掉所有空白（含全角空格）。
+// 与 automation/grade_store.py 的 normalize_name 保持一致。
+function normalizeName(name) {
+  return String(name ?? "").normalize("NFKC").replace(/\s+/g, "");
+}
+
+// 名单索引：归一化姓名 → [{id, className, course, studentNo}]，行 id → 下标。
+// state.rows 换成新数组或条数变化时重建；原地替换某行（改分/提交）不影响姓名、班级、课程与下标，索引仍有效。
+let rosterIndexRows = null;
+let rosterIndexLength = -1;
+let rosterIndex = { byName: new Map(), byId: new Map() };
+
+function getRosterIndex() {
+  if (rosterIndexRows === state.rows && rosterIndexLength === state.rows.length) return rosterIndex;
+  const byName = new Map();
+  const byId = new Map();
+  state.rows.forEach((r, idx) => {
+    byId.set(r.id, idx);
+    const key = normalizeName(r.name);
+    if (!key) return;
+    const entry = { id: r.id, className: r.className, course: r.course, studentNo: r.studentNo ?? null };
+    const list = byName.get(key);
+    if (list) list.push(entry);
+    else byName.set(key, [entry]);
+  });
+  rosterIndex = { byName, byId };
+  rosterIndexRows = state.rows;
+  rosterIndexLength = state.rows.length;
+  return rosterIndex;
+}
+
+// 按姓名找候选行 id；opts 可带 className / course / studentNo 消歧（行上没有学号时不按学号过滤）
+function resolveRowIds(name, opts = {}) {
+  let cands = getRosterIndex().byName.get(normalizeName(name)) || [];
+  const no = opts.studentNo == null ? "" : String(opts.studentNo).trim();
+  if (no && cands.some((c) => c.studentNo != null)) cands = cands.filter((c) => String(c.studentNo ?? "") === no);
+  if (opts.className != null) cands = cands.filter((c) => c.className === opts.className);
+  if (opts.course != null) cands = cands.filter((c) => c.course === opts.course);
+  return cands.map((c) => c.id);
+}
+
+// 写入一行成绩（不保存、不渲染，由调用方统一 saveState + renderAll）
+function applyRowScores(idx, usual, exam, ts) {
+  const updated = { ...state.rows[idx] };
+  updated.usual = clampInt(usual, 0, 100);
+  updated.exam = clampInt(exam, 0, 100);
+  updated.dirty = true;
+  updated.submitted = false;
+  updated.submittedAt = null;
+  updated.lastUpdatedAt = ts;
+  state.rows[idx] = updated;
 }
 
-boot();
-
 // 给自动化脚本用的一些稳定钩子（避免依赖 UI 文案变化）
 window.__AUTO_GRADE_ENTRY__ = {
+  // boot() 完成（远端名单载入、事件绑定）后置为 true；钩子对象本身在此之前就已存在
+  ready: false,
+  // boot() 抛错时为错误信息（此时 ready 保持 false）
+  bootError: null,
   getState: () => JSON.parse(JSON.stringify(state)),
-  getRowIdByName: (name) => {
-    const r = state.rows.find((x) => x.name === name);
-    return r?.id ?? null;
+  normalizeName,
+  // 同名多行时优先当前班级+课程下的行；opts 同 resolveRowIds
+  getRowIdByName: (name, opts = {}) => {
+    const ids = resolveRowIds(name, opts);
+    if (ids.length <= 1) return ids[0] ?? null;
+    const inSelection = resolveRowIds(name, { ...opts, className: state.selectedClass, course: state.selectedCourse });
+    return inSelection[0] ?? ids[0];
+  },
+  // 批量解析姓名：items 为 [{name, className?, course?, studentNo?}]，不写入，只报告匹配情况
+  resolveNames: (items) => {
+    const matched = [];
+    const ambiguous = [];
+    const missing = [];
+    for (const it of items) {
+      const ids = resolveRowIds(it.name, it);
+      if (ids.length === 1) matched.push({ name: it.name, id: ids[0] });
+      else if (ids.length === 0) missing.push(it.name);
+      else ambiguous.push({ name: it.name, ids });
+    }
+    return { matched, ambiguous, missing };
   },
   setRowScores: (rowId, usual, exam) => {
-    const idx = state.rows.findIndex((r) => r.id === rowId);
-    if (idx < 0) return false;
-    const updated = { ...state.rows[idx] };
-    const nextUsual = clampInt(usual, 0, 100);
-    const nextExam = clampInt(exam, 0, 100);
-    updated.usual = nextUsual;
-    updated.exam = nextExam;
-    updated.dirty = true;
-    updated.submitted = false;
-    updated.submittedAt = null;
-    updated.lastUpdatedAt = Date.now();
-    state.rows[idx] = updated;
+    const idx = getRosterIndex().byId.get(rowId);
+    if (idx === undefined) return false;
+    applyRowScores(idx, usual, exam, Date.now());
     saveState(state);
     renderAll();
     return true;
   },
+  // 批量按行 id 写入：items 为 [{rowId, usual, exam}]，整批只保存、渲染一次；返回写入成功的条数
+  setRowScoresBulk: (items) => {
+    const { byId } = getRosterIndex();
+    const ts = Date.now();
+    let n = 0;
+    for (const it of items) {
+      const idx = byId.get(it.rowId);
+      if (idx === undefined) continue;
+      applyRowScores(idx, it.usual, it.exam, ts);
+      n++;
+    }
+    if (n) {
+      saveState(state);
+      renderAll();
+    }
+    return n;
+  },
+  // 批量按姓名写入：items 为 [{name, usual, exam, className?, course?, studentNo?}]；
+  // 未指定班级/课程时限定在当前选择内。只写唯一命中的行，同名无法区分的报告为 ambiguous、不写。
+  setScoresBulk: (items) => {
+    const { byId } = getRosterIndex();
+    const ts = Date.now();
+    const filled = [];
+    const ambiguous = [];
+    const unmatched = [];
+    for (const it of items) {
+      const ids = resolveRowIds(it.name, {
+        className: it.className ?? state.selectedClass,
+        course: it.course ?? state.selectedCourse,
+        studentNo: it.studentNo,
+      });
+      if (ids.length === 0) {
+        unmatched.push(it.name);
+        continue;
+      }
+      if (ids.length > 1) {
+        ambiguous.push({ name: it.name, ids });
+        continue;
+      }
+      applyRowScores(byId.get(ids[0]), it.usual, it.exam, ts);
+      filled.push({ name: it.name, id: ids[0] });
+    }
+    if (filled.length) {
+      saveState(state);
+      renderAll();
+    }
+    return { filled, ambiguous, unmatched };
+  },
   setScoresByName: (name, usual, exam) => {
     const id = window.__AUTO_GRADE_ENTRY__.getRowIdByName(name);
     if (!id) return false;
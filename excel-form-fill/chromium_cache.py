@@ -0,0 +1,144 @@
+"""
+Playwright Chromium 可执行路径的磁盘缓存。
+
+解析路径需要启动一次 sync_playwright() 驱动（Node 子进程，约 0.5–1 s），结果在同一台机器上几乎不变，
+所以解析一次后写入缓存文件；以下任一情况失效并重新解析：
+- 可执行文件不存在，或大小/修改时间变了（浏览器被重装/升级）；
+- 已安装的 playwright 包版本变了（新版本对应新的浏览器 revision）。
+没装 Chromium 的结果也缓存（否则每次启动都白白起一次驱动），Playwright 浏览器目录变了（装了新浏览器）即失效。
+
+sync_playwright() 不能在运行中的事件循环里调用；resolve_chromium() 在事件循环线程里被调用时，改到工作线程里解析。
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+from pathlib import Path
+
+
+def cache_path() -> Path:
+    base = os.getenv("LOCALAPPDATA") if sys.platform == "win32" else os.getenv("XDG_CACHE_HOME")
+    return Path(base or Path.home() / ".cache") / "excel-form-fill" / "chromium.json"
+
+
+def _playwright_version() -> str | None:
+    try:
+        return metadata.version("playwright")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _file_signature(path: str) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _revision(path: str) -> str | None:
+    """从 Playwright 浏览器目录名取 revision（如 .../ms-playwright/chromium-1148/... → 1148）。"""
+    m = re.search(r"chromium[a-z_]*-(\d+)", path.replace("\\", "/"))
+    return m.group(1) if m else None
+
+
+def _browsers_dir() -> Path:
+    """Playwright 浏览器的安装目录（PLAYWRIGHT_BROWSERS_PATH 或各平台默认位置）。"""
+    env = os.getenv("PLAYWRIGHT_BROWSERS_PATH")
+    if env and env != "0":
+        return Path(env)
+    if sys.platform == "win32":
+        return Path(os.getenv("LOCALAPPDATA") or Path.home()) / "ms-playwright"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "ms-playwright"
+    return Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "ms-playwright"
+
+
+def _resolve_sync() -> str | None:
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            path = getattr(p.chromium, "executable_path", None)
+            if path and os.path.isfile(path):
+                return path
+    except Exception:
+        pass
+    return None
+
+
+def _resolve_with_playwright() -> str | None:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _resolve_sync()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_resolve_sync).result()
+
+
+def _load() -> dict | None:
+    try:
+        return json.loads(cache_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _valid(entry: dict | None, pw_version: str | None) -> bool:
+    if not entry or entry.get("playwright") != pw_version:
+        return False
+    if not entry.get("path"):
+        # 未安装的结果：浏览器目录没变才可信
+        return entry.get("missing") is True and _file_signature(str(_browsers_dir())) == entry.get("browsers_dir")
+    return _file_signature(entry["path"]) == entry.get("signature")
+
+
+def _store(entry: dict) -> None:
+    try:
+        cache = cache_path()
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(cache)
+    except OSError:
+        pass  # 缓存目录不可写时只是每次重新解析
+
+
+def resolve_chromium(refresh: bool = False) -> dict:
+    """
+    返回 {"path", "source", "playwright", "revision", "cache"}；source 为 cache / playwright / none。
+    path 为 None 表示未安装 Playwright Chromium（由 browser-use 自行查找浏览器）；该结果同样可能来自缓存。
+    """
+    pw_version = _playwright_version()
+    info = {"path": None, "source": "none", "playwright": pw_version, "revision": None, "cache": str(cache_path())}
+    if pw_version is None:
+        return info
+    entry = None if refresh else _load()
+    if _valid(entry, pw_version):
+        info.update(path=entry["path"], source="cache", revision=entry.get("revision"))
+        return info
+    path = _resolve_with_playwright()
+    if path is None:
+        _store(
+            {
+                "path": None,
+                "missing": True,
+                "playwright": pw_version,
+                "browsers_dir": _file_signature(str(_browsers_dir())),
+                "resolved_at": round(time.time(), 3),
+            }
+        )
+        return info
+    info.update(path=path, source="playwright", revision=_revision(path))
+    _store(
+        {
+            "path": path,
+            "playwright": pw_version,
+            "revision": info["revision"],
+            "signature": _file_signature(path),
+            "resolved_at": round(time.time(), 3),
+        }
+    )
+    return info
@@ -0,0 +1,92 @@
+# 与 auto-grade-entry/automation/csv_grid.py 逐字节相同（本行除外），改动后运行 tools/check_shared_copies.py 校验。
+"""
+CSV/TSV → 与 pd.read_excel 同形的表格，供成绩读取沿用同一套表头/双栏/报表识别。
+
+- 编码：BOM 优先（UTF-8 / UTF-16），否则能按 UTF-8 解开就是 UTF-8，解不开按 GB18030（GBK 的超集，国内 Excel 另存 CSV 的默认编码）；
+- 分隔符：.tsv 或首行 Tab 多于逗号时用 Tab；
+- 单元格一律按文本读（学号前导 0 不丢），空单元格为 NaN；
+- 装了 pyarrow 时用它的多线程列式解析器，否则用 pandas 的 C 解析器；行长不齐（报表另存的 CSV 常见）时按最长行补齐再读。
+
+pandas 只在真正读文件时导入。
+"""
+import codecs
+import csv
+import importlib.util
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CSV_SUFFIXES = (".csv", ".tsv", ".txt")
+# 编码与分隔符只看文件开头这么多字节
+_SNIFF_BYTES = 64 * 1024
+
+
+def is_csv_path(path: Path) -> bool:
+    return Path(path).suffix.lower() in CSV_SUFFIXES
+
+
+def detect_encoding(sample: bytes) -> str:
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # 采样截断在多字节字符中间时，错误出现在最后几个字节，不算数
+        if e.start < len(sample) - 3:
+            return "gb18030"
+    return "utf-8"
+
+
+def _cell(v: Any) -> str:
+    if v is None or (isinstance(v, float) and v != v):
+        return ""
+    return str(v).strip()
+
+
+def _apply_header(grid: "pd.DataFrame", header: int) -> "pd.DataFrame":
+    """把第 header 行作为列名（空列名 → Unnamed: i，重复列名 → 名.1、名.2，同 read_excel），返回其后的数据行。"""
+    seen: Dict[str, int] = {}
+    names: List[str] = []
+    for i, v in enumerate(grid.iloc[header] if header < len(grid) else []):
+        name = _cell(v) or f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    df = grid.iloc[header + 1 :].reset_index(drop=True)
+    df.columns = names or list(df.columns)
+    return df
+
+
+def read_csv_grid(path: Path, header: Optional[int] = None) -> "pd.DataFrame":
+    """header=None 时返回整张表（列名 0..n-1），否则以该行为表头、返回其后的数据行。"""
+    import pandas as pd
+
+    path = Path(path)
+    with path.open("rb") as f:
+        sample = f.read(_SNIFF_BYTES)
+    encoding = detect_encoding(sample)
+    first_line = next(iter(sample.decode(encoding, errors="ignore").splitlines()), "")
+    sep = "\t" if path.suffix.lower() == ".tsv" or first_line.count("\t") > first_line.count(",") else ","
+    engines = ("pyarrow", "c") if importlib.util.find_spec("pyarrow") is not None else ("c",)
+    grid: Optional["pd.DataFrame"] = None
+    for engine in engines:
+        try:
+            grid = pd.read_csv(path, sep=sep, header=None, encoding=encoding, dtype=str, engine=engine)
+            break
+        except (ValueError, pd.errors.ParserError):
+            continue
+    if grid is None:
+        with path.open(encoding=encoding, newline="") as f:
+            width = max((len(r) for r in csv.reader(f, delimiter=sep)), default=0)
+        grid = pd.read_csv(
+            path, sep=sep, header=None, names=range(width), encoding=encoding, dtype=str, engine="c"
+        )
+    grid.columns = range(grid.shape[1])
+    return grid if header is None else _apply_header(grid, header)
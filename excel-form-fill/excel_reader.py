@@ -5,12 +5,15 @@ Phase 1：Excel → 结构化数据（唯一正确来源）
 - 只从**明确语义**的「平时成绩」「考试成绩」列取值。
 - 绝不把单一「成绩」列自动复制成 平时+考试。
 - 返回列识别元数据，供上层做强校验（未同时识别两列 → 禁止填表，输出诊断）。
+- 也接受 CSV/TSV（.csv/.tsv/.txt，见 csv_grid.py）：读成与工作表同形的表格后走同一套表头、双栏识别，比解 xlsx 快一个数量级。
 """
 from pathlib import Path
 from typing import Any, List, Optional, TypedDict
 
 import pandas as pd
 
+from csv_grid import is_csv_path, read_csv_grid
+
 
 USUAL_SCORE_KEY = "平时成绩"
 EXAM_SCORE_KEY = "考试成绩"
@@ -24,6 +27,12 @@ class ReadMeta(TypedDict):
     header_row: int
 
 
+def _read_sheet(excel_path: Path, sheet_name: str | int, header: Optional[int]) -> pd.DataFrame:
+    if is_csv_path(excel_path):
+        return read_csv_grid(excel_path, header=header)
+    return pd.read_excel(excel_path, sheet_name=sheet_name, header=header)
+
+
 # 只认「平时成绩」语义列，不认通用「成绩」
 USUAL_HEADER_ALIASES = ["平时成绩", "平时", "平时分"]
 # 只认「考试成绩」语义列
@@ -144,7 +153,7 @@ def _find_header_row(
     返回 (header_row, combined_columns, score_row)。
     combined_columns 非空时数据从 score_row+1 行起；否则数据从 header_row+1 行起。
     """
-    df_raw = pd.read_excel(excel_path, sheet_name=sheet_name, header=None)
+    df_raw = _read_sheet(excel_path, sheet_name, header=None)
     nrows = min(max_rows, len(df_raw))
     for score_row in range(nrows):
         row_score = df_raw.iloc[score_row]
@@ -266,7 +275,7 @@ def read_excel_to_records(
     filter_non_data_rows: bool = True,
 ) -> tuple[List[dict[str, Any]], ReadMeta]:
     """
-    将 Excel 解析为「表头→行数据」的字典列表。
+    将 Excel（或 CSV/TSV，sheet 忽略）解析为「表头→行数据」的字典列表。
 
     - header_row: 表头所在行号（0-based）。None 时自动在前几行中查找同时含「平时成绩」「考试成绩」的行。
     - double_column: True=强制双列；False=单表；None=自动检测（表头出现两处「姓名」或中间有空列则按双列处理）。
@@ -281,7 +290,7 @@ def read_excel_to_records(
         combined_columns = None
         sub_header_row = None
     if combined_columns is not None and sub_header_row is not None:
-        df_raw = pd.read_excel(excel_path, sheet_name=sheet_name, header=None)
+        df_raw = _read_sheet(excel_path, sheet_name, header=None)
         data_start = sub_header_row + 1
         df = df_raw.iloc[data_start:].reset_index(drop=True)
         n = df.shape[1]
@@ -293,7 +302,7 @@ def read_excel_to_records(
         columns = _make_column_names_unique(raw_columns)
         df.columns = columns
     else:
-        df = pd.read_excel(excel_path, sheet_name=sheet_name, header=header_row)
+        df = _read_sheet(excel_path, sheet_name, header=header_row)
         raw_columns = list(df.columns)
         columns = _make_column_names_unique([str(c) for c in raw_columns])
         df.columns = columns
@@ -462,6 +471,11 @@ def _get_name_from_record(r: dict[str, Any]) -> str:
     return ""
 
 
+def record_name(r: dict[str, Any]) -> str:
+    """记录的姓名（按语义识别，同 records_to_task_text 使用的规则）。"""
+    return _get_name_from_record(r)
+
+
 def records_to_task_text(records: List[dict[str, Any]]) -> str:
     """Phase 2 用：转成 Agent 能看懂的任务文本，格式：姓名 | 平时成绩(目标值) | 考试成绩(目标值)。"""
     lines = ["姓名 | 平时成绩(目标值) | 考试成绩(目标值)", "---"]
@@ -473,3 +487,18 @@ def records_to_task_text(records: List[dict[str, Any]]) -> str:
         exam_s = str(exam) if exam is not None else ""
         lines.append(f"{name} | {usual_s} | {exam_s}")
     return "\n".join(lines)
+
+
+def records_to_compact_text(records: List[dict[str, Any]]) -> str:
+    """
+    紧凑版任务表：每行 `行号|姓名|平时|考试`，行号为 r1、r2…（Agent 汇报时可用行号代替姓名）。
+    空成绩写作 `-`，比 records_to_task_text 少一半左右的字符。
+    """
+    lines = ["行号|姓名|平时|考试"]
+    for i, r in enumerate(records, 1):
+        usual = r.get(USUAL_SCORE_KEY)
+        exam = r.get(EXAM_SCORE_KEY)
+        lines.append(
+            f"r{i}|{_get_name_from_record(r)}|{usual if usual is not None else '-'}|{exam if exam is not None else '-'}"
+        )
+    return "\n".join(lines)
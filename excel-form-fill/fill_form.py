@@ -2,14 +2,20 @@
 Phase 2：任务下发 + 强校验 + browser-use 执行
 
 - 从 Phase 1 拿到 (records, meta)，强校验通过后生成任务文本。
+- 页面提供自动化钩子（见 hook_fill.PAGE_PROFILES）时先确定性填表，只把残余（未匹配/未提交）交给 Agent。
 - 使用 DeepSeek 模型 + browser-use Agent 在浏览器中打开录入页并按要求填写成绩。
 """
 import argparse
 import asyncio
+import functools
 import json
 import os
 import sys
+import threading
 import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
 from pathlib import Path
 
 try:
@@ -18,18 +24,61 @@ try:
 except ImportError:
     pass  # 未安装 python-dotenv 时跳过，依赖已设置的环境变量
 
-try:
-    from excel_reader import (
-        read_excel_to_records,
-        records_to_task_text,
-        validate_records_for_fill,
-    )
-except ModuleNotFoundError as e:
-    if "pandas" in str(e).lower() or (getattr(e, "name", None) == "pandas"):
-        print("未找到 pandas，请使用本项目虚拟环境并安装依赖：", file=sys.stderr)
-        print("  .venv\\Scripts\\python.exe -m pip install -r requirements.txt", file=sys.stderr)
-        print("  然后运行：.venv\\Scripts\\python.exe fill_form.py ...", file=sys.stderr)
-    raise
+
+def _import_excel_reader():
+    """
+    excel_reader 依赖 pandas（导入约需数百毫秒），只在真正读 Excel 的路径上加载：
+    --help、--browser-only、--print-browser 不导入 pandas。
+    """
+    try:
+        import excel_reader
+    except ModuleNotFoundError as e:
+        if "pandas" in str(e).lower() or (getattr(e, "name", None) == "pandas"):
+            print("未找到 pandas，请使用本项目虚拟环境并安装依赖：", file=sys.stderr)
+            print("  .venv\\Scripts\\python.exe -m pip install -r requirements.txt", file=sys.stderr)
+            print("  然后运行：.venv\\Scripts\\python.exe fill_form.py ...", file=sys.stderr)
+        raise
+    return excel_reader
+
+
+# 任务文案的固定前缀：不含任何本次运行的变量（URL、条数、账号、路径、数据），逐字节稳定，
+# 每次运行/每个分块都相同，便于模型服务端的前缀缓存命中。变量统一放在后面的「本次任务」段。
+_TASK_RULES_HEAD = (
+    "第一步立即打开「本次任务」中的 URL，页面加载完成前不做其他操作；出现登录页时用给出的账号登录（未给出则直接继续）。",
+    "只核对/填写系统中已存在、且能按姓名匹配到数据表的行；人数以数据表为准，不要按系统人数推断缺失或多出。",
+    "不要点击「加载示例」「加载示例数据」等按钮。",
+    "先探测页面能力：有 Excel/CSV 导入或文件上传入口时，看 accept 属性/文案支持的格式（xlsx 优先于 csv），"
+    "「本次任务」给出了 xlsx 路径则优先用 upload_file 上传，无需先选班级/课程；无导入入口才逐条手动填写。"
+    "未探测格式前不得固定使用某一种文件格式。",
+    "手动填写：按姓名找到行，读「平时成绩」「考试成绩」当前值与数据表比对：空→填目标值，一致→跳过，不一致→清空后填目标值；"
+    "本页有修改则点击一次【提交本页】。",
+    "遍历：有分页控件（页码/下一页/第X页共Y页）必须用分页遍历所有页，禁止只靠 scroll；"
+    "可调整每页条数，但不得假定「全部」即 DOM 含所有行；仅当无分页、无总数提示且数据随 scroll 增量加载时才可 scroll。",
+)
+_TASK_RULE_SELF_CHECK = (
+    "完成判定（任一满足）：系统提示成功导入 X 条且 X 等于本批条数；系统提示全部提交成功/无错误；已遍历全部分页且每页数据都在。"
+    "不满足则不得调用 done；禁止以「已经 scroll 过」「大概看到很多行」作为依据。"
+    "连续两个 Step 的 Memory 都表明已满足完成条件时，立即调用 done。"
+)
+# 程序会在结束后读回系统数据对账（reconcile.py）时，Agent 不必自查，省下回头复查的步数
+_TASK_RULE_RECONCILED = "数据表中的行都已填写并提交后立即调用 done，不要回头逐页复查；填写结果由程序在结束后统一读回核对。"
+_TASK_RULES_TAIL = (
+    "出现「预览/确认/二次确认」页面：不再比对成绩，只点击【确认/提交】后继续。",
+    "数据表每行为 行号|姓名|平时目标|考试目标，`-` 表示无目标值；汇报进度时用行号（如 r3）指代学生。",
+)
+
+
+def _static_prefix(rules: tuple) -> str:
+    return "你是成绩录入执行器。规则：\n" + "".join(f"{i}. {r}\n" for i, r in enumerate(rules, 1))
+
+
+TASK_STATIC_PREFIX = _static_prefix(_TASK_RULES_HEAD + (_TASK_RULE_SELF_CHECK,) + _TASK_RULES_TAIL)
+TASK_STATIC_PREFIX_RECONCILED = _static_prefix(_TASK_RULES_HEAD + (_TASK_RULE_RECONCILED,) + _TASK_RULES_TAIL)
+
+
+def task_prefix(self_check: bool = True) -> str:
+    """build_task 用的固定前缀：self_check=False（结束后会读回对账）时去掉让 Agent 自查完成情况的规则。"""
+    return TASK_STATIC_PREFIX if self_check else TASK_STATIC_PREFIX_RECONCILED
 
 
 def build_task(
@@ -37,60 +86,41 @@ def build_task(
     url: str,
     page_size: int | None = None,
     excel_path: Path | None = None,
+    self_check: bool = True,
 ) -> str:
-    """构造填表任务文案：比对优先，数值已是 int，字段与网页语义对应。"""
+    """
+    构造填表任务文案：固定前缀 + 本次任务变量 + 紧凑数据表。
+    固定前缀见 task_prefix(self_check)。
+    """
+    from csv_grid import is_csv_path
+    from excel_reader import records_to_compact_text
+
     total = len(records)
     page_size = page_size or total
+    lines = ["", "本次任务：", f"URL: {url}", f"本批条数: {total}"]
     login_user = os.getenv("GRADE_ENTRY_USER", "").strip()
     login_password = os.getenv("GRADE_ENTRY_PASSWORD", "").strip()
-    login_hint = ""
     if login_user and login_password:
-        login_hint = f"若出现登录页，使用用户名 **{login_user}**、密码 **{login_password}** 登录。\n\n"
-    excel_hint = ""
+        lines.append(f"登录账号: {login_user} / {login_password}")
     if excel_path is not None:
         path_abs = excel_path.resolve()
         if path_abs.exists():
-            excel_hint = (
-                f"若页面有「导入 Excel」「导入表格」「文件上传」等入口，**优先上传本机 Excel 文件**（用 upload_file），路径：**{path_abs}**\n"
-                "上传后若有需要再逐行核对或补填。\n\n"
-            )
-    # 强制第一步为导航，避免模型只“思考”不输出 navigate 动作
-    intro = (
-        f"第一步（必须）：立即访问成绩录入系统首页。\n"
-        f"URL: {url}\n"
-        "在页面加载完成前不要执行其他操作。\n\n"
-        f"{login_hint}"
-        f"**本批共 {total} 条**（下表即这 {total} 条），只核对/填写系统中已存在的、能与下表姓名匹配到的行；人数以本表为准，不要根据系统人数推断「缺失」或「多出」。\n"
-        "**不要点击「加载示例」「加载示例数据」等按钮**：直接使用当前页面进行成绩录入。\n\n"
-        "**本系统支持「先上传文件」**：若页面上有 Excel/CSV 导入或文件上传入口，**先直接上传文件**，无需先选择班级、课程；班级和课程会在导入后由系统填充或再选。\n\n"
-        "**文件兼容性（必须先探测页面能力）**：\n"
-        "1. 检测页面是否存在文件上传入口。\n"
-        "2. 判断页面提示 / 上传控件的 accept 属性 / 文案中支持的文件类型（xlsx 优先于 csv）。\n"
-        "3. 若支持 xlsx → 优先使用已提供的 xlsx 文件上传（见下方路径）；若仅支持 csv → 再考虑生成并上传 csv。\n"
-        "4. 若无文件导入入口 → 才进入手动逐条填写流程。\n"
-        "禁止在未检测页面支持格式前，强制固定使用某一种文件格式。\n\n"
-        f"{excel_hint}"
-        "若页面有「导入表格」「导入 Excel」「批量导入」等入口且上方已给出 Excel 路径，优先上传该 xlsx；否则将下方数据表导入或逐行填写。\n"
-        "**手动填写时**：按姓名匹配到行，读取「平时成绩」「考试成绩」当前值并与下表比对；空→填目标值，一致→跳过，不一致→清空后填入目标值；本页有修改则点击一次【提交本页】。\n\n"
-        "**表格遍历优先级（必须遵守，数据由分页/状态控制，非“滚动即加载”）**：\n"
-        "1. 若页面存在分页控件（页码/下一页/第X页共Y页）→ **使用分页控件遍历所有页**，禁止仅依赖 scroll。\n"
-        "2. 若存在「每页显示数量」选项（10/20/全部）→ 可调整页大小，但仍需确认是否存在分页或虚拟渲染，不得假定「全部」即 DOM 含所有行。\n"
-        f"3. 若页面明确显示「共 X 条」「已导入 X 条」「导入完成…已填入 X 人」→ 若 X == {total}（目标条数），**以该提示作为成功判定**，无需逐条滚动核对。\n"
-        "4. **仅当**以下三者同时满足时才允许使用 scroll：页面无分页控件、无总数提示、且数据明显随 scroll 增量加载。\n\n"
-        "**核对完成的统一判定标准**：\n"
-        "禁止以「我已经 scroll 过」「我大概看到了很多行」作为完成依据。\n"
-        "正确完成判定（**任一满足**即可）：\n"
-        f"- 系统提示：成功导入 X 条记录，且 X == {total}（目标学生数量）；或\n"
-        "- 系统提示：全部提交成功 / 无错误；或\n"
-        "- 已遍历所有分页（第 1 页…第 N 页），且每页数据均存在。\n"
-        "未满足上述任一条件 → **不允许**标记任务成功（不得调用 done）。\n"
-        "若在**连续两个 Step** 中 Memory 均表明「已满足完成条件」，**不得继续执行浏览操作**，必须立即调用 done 结束任务。\n\n"
-    )
+            kind = "csv" if is_csv_path(path_abs) else "xlsx"
+            lines.append(f"{kind} 路径: {path_abs}")
     if page_size < total:
-        intro += f"本批共 {total} 条，按每 {page_size} 条一页处理；翻页后继续当前游标。\n\n"
-    intro += "若出现「预览/确认/二次确认」页面：不再比对成绩，只点击【确认/提交】，然后继续流程。\n\n"
-    body = records_to_task_text(records)
-    return intro + "数据：\n" + body
+        lines.append(f"分批: 每 {page_size} 条一页处理，翻页后继续当前游标")
+    lines += ["数据：", records_to_compact_text(records)]
+    return task_prefix(self_check) + "\n".join(lines)
+
+
+def _print_task_estimate(task: str, prefix: str, token_budget: int | None) -> None:
+    """prefix：生成 task 时实际用的固定前缀（task_prefix 的返回值）。"""
+    from task_budget import estimate_tokens
+
+    prefix_tokens = estimate_tokens(prefix)
+    total = estimate_tokens(task)
+    budget = f"，预算 {token_budget}" if token_budget else ""
+    print(f"任务估算：约 {total} tokens（固定前缀 {prefix_tokens}，可被前缀缓存；变量+数据 {total - prefix_tokens}{budget}）")
 
 
 def _get_llm():
@@ -116,42 +146,95 @@ def _get_llm():
     return ChatDeepSeek(api_key=api_key, base_url=base_url.rstrip("/"), model="deepseek-chat")
 
 
+@functools.lru_cache(maxsize=1)
 def _get_playwright_chromium_path() -> str | None:
-    """若已安装 Playwright Chromium，返回其可执行路径，用于改善 CDP 兼容性；否则返回 None。"""
-    try:
-        from playwright.sync_api import sync_playwright
-        with sync_playwright() as p:
-            path = getattr(p.chromium, "executable_path", None)
-            if path and os.path.isfile(path):
-                return path
-    except Exception:
-        pass
-    return None
+    """
+    若已安装 Playwright Chromium，返回其可执行路径，用于改善 CDP 兼容性；否则返回 None。
+    结果缓存在磁盘（见 chromium_cache）和本进程内；main() 在进入事件循环前先解析一次（sync_playwright 不能在循环里跑）。
+    """
+    from chromium_cache import resolve_chromium
+
+    return resolve_chromium()["path"]
+
+
+def _prepare_local_browser(cdp_url: str | None) -> None:
+    """本地启动浏览器前（事件循环外）解析 Chromium 路径，_make_browser 在循环里直接取进程内缓存。"""
+    if not cdp_url and not os.getenv("BROWSER_EXECUTABLE_PATH"):
+        _get_playwright_chromium_path()
+
+
+def _print_browser() -> None:
+    """--print-browser：打印将要使用的浏览器可执行文件及来源，不启动浏览器。"""
+    from chromium_cache import resolve_chromium
+
+    env_exe = os.getenv("BROWSER_EXECUTABLE_PATH")
+    info = resolve_chromium()
+    print(f"BROWSER_EXECUTABLE_PATH: {env_exe or '（未设置）'}")
+    print(f"Playwright: {info['playwright'] or '（未安装）'}")
+    print(f"Playwright Chromium: {info['path'] or '（未找到）'}  [来源: {info['source']}, revision: {info['revision'] or '-'}]")
+    print(f"缓存文件: {info['cache']}")
+    if env_exe:
+        print(f"将使用: {env_exe}" + ("" if os.path.isfile(env_exe) else "（文件不存在！）"))
+    elif info["path"]:
+        print(f"将使用: {info['path']}")
+    else:
+        print("将使用: browser-use 自行查找的系统 Chrome/Chromium")
 
 
-def _patch_browser_session_connect():
-    """对 BrowserSession.connect 打补丁：请求 /json/version 时按 deadline 等待+重试，等浏览器完全起来再连 CDP。"""
-    import time
+# CDP 就绪探测的参数与最近一次的结果（--browser-only 会打印；供跨机器比较浏览器启动耗时）
+CDP_PROBE_SETTINGS = {"deadline_s": 30.0, "first_delay_s": 0.025, "max_delay_s": 0.5}
+CDP_STARTUP_METRICS: dict = {}
+
 
+async def _wait_cdp_ready(url: str, headers: dict) -> str:
+    """
+    轮询 /json/version 直到返回 webSocketDebuggerUrl：全程复用一个 AsyncClient（keep-alive），
+    间隔从几十毫秒起按 1.5 倍增长、封顶 max_delay_s，超过 deadline_s 抛错。结果写入 CDP_STARTUP_METRICS。
+    """
     import httpx
+
+    deadline_s = float(CDP_PROBE_SETTINGS["deadline_s"])
+    delay = float(CDP_PROBE_SETTINGS["first_delay_s"])
+    t0 = time.perf_counter()
+    attempts = 0
+    last_err: Exception | None = None
+    CDP_STARTUP_METRICS.clear()
+    # 请求 CDP 的 localhost 时必须绕过系统代理，否则会经代理挂起并超时
+    async with httpx.AsyncClient(trust_env=False, timeout=httpx.Timeout(2.0)) as client:
+        while True:
+            attempts += 1
+            try:
+                resp = await client.get(url, headers=headers)
+                if resp.status_code == 200 and resp.content.strip():
+                    ws_url = resp.json().get("webSocketDebuggerUrl")
+                    if ws_url:
+                        CDP_STARTUP_METRICS.update(
+                            ready_ms=round((time.perf_counter() - t0) * 1000, 1),
+                            attempts=attempts,
+                            deadline_s=deadline_s,
+                        )
+                        return ws_url
+                last_err = ValueError(f"/json/version status={resp.status_code} or invalid/empty body")
+            except Exception as e:
+                last_err = e
+            remaining = deadline_s - (time.perf_counter() - t0)
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 1.5, float(CDP_PROBE_SETTINGS["max_delay_s"]))
+    CDP_STARTUP_METRICS.update(ready_ms=None, attempts=attempts, deadline_s=deadline_s, last_error=str(last_err))
+    raise RuntimeError(f"CDP not ready after {deadline_s:g}s ({attempts} attempts), last error: {last_err}")
+
+
+def _patch_browser_session_connect():
+    """对 BrowserSession.connect 打补丁：请求 /json/version 时按 deadline 等待+重试，等浏览器完全起来再连 CDP。重复调用无副作用。"""
     from urllib.parse import urlparse, urlunparse
 
     from browser_use.browser.session import BrowserSession
 
+    if getattr(BrowserSession.connect, "_cdp_ready_patched", False):
+        return
     _original_connect = BrowserSession.connect
-    _cdp_wait_seconds = 30
-    _retry_sleep = 1.0
-
-    def _extract_ws_url(version_info) -> str | None:
-        if version_info.status_code != 200:
-            return None
-        if not (version_info.content and version_info.content.strip()):
-            return None
-        try:
-            data = version_info.json()
-            return data.get("webSocketDebuggerUrl") or None
-        except Exception:
-            return None
 
     async def _patched_connect(self, cdp_url: str | None = None):
         self.browser_profile.cdp_url = cdp_url or self.cdp_url
@@ -175,51 +258,143 @@ def _patch_browser_session_connect():
             url = urlunparse(
                 (parsed_url.scheme, parsed_url.netloc, path, parsed_url.params, parsed_url.query, parsed_url.fragment)
             )
-            deadline = time.time() + _cdp_wait_seconds
-            last_err = None
-            ws_url = None
-
-            # 请求 CDP 的 localhost 时必须绕过系统代理，否则会经代理挂起并超时
-            while time.time() < deadline:
-                try:
-                    async with httpx.AsyncClient(trust_env=False) as client:
-                        headers = self.browser_profile.headers or {}
-                        version_info = await client.get(url, headers=headers)
-                        ws_url = _extract_ws_url(version_info)
-                        if ws_url:
-                            self.browser_profile.cdp_url = ws_url
-                            break
-                        last_err = ValueError(
-                            f"/json/version status={version_info.status_code} or invalid/empty body"
-                        )
-                except Exception as e:
-                    last_err = e
-                await asyncio.sleep(_retry_sleep)
-
-            if not ws_url:
-                raise RuntimeError(
-                    f"CDP not ready after {_cdp_wait_seconds}s, last error: {last_err}"
-                )
+            self.browser_profile.cdp_url = await _wait_cdp_ready(url, self.browser_profile.headers or {})
 
         return await _original_connect(self, cdp_url=self.browser_profile.cdp_url)
 
+    _patched_connect._cdp_ready_patched = True
     BrowserSession.connect = _patched_connect
 
 
-async def _run_browser_only(headless: bool) -> None:
-    """仅验证浏览器/CDP 链路：start() 成功即说明浏览器已起来且 CDP 可用，不跑 Agent。"""
-    _patch_browser_session_connect()
+def _service_request(service_url: str, path: str, body: dict) -> dict:
+    """向常驻浏览器服务（auto-grade-entry/automation/browser_service.py）发 JSON 请求，localhost 不走代理。"""
+    req = urllib.request.Request(
+        service_url.rstrip("/") + path,
+        data=json.dumps(body).encode("utf-8"),
+        method="POST",
+        headers={"Content-Type": "application/json"},
+    )
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    with opener.open(req, timeout=10) as resp:
+        return json.loads(resp.read().decode("utf-8") or "{}")
+
+
+def _acquire_lease(service_url: str, job: str, wait_seconds: float) -> dict:
+    """申请租约；服务并发已满（429）时按短间隔指数退避重试，直到 wait_seconds（同 browser_service.lease_browser）。"""
+    deadline = time.monotonic() + wait_seconds
+    delay = 0.2
+    while True:
+        try:
+            return _service_request(service_url, "/acquire", {"job": job})
+        except urllib.error.HTTPError as e:
+            if e.code != 429 or time.monotonic() >= deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+
+@contextmanager
+def _browser_service_lease(service_url: str | None, job: str = "fill_form", wait_seconds: float = 60.0):
+    """
+    向常驻浏览器服务申请租约，产出 CDP 地址（未指定服务时产出 None，走本地启动）。
+    整个重试循环共用同一租约：重试时只重连 CDP，不再重新拉起 Chromium。
+    """
+    if not service_url:
+        yield None
+        return
+    lease = _acquire_lease(service_url, job, wait_seconds)
+    stop = threading.Event()
+
+    def _renew() -> None:
+        interval = max(5.0, float(lease.get("expires_in") or 60) / 3)
+        while not stop.wait(interval):
+            try:
+                _service_request(service_url, "/renew", {"lease": lease["lease"]})
+            except Exception:
+                pass
+
+    threading.Thread(target=_renew, daemon=True).start()
+    try:
+        yield lease["cdp_url"]
+    finally:
+        stop.set()
+        try:
+            _service_request(service_url, "/release", {"lease": lease["lease"]})
+        except Exception:
+            pass
+
+
+# --lean：为自动化调优的 Chromium 参数（browser-use 不暴露请求路由，这里只能用启动参数关图片/后台任务）；
+# 与 auto-grade-entry/automation/lean_profile.py 用同一组参数（tools/check_shared_copies.py 校验）
+LEAN_CHROMIUM_ARGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "--disable-renderer-backgrounding",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--blink-settings=imagesEnabled=false",
+    "--force-prefers-reduced-motion",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+]
+
+
+def _make_browser(
+    headless: bool,
+    cdp_url: str | None = None,
+    lean: bool = False,
+    user_data_dir: str | None = None,
+    keep_alive: bool = False,
+):
+    """
+    构造 browser-use Browser：指定 cdp_url 时连接常驻浏览器服务，否则本地启动 Chromium。
+    user_data_dir 非空时使用独立的用户目录（并发多个 Agent 时各自一份，避免共用默认 profile 冲突）。
+    keep_alive 时 Agent 结束/出错不关闭浏览器，由调用方决定重连还是关闭。
+    """
     from browser_use import Browser
 
-    browser_kw: dict = {"headless": headless}
+    if cdp_url:
+        return Browser(cdp_url=cdp_url, is_local=False, keep_alive=keep_alive)
+    browser_kw: dict = {"headless": headless, "keep_alive": keep_alive}
+    if user_data_dir:
+        browser_kw["user_data_dir"] = user_data_dir
+    if lean:
+        browser_kw["args"] = list(LEAN_CHROMIUM_ARGS)
     exe = os.getenv("BROWSER_EXECUTABLE_PATH") or _get_playwright_chromium_path()
     if exe and os.path.isfile(exe):
         browser_kw["executable_path"] = exe
-    browser = Browser(**browser_kw)
+    return Browser(**browser_kw)
+
+
+async def _run_browser_only(headless: bool, cdp_url: str | None = None) -> None:
+    """仅验证浏览器/CDP 链路：start() 成功即说明浏览器已起来且 CDP 可用，不跑 Agent。"""
+    _patch_browser_session_connect()
+    browser = _make_browser(headless, cdp_url)
     print(">>> browser about to start", flush=True)
+    t0 = time.perf_counter()
     await browser.start()
+    start_ms = (time.perf_counter() - t0) * 1000
     print(">>> 浏览器启动成功，CDP 链路正常。", flush=True)
-    await browser.kill()
+    m = CDP_STARTUP_METRICS
+    if m.get("attempts"):
+        print(
+            f">>> 启动指标：start() 共 {start_ms:.0f} ms；CDP 就绪 {m['ready_ms']} ms，探测 {m['attempts']} 次"
+            f"（deadline {m['deadline_s']:g}s）",
+            flush=True,
+        )
+    else:
+        print(f">>> 启动指标：start() 共 {start_ms:.0f} ms（未经 /json/version 探测）", flush=True)
+    if cdp_url:
+        await browser.stop()  # 常驻服务的浏览器只断开，不关闭
+    else:
+        await browser.kill()
     print(">>> 自检结束（browser 已关闭）", flush=True)
 
 
@@ -233,75 +408,323 @@ def _hint_browser_use_install() -> None:
     )
 
 
+# 运行监督的重试策略：错误类别 → (首次退避秒数, 恢复动作说明)；退避按次数翻倍
+_RETRY_POLICY = {
+    "cdp": (0.5, "只重连 CDP，浏览器进程保留"),
+    "launch": (2.0, "重启浏览器进程"),
+}
+
+
+def _classify_error(e: Exception) -> str | None:
+    """连接类错误分两类：浏览器没起来（launch）/ 已起来但 CDP 连接断了（cdp）；其余错误不重试。"""
+    msg = str(e)
+    if isinstance(e, json.JSONDecodeError) or "CDP not ready" in msg:
+        return "launch"
+    if "CDP" in msg or "connect" in msg.lower() or "webSocket" in msg:
+        return "cdp"
+    return None
+
+
+async def _recover_browser(browser, kind: str, cdp_url: str | None) -> None:
+    """按错误类别只恢复出问题的那一层；下一次 agent.run() 会在 start() 时重新连接/拉起。"""
+    try:
+        if kind == "launch" and not cdp_url:
+            await browser.kill()
+        else:
+            await browser.stop()  # keep_alive：只断开 CDP，浏览器进程（或常驻服务的浏览器）保留
+    except Exception:
+        pass
+
+
+async def _close_browser(browser, cdp_url: str | None) -> None:
+    try:
+        if cdp_url:
+            await browser.stop()  # 常驻服务的浏览器只断开，不关闭
+        else:
+            await browser.kill()
+    except Exception:
+        pass
+
+
+def _build_agent(task: str, llm, browser, excel_path: Path | None):
+    from browser_use import Agent
+
+    agent_kw: dict = {
+        "task": task,
+        "llm": llm,
+        "browser": browser,
+        "directly_open_url": True,
+    }
+    if excel_path is not None:
+        path_abs = excel_path.resolve()
+        if path_abs.exists():
+            agent_kw["available_file_paths"] = [str(path_abs)]
+    return Agent(**agent_kw)
+
+
 async def _run_agent(
     task: str,
     max_steps: int,
     headless: bool,
     excel_path: Path | None = None,
-) -> None:
-    """使用 browser-use Agent + DeepSeek 执行任务。"""
+    cdp_url: str | None = None,
+    lean: bool = False,
+    user_data_dir: str | None = None,
+    label: str = "",
+    trace=None,
+    trace_vars: dict | None = None,
+    data_values: set | None = None,
+    max_attempts: int = 3,
+    rows: int = 0,
+) -> dict:
+    """
+    使用 browser-use Agent + DeepSeek 执行任务（单个事件循环内的运行监督）。
+    cdp_url 非空时连接常驻浏览器服务；lean 时用精简启动参数。
+    LLM 客户端、浏览器、Agent 只创建一次：连接类错误按类别退避后只恢复出错的那一层，
+    再在同一个 Agent 上继续 run()（已走的步数与记忆保留，步数预算扣除已用部分）。
+    trace（trace_replay.TraceStore）非空时：有录制轨迹先回放，回放失败再交给 LLM；LLM 成功后录制轨迹。
+    返回 {"done", "final_result", "steps", "replayed", "recoveries", "telemetry"}，供分块模式汇总；
+    telemetry 为 agent_telemetry.build_report 的逐步统计（rows 为本批条数，Agent 标记 done 时计为完成）。
+    """
+    from agent_telemetry import LLMCallTimer, build_report
+
+    t0 = time.perf_counter()
     _patch_browser_session_connect()
     try:
-        from browser_use import Agent, Browser
+        from browser_use import Agent
     except ModuleNotFoundError as e:
         _hint_browser_use_install()
         raise
 
     llm = _get_llm()
-    browser_kw: dict = {"headless": headless}
-    exe = os.getenv("BROWSER_EXECUTABLE_PATH") or _get_playwright_chromium_path()
-    if exe and os.path.isfile(exe):
-        browser_kw["executable_path"] = exe
-    browser = Browser(**browser_kw)
-    agent_kw: dict = {
-        "task": task,
-        "llm": llm,
-        "browser": browser,
-        "directly_open_url": True,
+    timer = LLMCallTimer()
+    timer.attach(llm)
+    browser = _make_browser(headless, cdp_url, lean=lean, user_data_dir=user_data_dir, keep_alive=True)
+    agent = _build_agent(task, llm, browser, excel_path)
+    tag = f"[{label}] " if label else ""
+    try:
+        if trace is not None and trace.exists():
+            replay = await _replay_trace(agent, trace, trace_vars or {})
+            if replay is not None:
+                replay["telemetry"] = build_report(
+                    None, timer.calls, time.perf_counter() - t0, rows, True, replayed=True
+                )
+                return replay
+        attempt = 0
+        while True:
+            used = getattr(agent.state, "n_steps", 1) - 1
+            try:
+                print(f">>> {tag}agent about to run", flush=True)
+                result = await agent.run(max_steps=max(1, max_steps - used))
+                break
+            except Exception as e:
+                kind = _classify_error(e)
+                attempt += 1
+                if kind is None or attempt >= max_attempts:
+                    raise
+                base, action = _RETRY_POLICY[kind]
+                delay = base * 2 ** (attempt - 1)
+                print(
+                    f"【{tag}浏览器连接异常（第 {attempt}/{max_attempts} 次，{kind}）】{e}\n"
+                    f"{delay:g} 秒后{action}，Agent 从第 {used + 1} 步继续…",
+                    file=sys.stderr,
+                )
+                await _recover_browser(browser, kind, cdp_url)
+                await asyncio.sleep(delay)
+    finally:
+        await _close_browser(browser, cdp_url)
+
+    print(f">>> {tag}agent finished", flush=True)
+    final = result.final_result() if result else None
+    if final:
+        print(f"\n✅ {tag}Agent 完成。最终结果：", final)
+    else:
+        print(f"\n⚠️ {tag}Agent 已结束（可能未标记 done 或达到 max_steps）。")
+    done = bool(result and result.is_done())
+    if trace is not None and done and result.is_successful() is not False:
+        _record_trace(result, trace, trace_vars or {}, data_values or set())
+    return {
+        "done": done,
+        "final_result": final,
+        "steps": len(result.history) if result else 0,
+        "replayed": False,
+        "recoveries": attempt,
+        "telemetry": build_report(
+            result, timer.calls, time.perf_counter() - t0, rows if done else 0, done, recoveries=attempt
+        ),
     }
-    if excel_path is not None:
-        path_abs = excel_path.resolve()
-        if path_abs.exists():
-            agent_kw["available_file_paths"] = [str(path_abs)]
-    agent = Agent(**agent_kw)
-    print(">>> agent about to run", flush=True)
-    result = await agent.run(max_steps=max_steps)
-    print(">>> agent finished", flush=True)
-    if result and result.final_result():
-        print("\n✅ Agent 完成。最终结果：", result.final_result())
+
+
+async def _replay_trace(agent, trace, trace_vars: dict) -> dict | None:
+    """回放录制的轨迹；成功（最后一步为 done）返回结果，任一步失败返回 None 并删除该轨迹（稍后由 LLM 重新录制）。"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="fill-form-trace-") as d:
+        hist_file = Path(d) / "history.json"
+        if not trace.materialize(trace_vars, hist_file):
+            print(">>> 录制轨迹需要的变量（如 Excel 路径/登录账号）本次未提供，跳过回放。", flush=True)
+            return None
+        print(f">>> 回放已录制轨迹（{trace.path.name}），不调用 LLM", flush=True)
+        try:
+            results = await agent.load_and_rerun(hist_file, max_retries=1, skip_failures=False)
+        except Exception as e:
+            print(f">>> 轨迹回放在某一步校验失败，交回 LLM 继续：{type(e).__name__}: {e}", flush=True)
+            trace.discard()
+            return None
+    last = results[-1] if results else None
+    if last is None or not last.is_done:
+        print(">>> 轨迹回放未到达 done，交回 LLM 继续。", flush=True)
+        trace.discard()
+        return None
+    print("\n✅ 轨迹回放完成（0 次 LLM 调用）。最终结果：", last.extracted_content)
+    return {"done": True, "final_result": last.extracted_content, "steps": len(results), "replayed": True}
+
+
+def _record_trace(result, trace, trace_vars: dict, data_values: set) -> None:
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="fill-form-trace-") as d:
+        hist_file = Path(d) / "history.json"
+        result.save_to_file(hist_file)
+        history = json.loads(hist_file.read_text(encoding="utf-8"))
+    reason = trace.save(history, data_values, trace_vars)
+    if reason:
+        print(f">>> 未录制轨迹：{reason}。", flush=True)
     else:
-        print("\n⚠️ Agent 已结束（可能未标记 done 或达到 max_steps）。")
+        print(f">>> 已录制轨迹：{trace.path}（同一系统下次运行将直接回放）", flush=True)
+
+
+def _open_trace_store(args: argparse.Namespace, cdp_url: str | None):
+    """按 URL + 入口页结构指纹定位轨迹；指纹获取失败时不录制也不回放。"""
+    from trace_replay import DEFAULT_TRACE_DIR, TraceStore, page_fingerprint
+
+    try:
+        fp = asyncio.run(page_fingerprint(args.url, headless=True, cdp_url=cdp_url))
+    except Exception as e:
+        print(f"页面指纹获取失败，本次不录制/回放轨迹：{type(e).__name__}: {e}", file=sys.stderr)
+        return None
+    return TraceStore(args.trace_dir or DEFAULT_TRACE_DIR, args.url, fp)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Excel → 强校验 → 任务生成 → DeepSeek + browser-use 自动成绩录入"
     )
-    parser.add_argument("-e", "--excel", type=Path, default=None, help="Excel 文件路径（--browser-only 时可选）")
+    parser.add_argument("-e", "--excel", type=Path, default=None, help="Excel 或 CSV/TSV 文件路径（--browser-only 时可选）")
     parser.add_argument("-u", "--url", default=None, help="录入页 URL（--browser-only 时可选）")
     parser.add_argument("--sheet", default=None, help="工作表名或索引")
     parser.add_argument("--header-row", type=int, default=None, help="表头所在行号（0-based）。不传则自动在前几行中查找「平时成绩」「考试成绩」")
     parser.add_argument("--double-column", action="store_true", help="双列布局：每行拆成左、右两条记录，不丢右栏数据")
     parser.add_argument("--page-size", type=int, default=None, help="每批条数")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="分块模式：把记录按每块 N 条拆成多个任务，各由一个 Agent（独立浏览器）处理，最后合并报告",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="分块模式下同时运行的 Agent 数（默认 2；配合 --browser-service 时只能为 1）",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="单个任务文案的 token 上限（估算值）；超出时按 --over-budget 拆块或拒绝",
+    )
+    parser.add_argument(
+        "--over-budget",
+        choices=("split", "reject"),
+        default="split",
+        help="任务超出 --token-budget 时：split=自动拆成分块任务（默认），reject=报错退出",
+    )
     parser.add_argument("--max-rows", type=int, default=None, help="最多处理行数")
     parser.add_argument("--max-steps", type=int, default=80, help="Agent 最大步数（默认 80）")
     parser.add_argument("--headless", action="store_true", help="无头模式运行浏览器（不显示窗口）")
     parser.add_argument("--dry-run", action="store_true", help="只做读取+校验+打印任务，不调 Agent")
+    parser.add_argument(
+        "--no-hooks",
+        action="store_true",
+        help="不探测页面自动化钩子，直接交给 Agent（默认先用钩子确定性填表，只把残余交给 Agent）",
+    )
+    parser.add_argument(
+        "--no-reconcile",
+        action="store_true",
+        help="结束后不读回系统数据对账（默认：页面有钩子时读回全部行，与目标成绩逐条比对）",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=None,
+        help="JSON 运行报告路径（逐步耗时/token/LLM 与浏览器耗时拆分；默认 <Excel 名>.run.json）",
+    )
+    parser.add_argument(
+        "--no-trace",
+        action="store_true",
+        help="不录制/回放 Agent 动作轨迹（默认：同一系统已有轨迹则先回放，LLM 成功后录制）",
+    )
+    parser.add_argument("--trace-dir", type=Path, default=None, help="轨迹目录（默认 excel-form-fill/.traces）")
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="精简浏览器配置：关闭图片、动画与后台任务等（自动化调优的 Chromium 参数），建议配合 --headless",
+    )
     parser.add_argument(
         "--browser-only",
         action="store_true",
         help="仅验证浏览器/CDP 链路：启动 Browser 并 start()，不跑 Agent。用于排查「浏览器起来了但 agent 没上岗」问题。",
     )
+    parser.add_argument(
+        "--cdp-timeout",
+        type=float,
+        default=30.0,
+        help="等待浏览器 CDP 就绪的最长秒数（默认 30）",
+    )
+    parser.add_argument(
+        "--print-browser",
+        action="store_true",
+        help="打印将使用的浏览器可执行文件（环境变量/缓存/Playwright）后退出",
+    )
+    parser.add_argument(
+        "--browser-service",
+        default=None,
+        help="常驻浏览器服务地址（auto-grade-entry/automation/browser_service.py serve），例如 http://127.0.0.1:9400；"
+        "指定后不再每次启动 Chromium",
+    )
     args = parser.parse_args()
+    args.self_check = True  # 是否让 Agent 自查完成情况；确认结束后能读回对账时置 False
+
+    CDP_PROBE_SETTINGS["deadline_s"] = args.cdp_timeout
+
+    if args.print_browser:
+        _print_browser()
+        return
 
     if args.browser_only:
-        asyncio.run(_run_browser_only(headless=args.headless))
+        with _browser_service_lease(args.browser_service, job="browser-only") as cdp_url:
+            _prepare_local_browser(cdp_url)
+            asyncio.run(_run_browser_only(headless=args.headless, cdp_url=cdp_url))
         return
 
     if not args.excel or not args.url:
         parser.error("填表模式需要 -e/--excel 与 -u/--url（仅 --browser-only 时可省略）")
-
-    records, meta = read_excel_to_records(
+    if args.chunk_size is not None and args.chunk_size < 1:
+        parser.error("--chunk-size 必须 ≥ 1")
+    if args.concurrency is not None and args.concurrency < 1:
+        parser.error("--concurrency 必须 ≥ 1")
+    if args.browser_service:
+        # 各块的 Agent 通过 CDP 连到同一个浏览器，browser-use 不会为每个连接新建 context：
+        # 并发时会共用 cookie、存储和标签页，所以常驻服务下分块只能串行
+        if args.concurrency is not None and args.concurrency > 1:
+            parser.error("--browser-service 下各块共用同一个浏览器（同一 context），不能并发；请去掉 --concurrency 或设为 1")
+        args.concurrency = 1
+    elif args.concurrency is None:
+        args.concurrency = 2
+
+    excel_reader = _import_excel_reader()
+    records, meta = excel_reader.read_excel_to_records(
         args.excel,
         sheet=args.sheet,
         header_row=args.header_row,
@@ -310,7 +733,7 @@ def main() -> None:
     if args.max_rows:
         records = records[: args.max_rows]
 
-    ok, msg = validate_records_for_fill(records, meta)
+    ok, msg = excel_reader.validate_records_for_fill(records, meta)
     if not ok:
         print("【强校验未通过】禁止自动填表。", file=sys.stderr)
         print(msg, file=sys.stderr)
@@ -322,58 +745,278 @@ def main() -> None:
         args.url,
         page_size=args.page_size,
         excel_path=args.excel,
+        self_check=args.self_check,
     )
 
+    if args.token_budget:
+        _apply_token_budget(records, args, task)
+
     if args.dry_run:
         print("\n--- 任务文案（dry-run）---\n")
         print(task)
+        print()
+        _print_task_estimate(task, task_prefix(args.self_check), args.token_budget)
+        if args.chunk_size and len(records) > args.chunk_size:
+            n = -(-len(records) // args.chunk_size)
+            print(f"将拆成 {n} 个分块任务（每块 ≤ {args.chunk_size} 条）。")
         return
 
-    print("\n--- 启动 browser-use Agent（DeepSeek）---\n")
-    max_connect_retries = 3
-    retry_delay_sec = 4
-    last_error = None
-    for attempt in range(max_connect_retries):
-        try:
-            asyncio.run(
-                _run_agent(
-                    task,
-                    max_steps=args.max_steps,
-                    headless=args.headless,
-                    excel_path=args.excel,
-                )
-            )
-            return
-        except json.JSONDecodeError as e:
-            last_error = e
-            if attempt < max_connect_retries - 1:
-                print(
-                    f"【浏览器 CDP 连接失败（第 {attempt + 1}/{max_connect_retries} 次）】正在 {retry_delay_sec} 秒后重试…",
-                    file=sys.stderr,
-                )
-                time.sleep(retry_delay_sec)
-            else:
-                print(
-                    "【浏览器连接失败】browser-use 在连接浏览器 CDP 时解析版本信息失败（非 JSON 或空响应）。\n"
-                    "建议：1) 安装 Playwright Chromium 后重试：uvx playwright install chromium 或 python -m playwright install chromium\n"
-                    "      2) 确认已安装 Chrome/Chromium/Edge 且可正常启动；3) 检查本机防火墙/安全软件是否拦截 localhost。\n"
-                    "详见：https://github.com/browser-use/browser-use/issues",
-                    file=sys.stderr,
-                )
-                sys.exit(1)
-        except Exception as e:
-            last_error = e
-            if "CDP" in str(e) or "connect" in str(e).lower() or "webSocket" in str(e):
-                if attempt < max_connect_retries - 1:
-                    print(
-                        f"【浏览器连接异常（第 {attempt + 1}/{max_connect_retries} 次）】{e}\n{retry_delay_sec} 秒后重试…",
-                        file=sys.stderr,
+    all_records = records
+    with _browser_service_lease(args.browser_service) as cdp_url:
+        excel_for_agent: Path | None = args.excel
+        agent_ok = True
+        residue = None if args.no_hooks else _fill_via_hooks_first(records, args, cdp_url)
+        if residue is not None:
+            # 页面有钩子：只把残余交给 Agent（残余不是整表，不再提示上传整份 Excel）；
+            # 结束后可读回对账，Agent 不必自查完成情况
+            args.self_check = args.no_reconcile
+            records = residue
+            excel_for_agent = None
+            task = build_task(records, args.url, page_size=args.page_size, self_check=args.self_check)
+
+        if records:
+            _prepare_local_browser(cdp_url)
+        if records and args.chunk_size and len(records) > args.chunk_size:
+            agent_ok = _run_chunked(records, args, cdp_url)
+        elif records:
+            trace = None if args.no_trace else _open_trace_store(args, cdp_url)
+            print("\n--- 启动 browser-use Agent（DeepSeek）---\n")
+            _run_with_retries(task, args, cdp_url, excel_for_agent, trace=trace, records=records)
+
+        if args.no_reconcile:
+            clean = True
+        elif residue is None:
+            # --no-hooks 或已探测过页面没有钩子：读回同样依赖钩子，不必再开一次浏览器等探测超时
+            print("\n页面未提供自动化钩子（或指定了 --no-hooks），无法读回对账（以 Agent 自查结果为准）。")
+            clean = True
+        else:
+            clean = _reconcile_after_fill(all_records, args, cdp_url)
+    if not agent_ok:
+        sys.exit(1)
+    if not clean:
+        sys.exit(2)
+
+
+def _reconcile_after_fill(records: list, args: argparse.Namespace, cdp_url: str | None) -> bool:
+    """读回系统中全部行与目标成绩对账，打印并写 <Excel 名>.reconcile.json；页面无钩子无法读回时跳过（返回 True）。"""
+    from excel_reader import EXAM_SCORE_KEY, USUAL_SCORE_KEY, record_name
+    from hook_fill import read_back_rows
+    from reconcile import is_clean, print_reconciliation, reconcile, write_reconciliation
+
+    try:
+        rows = asyncio.run(read_back_rows(args.url, headless=True, cdp_url=cdp_url))
+    except Exception as e:
+        print(f"\n对账读回失败，跳过对账：{type(e).__name__}: {e}", file=sys.stderr)
+        return True
+    if rows is None:
+        print("\n页面未提供自动化钩子，无法读回对账（以 Agent 自查结果为准）。")
+        return True
+    targets = [
+        {"name": record_name(r), "usual": r.get(USUAL_SCORE_KEY), "exam": r.get(EXAM_SCORE_KEY)} for r in records
+    ]
+    report = reconcile(targets, rows)
+    print_reconciliation(report)
+    path = args.excel.with_name(args.excel.stem + ".reconcile.json")
+    write_reconciliation(report, path)
+    print(f"对账明细：{path}")
+    return is_clean(report)
+
+
+def _apply_token_budget(records: list, args: argparse.Namespace, task: str) -> None:
+    """任务超预算时：split → 求出满足预算的块大小并写入 args.chunk_size；reject → 报错退出。"""
+    from task_budget import estimate_tokens, fit_chunk_size
+
+    if estimate_tokens(task) <= args.token_budget:
+        return
+    if args.over_budget == "reject":
+        print(
+            f"【任务超出 token 预算】估算约 {estimate_tokens(task)} tokens > --token-budget {args.token_budget}。"
+            "可减少 --max-rows、改用 --over-budget split 或调高预算。",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    size = fit_chunk_size(
+        records,
+        lambda chunk: build_task(chunk, args.url, page_size=args.page_size, self_check=args.self_check),
+        args.token_budget,
+    )
+    if size < 1:
+        print(f"【任务超出 token 预算】单条记录的任务已超过 --token-budget {args.token_budget}，请调高预算。", file=sys.stderr)
+        sys.exit(1)
+    if not args.chunk_size or size < args.chunk_size:
+        args.chunk_size = size
+    print(f"任务超出 token 预算 {args.token_budget}，改为分块模式：每块 ≤ {args.chunk_size} 条。")
+
+
+def _fill_via_hooks_first(records: list, args: argparse.Namespace, cdp_url: str | None) -> list | None:
+    """
+    先探测页面自动化钩子并确定性填表。
+    返回 None 表示页面没有钩子（交给 Agent 全量处理）；否则返回需要 Agent 处理的残余记录（可能为空）。
+    """
+    from excel_reader import record_name
+    from hook_fill import fill_via_hooks
+
+    print("\n--- 探测页面自动化钩子 ---\n")
+    try:
+        result = asyncio.run(fill_via_hooks(args.url, records, headless=args.headless, cdp_url=cdp_url))
+    except Exception as e:
+        print(f"钩子探测失败，改由 Agent 处理：{type(e).__name__}: {e}", file=sys.stderr)
+        return None
+    if not result.hooks_found:
+        print("页面未提供自动化钩子，改由 Agent 处理。")
+        return None
+    print(f"已通过页面钩子（{result.profile}）写入并提交 {len(result.filled)} 条，0 次 LLM 调用。")
+    if result.unsubmitted:
+        print(f"写入后仍未提交：{result.unsubmitted[:10]}{'...' if len(result.unsubmitted) > 10 else ''}")
+    if result.residue:
+        names = [record_name(r) for r in result.residue]
+        print(f"残余 {len(names)} 条交给 Agent：{names[:10]}{'...' if len(names) > 10 else ''}")
+    else:
+        print("✅ 全部完成，无需启动 Agent。")
+    return result.residue
+
+
+def _split_chunks(records: list, chunk_size: int) -> list[list]:
+    return [records[i : i + chunk_size] for i in range(0, len(records), chunk_size)]
+
+
+async def _run_chunks_async(chunks: list[list], args: argparse.Namespace, cdp_url: str | None) -> list[dict]:
+    """
+    按 --concurrency 限流并发运行各块的 Agent；本地启动时每块一个独立浏览器（独立用户目录），
+    连接类错误由各块的运行监督自行恢复，互不影响。用 --browser-service 时 main() 已把并发限为 1，各块依次使用同一个浏览器。
+    """
+    import tempfile
+
+    from excel_reader import record_name
+
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def _one(idx: int, chunk: list) -> dict:
+        label = f"块 {idx + 1}/{len(chunks)}"
+        names = [record_name(r) for r in chunk]
+        entry = {"chunk": idx + 1, "records": len(chunk), "first": names[0], "last": names[-1]}
+        # 分块任务只含本块数据；不提示上传整份 Excel（会覆盖其它块）
+        task = build_task(chunk, args.url, page_size=args.page_size, self_check=args.self_check)
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                with tempfile.TemporaryDirectory(prefix="fill-form-chunk-") as profile_dir:
+                    entry.update(
+                        await _run_agent(
+                            task,
+                            max_steps=args.max_steps,
+                            headless=args.headless,
+                            cdp_url=cdp_url,
+                            lean=args.lean,
+                            user_data_dir=None if cdp_url else profile_dir,
+                            label=label,
+                            rows=len(chunk),
+                        )
                     )
-                    time.sleep(retry_delay_sec)
-                    continue
-            raise
-    if last_error:
-        raise last_error
+            except Exception as e:
+                entry.update({"done": False, "final_result": None, "steps": 0, "error": f"{type(e).__name__}: {e}"})
+            entry["elapsed_s"] = round(time.perf_counter() - t0, 1)
+        return entry
+
+    return list(await asyncio.gather(*(_one(i, c) for i, c in enumerate(chunks))))
+
+
+def _run_chunked(records: list, args: argparse.Namespace, cdp_url: str | None) -> bool:
+    """分块模式：拆块 → 并发跑 Agent → 合并报告；返回是否所有块都完成（调用方据此决定退出码）。"""
+    from agent_telemetry import merge_reports
+
+    chunks = _split_chunks(records, args.chunk_size)
+    print(
+        f"\n--- 分块模式：{len(records)} 条 → {len(chunks)} 块（每块 ≤ {args.chunk_size} 条），"
+        f"并发 {min(args.concurrency, len(chunks))} 个 Agent ---\n"
+    )
+    t0 = time.perf_counter()
+    results = asyncio.run(_run_chunks_async(chunks, args, cdp_url))
+    wall = time.perf_counter() - t0
+
+    print("\n===== 分块汇总 =====")
+    for r in results:
+        status = "异常" if r.get("error") else ("完成" if r.get("done") else "未完成")
+        print(f"块 {r['chunk']:>2}：{r['records']:>3} 条（{r['first']} … {r['last']}） {status}  步数 {r['steps']}  耗时 {r['elapsed_s']}s")
+        if r.get("error"):
+            print(f"        {r['error']}")
+        elif r.get("final_result"):
+            print(f"        {str(r['final_result'])[:200]}")
+    bad = [r for r in results if r.get("error") or not r.get("done")]
+    print(f"合计：{len(results) - len(bad)}/{len(results)} 块完成，总耗时 {wall:.1f}s")
+    _write_run_report(
+        merge_reports([r["telemetry"] for r in results if r.get("telemetry")], wall),
+        args,
+        title="分块运行统计",
+    )
+    if bad:
+        names = [n for r in bad for n in (r["first"], r["last"])]
+        print(f"⚠️ 以下块需复核或重跑（首尾姓名）：{names}", file=sys.stderr)
+    return not bad
+
+
+def _run_with_retries(
+    task: str,
+    args: argparse.Namespace,
+    cdp_url: str | None,
+    excel_path: Path | None,
+    trace=None,
+    records: list | None = None,
+) -> None:
+    """
+    单 Agent 模式的入口：整个运行只用一个事件循环，连接类错误的重试由 _run_agent 内的运行监督处理
+    （重连 CDP / 重启浏览器，Agent 进度保留）；重试用尽仍是 CDP 版本信息解析失败时打印排查建议。
+    """
+    from excel_reader import EXAM_SCORE_KEY, USUAL_SCORE_KEY, record_name
+    from trace_replay import template_vars
+
+    trace_vars = template_vars(
+        args.url,
+        excel_path,
+        os.getenv("GRADE_ENTRY_USER", "").strip(),
+        os.getenv("GRADE_ENTRY_PASSWORD", "").strip(),
+    )
+    data_values = {
+        str(v).strip()
+        for r in records or []
+        for v in (record_name(r), r.get(USUAL_SCORE_KEY), r.get(EXAM_SCORE_KEY))
+        if v is not None and str(v).strip()
+    }
+    try:
+        out = asyncio.run(
+            _run_agent(
+                task,
+                max_steps=args.max_steps,
+                headless=args.headless,
+                excel_path=excel_path,
+                cdp_url=cdp_url,
+                lean=args.lean,
+                trace=trace,
+                trace_vars=trace_vars,
+                data_values=data_values,
+                rows=len(records or []),
+            )
+        )
+    except json.JSONDecodeError:
+        print(
+            "【浏览器连接失败】browser-use 在连接浏览器 CDP 时解析版本信息失败（非 JSON 或空响应）。\n"
+            "建议：1) 安装 Playwright Chromium 后重试：uvx playwright install chromium 或 python -m playwright install chromium\n"
+            "      2) 确认已安装 Chrome/Chromium/Edge 且可正常启动；3) 检查本机防火墙/安全软件是否拦截 localhost。\n"
+            "详见：https://github.com/browser-use/browser-use/issues",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    _write_run_report(out["telemetry"], args)
+
+
+def _write_run_report(report: dict, args: argparse.Namespace, title: str = "运行统计") -> None:
+    """打印统计摘要并写 JSON 运行报告（--report，默认 <Excel 名>.run.json）。"""
+    from agent_telemetry import print_summary, write_report
+
+    print_summary(report, title=title)
+    path = args.report or args.excel.with_name(args.excel.stem + ".run.json")
+    write_report(report, path)
+    print(f"运行报告：{path}")
 
 
 if __name__ == "__main__":
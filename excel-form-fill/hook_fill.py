@@ -0,0 +1,197 @@
+"""
+确定性填表（不调 LLM）：目标页暴露自动化钩子时，直接用钩子写入并提交。
+
+- 先按已知页面画像（PAGE_PROFILES）探测钩子；探测不到 → 交给 browser-use Agent 全量处理。
+- 探测到 → 在当前班级+课程下按姓名匹配行，一次 evaluate 批量写入「平时成绩」「考试成绩」，再一次提交。
+- 匹配不到的姓名、写入后仍未提交的行作为「残余」返回，只有残余才交给 Agent。
+- 填表结束后 read_back_rows 用同一钩子一次读回所有行，供 reconcile.py 对账。
+"""
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urljoin
+
+from excel_reader import EXAM_SCORE_KEY, USUAL_SCORE_KEY, record_name
+
+
+@dataclass
+class PageProfile:
+    """已知录入系统的自动化入口：探测表达式 + 登录接口（相对路径，可空）。"""
+    name: str
+    probe: str
+    login_api: str | None = None
+
+
+PAGE_PROFILES: list[PageProfile] = [
+    PageProfile(
+        name="auto-grade-entry",
+        probe="() => !!(window.__AUTO_GRADE_ENTRY__ && window.__AUTO_GRADE_ENTRY__.setRowScores)",
+        login_api="/api/auth/login",
+    ),
+]
+
+
+@dataclass
+class HookFillResult:
+    profile: str | None = None
+    filled: list[str] = field(default_factory=list)
+    residue: list[dict[str, Any]] = field(default_factory=list)
+    unsubmitted: list[str] = field(default_factory=list)
+
+    @property
+    def hooks_found(self) -> bool:
+        return self.profile is not None
+
+
+# 在页面内一次完成：选定目标班级+课程 → 按姓名找行 → 写成绩 → 返回匹配结果
+_FILL_JS = """
+(items) => {
+  const api = window.__AUTO_GRADE_ENTRY__;
+  if (api.setScoresBulk) {
+    // 新版页面：页面内按归一化姓名（NFKC + 去空白）索引匹配，整批只保存/渲染一次；同名无法区分的不写
+    const out = api.setScoresBulk(items);
+    return { filled: out.filled, unmatched: [...out.unmatched, ...out.ambiguous.map((a) => a.name)] };
+  }
+  const norm = (s) => String(s ?? "").normalize("NFKC").replace(/\\s+/g, "");
+  const st = api.getState();
+  const cls = st.selectedClass, course = st.selectedCourse;
+  const byName = new Map();
+  for (const r of st.rows) {
+    const key = norm(r.name);
+    if (r.className === cls && r.course === course && !byName.has(key)) byName.set(key, r.id);
+  }
+  const filled = [], unmatched = [];
+  for (const it of items) {
+    const id = byName.get(norm(it.name));
+    if (!id || !api.setRowScores(id, it.usual, it.exam)) { unmatched.push(it.name); continue; }
+    filled.push({ name: it.name, id });
+  }
+  return { filled, unmatched };
+}
+"""
+
+# 按姓名统计各 (班级, 课程) 命中数，用于在写入前切到命中最多的那组（切换会清空原组未提交修改，故必须先切再写）
+_LOCATE_JS = """
+(names) => {
+  const norm = (s) => String(s ?? "").normalize("NFKC").replace(/\\s+/g, "");
+  const want = new Set(names.map(norm));
+  return window.__AUTO_GRADE_ENTRY__.getState().rows
+    .filter((r) => want.has(norm(r.name)))
+    .map((r) => [r.className, r.course]);
+}
+"""
+
+
+async def _login_if_needed(context, url: str, profile: PageProfile) -> None:
+    user = os.getenv("GRADE_ENTRY_USER", "").strip()
+    password = os.getenv("GRADE_ENTRY_PASSWORD", "").strip()
+    if not (profile.login_api and user and password):
+        return
+    try:
+        await context.request.post(urljoin(url, profile.login_api), data={"username": user, "password": password})
+    except Exception:
+        pass  # 登录接口不可用时按未登录继续，探测失败会自然回落到 Agent
+
+
+async def _detect_profile(page, probe_timeout_ms: int) -> PageProfile | None:
+    for profile in PAGE_PROFILES:
+        try:
+            await page.wait_for_function(profile.probe, timeout=probe_timeout_ms)
+            return profile
+        except Exception:
+            continue
+    return None
+
+
+async def fill_via_hooks(
+    url: str,
+    records: list[dict[str, Any]],
+    headless: bool = True,
+    cdp_url: str | None = None,
+    probe_timeout_ms: int = 5000,
+) -> HookFillResult:
+    """探测钩子并确定性填表；未探测到钩子时 profile 为 None、residue 为全部记录。"""
+    from playwright.async_api import async_playwright
+
+    result = HookFillResult(residue=list(records))
+    async with async_playwright() as p:
+        if cdp_url:
+            browser = await p.chromium.connect_over_cdp(cdp_url)
+        else:
+            browser = await p.chromium.launch(headless=headless)
+        context = None
+        try:
+            context = await browser.new_context()
+            for profile in PAGE_PROFILES:
+                await _login_if_needed(context, url, profile)
+            page = await context.new_page()
+            await page.goto(url, wait_until="domcontentloaded")
+            profile = await _detect_profile(page, probe_timeout_ms)
+            if profile is None:
+                return result
+            # 刚加载时页面会异步拉取服务器 state，等 boot 完成（pageSize 等字段就绪）再读
+            await page.wait_for_load_state("networkidle")
+
+            items = [
+                {"name": record_name(r), "usual": r.get(USUAL_SCORE_KEY), "exam": r.get(EXAM_SCORE_KEY)}
+                for r in records
+            ]
+            groups = Counter(tuple(g) for g in await page.evaluate(_LOCATE_JS, [it["name"] for it in items]))
+            st = await page.evaluate("() => window.__AUTO_GRADE_ENTRY__.getState()")
+            if groups:
+                (cls, course), _ = groups.most_common(1)[0]
+                if cls != st.get("selectedClass"):
+                    await page.select_option("#classSelect", cls)
+                if course != st.get("selectedCourse"):
+                    await page.select_option("#courseSelect", course)
+
+            out = await page.evaluate(_FILL_JS, items)
+            await page.evaluate("() => window.__AUTO_GRADE_ENTRY__.submitAll()")
+
+            ids = {f["id"] for f in out["filled"]}
+            st = await page.evaluate("() => window.__AUTO_GRADE_ENTRY__.getState()")
+            still_dirty = {r["name"] for r in st.get("rows", []) if r.get("id") in ids and r.get("dirty")}
+            unmatched = set(out["unmatched"])
+
+            result.profile = profile.name
+            result.filled = [f["name"] for f in out["filled"] if f["name"] not in still_dirty]
+            result.unsubmitted = sorted(still_dirty)
+            result.residue = [r for r in records if record_name(r) in unmatched or record_name(r) in still_dirty]
+            return result
+        finally:
+            if cdp_url and context is not None:
+                await context.close()
+            await browser.close()
+
+
+async def read_back_rows(
+    url: str,
+    headless: bool = True,
+    cdp_url: str | None = None,
+    probe_timeout_ms: int = 5000,
+) -> list[dict[str, Any]] | None:
+    """用页面钩子一次读回全部行（getState().rows）；页面没有已知钩子时返回 None（无法对账）。"""
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        if cdp_url:
+            browser = await p.chromium.connect_over_cdp(cdp_url)
+        else:
+            browser = await p.chromium.launch(headless=headless)
+        context = None
+        try:
+            context = await browser.new_context()
+            for profile in PAGE_PROFILES:
+                await _login_if_needed(context, url, profile)
+            page = await context.new_page()
+            await page.goto(url, wait_until="domcontentloaded")
+            if await _detect_profile(page, probe_timeout_ms) is None:
+                return None
+            await page.wait_for_load_state("networkidle")
+            st = await page.evaluate("() => window.__AUTO_GRADE_ENTRY__.getState()")
+            return list(st.get("rows", []))
+        finally:
+            if cdp_url and context is not None:
+                await context.close()
+            await browser.close()
@@ -0,0 +1,50 @@
+"""
+任务文案的 token 估算与预算控制（不依赖具体分词器）。
+
+估算规则按 DeepSeek 官方给出的经验值：1 个中文字符 ≈ 0.6 token，1 个英文/数字/符号字符 ≈ 0.3 token。
+只用于 dry-run 展示和预算判断，与实际计费会有 ±20% 左右偏差。
+"""
+import math
+from typing import Any, Callable, List
+
+
+def _is_cjk(ch: str) -> bool:
+    cp = ord(ch)
+    return (
+        0x4E00 <= cp <= 0x9FFF  # CJK 统一表意文字
+        or 0x3400 <= cp <= 0x4DBF  # 扩展 A
+        or 0x3000 <= cp <= 0x303F  # 中文标点
+        or 0xFF00 <= cp <= 0xFFEF  # 全角字符
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    other = len(text) - cjk
+    return math.ceil(cjk * 0.6 + other * 0.3)
+
+
+def fit_chunk_size(
+    records: List[dict[str, Any]],
+    build: Callable[[List[dict[str, Any]]], str],
+    budget: int,
+) -> int:
+    """
+    求每块最多多少条记录时，build(块) 的估算 token 不超过 budget。
+    先对前 n 条二分查找，再按该块大小逐块校验（姓名长短不一，后面的块可能更长）。
+    返回 0 表示即使 1 条记录也超预算。
+    """
+    if not records:
+        return 0
+    lo, hi = 0, len(records)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(build(records[:mid])) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    while lo > 0 and any(
+        estimate_tokens(build(records[i : i + lo])) > budget for i in range(0, len(records), lo)
+    ):
+        lo -= 1
+    return lo
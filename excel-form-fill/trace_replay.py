@@ -0,0 +1,160 @@
+"""
+Agent 动作轨迹的录制与回放：同一录入系统（URL + 页面结构指纹相同）第二次起不再调用 LLM。
+
+- 录制：Agent 成功完成后，把 browser-use 的 AgentHistoryList（含每步动作、目标元素的 xpath/属性）存成 JSON；
+  其中的 URL、Excel 路径、登录账号替换为占位符（{{url}} 等），下次按新值代回。
+- 只录「与数据无关」的轨迹：若某步把本批的姓名/成绩逐个敲进输入框，换一批数据就不能照搬，这类轨迹不保存。
+  典型可录制的流程：登录 → 打开导入 → 上传 xlsx → 确认提交。
+- 回放：用 Agent.load_and_rerun 逐步执行，元素按历史特征重新定位；任一步定位/执行失败即停止回放，交回 LLM 从当前页面继续。
+- 指纹：入口页上表单控件与按钮的结构（标签、id、name、type、accept、按钮文字），不含具体数据。
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+DEFAULT_TRACE_DIR = Path(__file__).resolve().parent / ".traces"
+
+# 输入类动作（不同 browser-use 版本叫 input_text / input），其 text 参数可能带数据
+_INPUT_ACTIONS = ("input_text", "input")
+
+# 短于此长度的值做全文替换会误伤其它字段，不做模板化；密码短于此长度时整条轨迹不保存（否则会明文落盘）
+_MIN_TEMPLATE_LEN = 3
+
+_FINGERPRINT_JS = """
+() => Array.from(document.querySelectorAll('input, select, textarea, button, a[href], [role=button]'))
+  .map((el) => [
+    el.tagName.toLowerCase(),
+    el.id || '',
+    el.getAttribute('name') || '',
+    el.getAttribute('type') || '',
+    el.getAttribute('accept') || '',
+    (el.tagName === 'BUTTON' || el.getAttribute('role') === 'button') ? (el.innerText || '').trim().slice(0, 40) : '',
+  ].join('|'))
+  .sort()
+"""
+
+
+async def page_fingerprint(url: str, headless: bool = True, cdp_url: str | None = None) -> str:
+    """打开入口页，按表单控件结构算指纹（16 位 hex）。页面改版（控件增删改名）后指纹变化，旧轨迹自然失效。"""
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        if cdp_url:
+            browser = await p.chromium.connect_over_cdp(cdp_url)
+        else:
+            browser = await p.chromium.launch(headless=headless)
+        context = None
+        try:
+            context = await browser.new_context()
+            page = await context.new_page()
+            await page.goto(url, wait_until="domcontentloaded")
+            try:
+                await page.wait_for_load_state("networkidle", timeout=5000)
+            except Exception:
+                pass  # 有长连接的页面等不到 networkidle，按当前 DOM 计算
+            controls = await page.evaluate(_FINGERPRINT_JS)
+        finally:
+            if cdp_url and context is not None:
+                await context.close()
+            await browser.close()
+    return hashlib.sha256("\n".join(controls).encode("utf-8")).hexdigest()[:16]
+
+
+def template_vars(url: str, excel_path: Path | None, user: str, password: str) -> dict[str, str]:
+    out = {"url": url}
+    if excel_path is not None:
+        out["excel_path"] = str(excel_path.resolve())
+    if user:
+        out["user"] = user
+    if password:
+        out["password"] = password
+    return out
+
+
+def _substitute(obj: Any, pairs: list[tuple[str, str]]) -> Any:
+    """在 JSON 结构的所有字符串里做替换（pairs 按 旧 → 新，长串优先，避免 URL 前缀被先替换）。"""
+    if isinstance(obj, str):
+        for old, new in pairs:
+            if old:
+                obj = obj.replace(old, new)
+        return obj
+    if isinstance(obj, list):
+        return [_substitute(x, pairs) for x in obj]
+    if isinstance(obj, dict):
+        return {k: _substitute(v, pairs) for k, v in obj.items()}
+    return obj
+
+
+def _input_texts(history: dict[str, Any]) -> list[str]:
+    texts: list[str] = []
+    for item in history.get("history", []):
+        for action in ((item.get("model_output") or {}).get("action") or []):
+            for name in _INPUT_ACTIONS:
+                params = action.get(name)
+                if isinstance(params, dict) and params.get("text") is not None:
+                    texts.append(str(params["text"]))
+    return texts
+
+
+class TraceStore:
+    """轨迹目录：<dir>/<URL 哈希>-<页面指纹>.json。"""
+
+    def __init__(self, trace_dir: Path, url: str, fingerprint: str) -> None:
+        self.trace_dir = trace_dir
+        self.url = url
+        self.fingerprint = fingerprint
+        parts = urlsplit(url)
+        url_key = hashlib.sha256(f"{parts.scheme}://{parts.netloc}{parts.path}".encode("utf-8")).hexdigest()[:12]
+        self.path = trace_dir / f"{url_key}-{fingerprint}.json"
+
+    def exists(self) -> bool:
+        return self.path.is_file()
+
+    def save(
+        self,
+        history: dict[str, Any],
+        data_values: set[str],
+        template: dict[str, str],
+    ) -> str | None:
+        """
+        保存轨迹；返回 None 表示已保存，否则返回不保存的原因。
+        data_values：本批数据里的姓名/成绩字符串，出现在输入动作里即视为与数据相关。
+        """
+        bound = sorted({t for t in _input_texts(history) if t.strip() in data_values})
+        if bound:
+            return f"轨迹中有 {len(bound)} 处按本批数据逐条输入（如 {bound[:3]}），换数据无法照搬"
+        if 0 < len(template.get("password", "")) < _MIN_TEMPLATE_LEN:
+            return f"登录密码短于 {_MIN_TEMPLATE_LEN} 个字符，无法可靠地替换成占位符，为免明文写入轨迹文件不保存"
+        pairs = sorted(
+            ((v, "{{" + k + "}}") for k, v in template.items() if len(v) >= _MIN_TEMPLATE_LEN),
+            key=lambda kv: -len(kv[0]),
+        )
+        templated = _substitute(history, pairs)
+        dumped = json.dumps(templated, ensure_ascii=False)
+        doc = {
+            "url": self.url,
+            "fingerprint": self.fingerprint,
+            "saved_at": round(time.time(), 3),
+            "vars": sorted(k for k in template if "{{" + k + "}}" in dumped),
+            "history": templated,
+        }
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+        return None
+
+    def materialize(self, template: dict[str, str], out_path: Path) -> bool:
+        """把轨迹中的占位符代回本次的值，写成 browser-use 可加载的历史文件；缺少必需变量时返回 False。"""
+        doc = json.loads(self.path.read_text(encoding="utf-8"))
+        if any(k not in template for k in doc.get("vars", [])):
+            return False
+        pairs = [("{{" + k + "}}", v) for k, v in template.items()]
+        out_path.write_text(json.dumps(_substitute(doc["history"], pairs), ensure_ascii=False), encoding="utf-8")
+        return True
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,114 @@
+"""
+校验两个项目共用的模块：auto-grade-entry 与 excel-form-fill 各自独立部署，共用模块各带一份，
+两份除第 1 行（指向另一份的说明）外必须逐字节相同；任一份改过而另一份没跟上时退出码 1，并打印差异。
+两边各自定义、但含义必须一致的常量（如 --lean 的 Chromium 参数）按值比对。
+
+另外把 reconcile._norm_score 与 grade_state.clamp_int（网页 clampInt 的 Python 实现）在一组边界值上逐个比对，
+对账与写入对同一个分数的归一结果不一致时同样失败。
+
+用法（仓库根目录）：
+  python tools/check_shared_copies.py
+"""
+import ast
+import difflib
+import importlib.util
+import math
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+AGE = ROOT / "auto-grade-entry" / "automation"
+EFF = ROOT / "excel-form-fill"
+
+SHARED: List[Tuple[Path, Path]] = [
+    (AGE / "agent_telemetry.py", EFF / "agent_telemetry.py"),
+    (AGE / "csv_grid.py", EFF / "csv_grid.py"),
+    (AGE / "reconcile.py", EFF / "reconcile.py"),
+]
+
+# (常量名, 文件, 文件)：两处的字面值必须相同
+SHARED_CONSTANTS: List[Tuple[str, Path, Path]] = [
+    ("LEAN_CHROMIUM_ARGS", AGE / "lean_profile.py", EFF / "fill_form.py"),
+]
+
+# 覆盖 clampInt 的各个分支：空、纯空白、非数字、NaN/Infinity、.5 舍入、越界、布尔
+SCORE_PROBES: List[Any] = [
+    None, "", " ", "\t", "abc", "12abc", "nan", "inf", "-inf", float("nan"), math.inf, -math.inf,
+    0, 0.5, 1.5, 2.5, -0.5, -0.6, 99.5, 100.4, 100.5, 101, -3, " 88 ", "59.5", True, False, [], {},
+]
+
+
+def _body(path: Path) -> List[str]:
+    return path.read_text(encoding="utf-8").splitlines(keepends=True)[1:]
+
+
+def check_copies() -> List[str]:
+    errors: List[str] = []
+    for a, b in SHARED:
+        body_a, body_b = _body(a), _body(b)
+        if body_a != body_b:
+            ra, rb = a.relative_to(ROOT).as_posix(), b.relative_to(ROOT).as_posix()
+            diff = "".join(difflib.unified_diff(body_a, body_b, ra, rb, n=1))
+            errors.append(f"{ra} 与 {rb} 不一致（第 1 行除外）：\n{diff}")
+    return errors
+
+
+def _literal(path: Path, name: str) -> Any:
+    for node in ast.parse(path.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            return ast.literal_eval(node.value)
+        if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.target.id == name and node.value:
+            return ast.literal_eval(node.value)
+    raise LookupError(f"{path.relative_to(ROOT).as_posix()} 中没有 {name}")
+
+
+def check_constants() -> List[str]:
+    errors: List[str] = []
+    for name, a, b in SHARED_CONSTANTS:
+        va, vb = _literal(a, name), _literal(b, name)
+        if va != vb:
+            errors.append(
+                f"{name}：{a.relative_to(ROOT).as_posix()} = {va!r}\n"
+                f"{' ' * len(name)}  {b.relative_to(ROOT).as_posix()} = {vb!r}"
+            )
+    return errors
+
+
+def _load(path: Path, name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(name, path)
+    assert spec is not None and spec.loader is not None
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def check_norm_score() -> List[str]:
+    clamp_int = _load(AGE / "grade_state.py", "_shared_grade_state").clamp_int
+    errors: List[str] = []
+    for path in (AGE / "reconcile.py", EFF / "reconcile.py"):
+        norm = _load(path, "_shared_reconcile")._norm_score
+        for v in SCORE_PROBES:
+            want = clamp_int(v)
+            try:
+                got = norm(v)
+            except Exception as e:  # 抛异常（如 Infinity 上的 OverflowError）也算不一致
+                got = f"{type(e).__name__}: {e}"
+            if got != want:
+                errors.append(f"{path.relative_to(ROOT).as_posix()}: _norm_score({v!r}) = {got!r}，clamp_int = {want!r}")
+    return errors
+
+
+def main() -> int:
+    errors = check_copies() + check_constants() + check_norm_score()
+    for e in errors:
+        print(e, file=sys.stderr)
+    if errors:
+        return 1
+    print(f"共用模块一致：{len(SHARED)} 组；共用常量一致：{len(SHARED_CONSTANTS)} 个；_norm_score 与 clamp_int 在 {len(SCORE_PROBES)} 个边界值上一致。")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())